@@ -1,10 +1,16 @@
 from dependency_injector.containers import DeclarativeContainer
-from dependency_injector.providers import AbstractSingleton, Configuration
+from dependency_injector.providers import (AbstractSingleton, Configuration,
+                                           Dependency, Singleton)
 
-from data_providers.data_provider import DataProvider
+from data_providers.data_provider import AsyncDataProvider, DataProvider
+from infra.http import HttpClient
 
 
 class Container(DeclarativeContainer):
     config = Configuration(yaml_files=['config.yml'])
 
+    http = Dependency(instance_of=HttpClient, default=Singleton(HttpClient))
+
     client = AbstractSingleton(DataProvider)
+
+    async_client = AbstractSingleton(AsyncDataProvider)
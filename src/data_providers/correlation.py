@@ -0,0 +1,419 @@
+import hashlib
+import json
+import os
+from threading import Lock
+from time import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_providers.store import atomic_write
+
+# a variance this small next to the squares summed is what is left of a flat series by rounding
+_FLAT = 1e-12
+
+Partners = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+_SUMS_FIELDS = ['count', 'sx', 'sxx', 'sxy', 'scale']
+
+
+def top_correlations(closes: pd.DataFrame,
+                     periods: List[str],
+                     top_k: int = 1,
+                     block_size: int = 256) -> pd.DataFrame:
+    '''
+    This function returns, for every period (e.g. 5D) and symbol, the `top_k` symbols whose forward returns over
+    the period correlate the most with its own, from closes by date and symbol. Returns are standardized once
+    per number of bars, periods spanning as many bars share them, and correlations are computed by blocks of
+    `block_size` symbols so only `block_size` x N of the matrix is ever held
+    '''
+    values = closes.to_numpy(dtype=float)
+
+    def _blocks(bars: int) -> Iterator[Tuple[int, np.ndarray]]:
+        return _correlation_blocks(*_standardized(_forward_returns(values, bars)), block_size)
+
+    return _top_frame(closes.columns, {i: _period_bars(closes.index, i) for i in periods}, _blocks, top_k)
+
+
+class _Sums:
+    '''
+    This class keeps the sums of a window of returns rows for every pair, over the rows both symbols have:
+    `sx[i, j]` sums returns of `i` and `sx[j, i]` those of `j`, `sxx` their squares the same way. `scale` sums
+    the squares of every return of a symbol ever added or removed, the size of the rounding left in its sums
+    '''
+
+    def __init__(self,
+                 count: np.ndarray,
+                 sx: np.ndarray,
+                 sxx: np.ndarray,
+                 sxy: np.ndarray,
+                 scale: np.ndarray) -> None:
+        self.count = count
+        self.sx = sx
+        self.sxx = sxx
+        self.sxy = sxy
+        self.scale = scale
+
+    @classmethod
+    def from_returns(cls, returns: np.ndarray) -> '_Sums':
+        valid = np.isfinite(returns)
+        mask = valid.astype(float)
+        x = np.where(valid, returns, 0.0)
+
+        return cls(mask.T @ mask, x.T @ mask, (x * x).T @ mask, x.T @ x, (x * x).sum(axis=0))
+
+    def add(self, returns: np.ndarray, sign: float = 1.0) -> None:
+        '''
+        This method adds one returns row to the window, or removes it with a `sign` of -1
+        '''
+        valid = np.isfinite(returns)
+        mask = valid.astype(float)
+        x = np.where(valid, returns, 0.0)
+
+        self.count += sign * np.outer(mask, mask)
+        self.sx += sign * np.outer(x, mask)
+        self.sxx += sign * np.outer(x * x, mask)
+        self.sxy += sign * np.outer(x, x)
+        self.scale += x * x
+
+    def blocks(self, block_size: int) -> Iterator[Tuple[int, np.ndarray]]:
+        for start in range(0, len(self.count), block_size):
+            stop = min(start + block_size, len(self.count))
+
+            yield start, _pearson(self.count[start:stop],
+                                  self.sx[start:stop], self.sx[:, start:stop].T,
+                                  self.sxx[start:stop], self.sxx[:, start:stop].T,
+                                  self.sxy[start:stop],
+                                  self.scale[start:stop, None], self.scale[None, :])
+
+
+class RollingCorrelation:
+    '''
+    This class keeps the last `window` closes of a fixed set of symbols with, for each number of bars of its
+    periods, the running sums of the forward returns they hold; a new bar adds the returns row it completes and
+    drops the oldest one in O(N²), and correlations are read from the sums as `top_correlations` computes them
+    from the same closes. The number of bars of each period is set when the closes are first given
+    '''
+
+    def __init__(self,
+                 symbols: pd.Index,
+                 bars: Dict[str, int],
+                 dates: pd.DatetimeIndex,
+                 closes: np.ndarray,
+                 window: int,
+                 sums: Dict[int, _Sums] = None,
+                 created_at: float = None,
+                 refreshed_at: float = None) -> None:
+        self._symbols = pd.Index(symbols)
+        self._bars = bars
+        self._dates = dates
+        self._closes = closes
+        self._window = window
+        self._sums = sums if sums is not None else \
+            {i: _Sums.from_returns(_forward_returns(closes, i)) for i in set(bars.values())}
+        self.created_at = time() if created_at is None else created_at
+        self.refreshed_at = self.created_at if refreshed_at is None else refreshed_at
+        self._lock = Lock()
+
+    @classmethod
+    def from_closes(cls,
+                    closes: pd.DataFrame,
+                    periods: List[str],
+                    window: int = None) -> 'RollingCorrelation':
+        '''
+        This method starts from closes by date and symbol, keeping the last `window` of them (all by default)
+        '''
+        closes = closes.iloc[-(window or len(closes)):]
+
+        return cls(closes.columns,
+                   {i: _period_bars(closes.index, i) for i in periods},
+                   closes.index,
+                   closes.to_numpy(dtype=float),
+                   window or len(closes))
+
+    @property
+    def symbols(self) -> List[str]:
+        return self._symbols.tolist()
+
+    @property
+    def periods(self) -> List[str]:
+        return list(self._bars)
+
+    @property
+    def window(self) -> int:
+        return self._window
+
+    @property
+    def last_date(self) -> Optional[pd.Timestamp]:
+        return self._dates[-1] if len(self._dates) else None
+
+    def update(self, date: pd.Timestamp, closes: pd.Series) -> None:
+        '''
+        This method adds the bar of `date` from closes by symbol, or revises the last bar (which may still be
+        forming) when `date` is its date; symbols without a close keep their last one, bars older are ignored
+        '''
+        with self._lock:
+            last = self._closes[-1] if len(self._closes) else np.full(len(self._symbols), np.nan)
+            row = closes.reindex(self._symbols).to_numpy(dtype=float)
+            row = np.where(np.isnan(row), last, row)
+
+            if self.last_date is not None and date < self.last_date:
+                return
+
+            if self.last_date is not None and date == self.last_date:
+                self._revise(row)
+            else:
+                self._append(date, row)
+
+    def extend(self, closes: pd.DataFrame) -> None:
+        '''
+        This method updates with every bar of closes by date and symbol, in date order
+        '''
+        for date, row in closes.sort_index().iterrows():
+            self.update(date, row)
+
+    def correlations(self,
+                     periods: List[str] = None,
+                     top_k: int = 1,
+                     block_size: int = 256) -> pd.DataFrame:
+        '''
+        This method returns the same frame as `top_correlations` over the closes kept, for `periods` of this state
+        '''
+        with self._lock:
+            bars = {i: self._bars[i] for i in periods or self._bars}
+
+            return _top_frame(self._symbols, bars, lambda i: self._sums[i].blocks(block_size), top_k)
+
+    def save(self, path: str) -> None:
+        # sums are updated in place, no bar comes until they are written
+        with self._lock:
+            data = {
+                'symbols': self._symbols.to_numpy(dtype=str),
+                'periods': np.array(list(self._bars), dtype=str),
+                'bars': np.array(list(self._bars.values())),
+                'dates': self._dates.asi8,
+                'tz': np.array(str(self._dates.tz or '')),
+                'closes': self._closes,
+                'window': np.array(self._window),
+                'created_at': np.array(self.created_at),
+                'refreshed_at': np.array(self.refreshed_at),
+                **{f'{k}_{n}': getattr(v, k) for n, v in self._sums.items() for k in _SUMS_FIELDS},
+            }
+
+            # a file object, as a path would be given the `.npz` extension
+            with atomic_write(path) as tmp, open(tmp, 'wb') as f:
+                np.savez(f, **data)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['RollingCorrelation']:
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                bars = dict(zip(data['periods'].tolist(), data['bars'].tolist()))
+                dates = pd.DatetimeIndex(data['dates'])
+                if str(data['tz']):
+                    dates = dates.tz_localize('UTC').tz_convert(str(data['tz']))
+
+                sums = {n: _Sums(*[data[f'{k}_{n}'] for k in _SUMS_FIELDS])
+                        for n in set(bars.values())}
+
+                return cls(pd.Index(data['symbols'].tolist()), bars, dates, data['closes'], int(data['window']),
+                           sums, float(data['created_at']), float(data['refreshed_at']))
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return None
+
+    def _append(self, date: pd.Timestamp, row: np.ndarray) -> None:
+        closes = np.vstack([self._closes, row])
+        full = len(closes) > self._window
+
+        for n, sums in self._sums.items():
+            if len(closes) > n:
+                sums.add(_return_row(closes[-1 - n], closes[-1]))
+
+            # the oldest close leaves the window, with the return row starting at it
+            if full and len(closes) > n + 1:
+                sums.add(_return_row(closes[0], closes[n]), -1.0)
+
+        self._closes = closes[1:] if full else closes
+        self._dates = self._dates.append(pd.DatetimeIndex([date], tz=self._dates.tz))[-len(self._closes):]
+
+    def _revise(self, row: np.ndarray) -> None:
+        for n, sums in self._sums.items():
+            if len(self._closes) > n:
+                sums.add(_return_row(self._closes[-1 - n], self._closes[-1]), -1.0)
+                sums.add(_return_row(self._closes[-1 - n], row))
+
+        self._closes[-1] = row
+
+
+class CorrelationStates:
+    '''
+    This class keeps rolling correlation states by key, and as `{directory}/{key}.npz` files when `directory`
+    is set so that they outlive the process
+    '''
+
+    def __init__(self, directory: str = None) -> None:
+        self._directory = directory
+        self._states: Dict[str, RollingCorrelation] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def key(**params: Any) -> str:
+        return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[RollingCorrelation]:
+        with self._lock:
+            state = self._states.get(key)
+
+        if state is None and self._directory:
+            state = RollingCorrelation.load(self._path(key))
+
+            if state is not None:
+                with self._lock:
+                    state = self._states.setdefault(key, state)
+
+        return state
+
+    def put(self, key: str, state: RollingCorrelation) -> None:
+        with self._lock:
+            self._states[key] = state
+
+        if self._directory:
+            state.save(self._path(key))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f'{key}.npz')
+
+
+def _top_frame(symbols: pd.Index,
+               bars: Dict[str, int],
+               blocks: Callable[[int], Iterator[Tuple[int, np.ndarray]]],
+               top_k: int) -> pd.DataFrame:
+    partners: Dict[int, Partners] = {}
+    frames = []
+
+    for period, n in bars.items():
+        if n not in partners:
+            partners[n] = _top_partners(blocks(n), len(symbols), top_k)
+
+        s1, s2, corr = partners[n]
+        frames.append(pd.DataFrame({'period': period, 's1': symbols[s1], 's2': symbols[s2], 'corr': corr}))
+
+    if not frames:
+        return pd.DataFrame(columns=['corr'], index=pd.MultiIndex.from_tuples([], names=['period', 's1', 's2']))
+
+    rst = pd.concat(frames, ignore_index=True).sort_values(['period', 'corr'], kind='stable')
+
+    return rst.set_index(['period', 's1', 's2'])
+
+
+def _period_bars(dates: pd.DatetimeIndex, period: str) -> int:
+    # the most bars any window of the period holds
+    return max(int(pd.Series(1, index=dates).resample(period).count().max()), 1)
+
+
+def _forward_returns(values: np.ndarray, bars: int) -> np.ndarray:
+    # as `pct_change(-bars)`, the last `bars` rows having no return
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return values[:-bars] / values[bars:] - 1
+
+
+def _return_row(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return start / end - 1
+
+
+def _standardized(returns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    valid = np.isfinite(returns)
+    count = valid.sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(valid, returns, 0.0).sum(axis=0) / count
+        deviation = np.where(valid, returns - mean, 0.0)
+        std = np.sqrt((deviation * deviation).sum(axis=0) / (count - 1))
+
+        # shifting and scaling a column leaves its correlations unchanged, and keeps the sums below small
+        z = np.where(valid, deviation / std, 0.0)
+
+    return z, valid & (std > 0)
+
+
+def _top_partners(blocks: Iterator[Tuple[int, np.ndarray]],
+                  n: int,
+                  top_k: int) -> Partners:
+    k = min(top_k, n - 1)
+
+    if k < 1:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0)
+
+    s1, s2, corr = [], [], []
+
+    for start, block in blocks:
+        size = len(block)
+
+        # a symbol is not its own partner, pairs without a correlation are never picked
+        block[np.arange(size), start + np.arange(size)] = np.nan
+        block = np.where(np.isnan(block), -np.inf, block)
+
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_corr = np.take_along_axis(block, top, axis=1)
+
+        order = np.argsort(-top_corr, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_corr = np.take_along_axis(top_corr, order, axis=1)
+
+        found = np.isfinite(top_corr)
+        s1.append(np.broadcast_to(start + np.arange(size)[:, None], top.shape)[found])
+        s2.append(top[found])
+        corr.append(top_corr[found])
+
+    return np.concatenate(s1), np.concatenate(s2), np.concatenate(corr)
+
+
+def _correlation_blocks(z: np.ndarray,
+                        valid: np.ndarray,
+                        block_size: int) -> Iterator[Tuple[int, np.ndarray]]:
+    '''
+    This function yields the Pearson correlations of `block_size` symbols with every symbol at a time; when every
+    return is present they are products of z-scores, otherwise each pair is computed over the rows both have
+    '''
+    rows, n = z.shape
+    complete = rows > 1 and bool(valid.all())
+
+    if not complete:
+        mask = valid.astype(float)
+        z = np.where(valid, z, 0.0)
+        z2 = z * z
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+
+        if complete:
+            block = np.clip(z[:, start:stop].T @ z / (rows - 1), -1, 1)
+        else:
+            zb, mb = z[:, start:stop], mask[:, start:stop]
+            block = _pearson(mb.T @ mask, zb.T @ mask, mb.T @ z, (zb * zb).T @ mask, mb.T @ z2, zb.T @ z)
+
+        yield start, block
+
+
+def _pearson(count: np.ndarray,
+             sx: np.ndarray,
+             sy: np.ndarray,
+             sxx: np.ndarray,
+             syy: np.ndarray,
+             sxy: np.ndarray,
+             scale_x: np.ndarray = None,
+             scale_y: np.ndarray = None) -> np.ndarray:
+    # sums kept by adding and removing rows hold rounding of every row they saw, not only of those they sum
+    scale_x = sxx if scale_x is None else np.maximum(sxx, scale_x)
+    scale_y = syy if scale_y is None else np.maximum(syy, scale_y)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var_x = sxx - sx * sx / count
+        var_y = syy - sy * sy / count
+
+        block = (sxy - sx * sy / count) / np.sqrt(var_x * var_y)
+        block[(count < 2) | (var_x <= _FLAT * scale_x) | (var_y <= _FLAT * scale_y)] = np.nan
+
+    return np.clip(block, -1, 1)
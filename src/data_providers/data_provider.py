@@ -1,12 +1,13 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
 import pandas as pd
 import pytz
 
 from data_providers.enums import Adjustment
-from models.data_models import Quote
+from models.data_models import PartialQuotes, Quote
+from models.quote_batch import QuoteBatch
 
 
 class DataProvider(ABC):
@@ -21,7 +22,10 @@ class DataProvider(ABC):
     @abstractmethod
     def quotes(self,
                symbols: Union[str, List[str]],
-               fields: List[str] = None) -> Union[Quote, Dict[str, Quote]]:
+               fields: List[str] = None,
+               max_age: float = None,
+               partial=False,
+               columnar=False) -> Union[Quote, Dict[str, Quote], PartialQuotes, QuoteBatch]:
         pass
 
     @abstractmethod
@@ -34,6 +38,10 @@ class DataProvider(ABC):
               tzinfo: pytz.BaseTzInfo = pytz.UTC) -> pd.DataFrame:
         pass
 
+    @abstractmethod
+    def symbols(self, prefix: str, limit: int = 20) -> List[Dict[str, Any]]:
+        pass
+
     @abstractmethod
     def economic_calendar(self,
                           from_date: Union[str, datetime],
@@ -41,3 +49,86 @@ class DataProvider(ABC):
                           countries: List[str] = None,
                           fetch_related_events=False) -> List[Dict[str, Any]]:
         pass
+
+    @abstractmethod
+    def correlations(self,
+                     markets: Union[List[str]] = None,
+                     exchanges: Union[List[str]] = None,
+                     sort: Union[str, str] = None,
+                     topn: int = None,
+                     freq: int = '1D',
+                     total_candles: int = 252,
+                     tzinfo=None,
+                     periods=['1D', '5D', '10D', '21D'],
+                     top_k: int = 1) -> pd.DataFrame:
+        pass
+
+
+class AsyncDataProvider(ABC):
+    WORKERS_NO: Optional[int]
+
+    @abstractmethod
+    async def search(self,
+                     symbols: List[str],
+                     params: Dict[str, Any] = None) -> Dict[str, Union[None, Dict[str, Any]]]:
+        pass
+
+    @abstractmethod
+    async def quotes(self,
+                     symbols: Union[str, List[str]],
+                     fields: List[str] = None,
+                     max_age: float = None,
+                     partial=False,
+                     columnar=False) -> Union[Quote, Dict[str, Quote], PartialQuotes, QuoteBatch]:
+        pass
+
+    @abstractmethod
+    async def ohlcv(self,
+                    symbols: Union[str, List[str]],
+                    freq: str,
+                    total_candles: int,
+                    charts: List[str] = None,
+                    adjustment=Adjustment.DIVIDENDS,
+                    tzinfo: pytz.BaseTzInfo = pytz.UTC) -> pd.DataFrame:
+        pass
+
+    @abstractmethod
+    async def symbols(self, prefix: str, limit: int = 20) -> List[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def economic_calendar(self,
+                                from_date: Union[str, datetime],
+                                to_date: Union[str, datetime],
+                                countries: List[str] = None,
+                                fetch_related_events=False) -> List[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def correlations(self,
+                           markets: Union[List[str]] = None,
+                           exchanges: Union[List[str]] = None,
+                           sort: Union[str, str] = None,
+                           topn: int = None,
+                           freq: int = '1D',
+                           total_candles: int = 252,
+                           tzinfo=None,
+                           periods=['1D', '5D', '10D', '21D'],
+                           top_k: int = 1) -> pd.DataFrame:
+        pass
+
+    @abstractmethod
+    async def subscribe_quotes(self, symbols: List[str]) -> AsyncIterator[Dict[str, Dict[str, Any]]]:
+        pass
+
+    @abstractmethod
+    async def unsubscribe_quotes(self, subscription: AsyncIterator[Dict[str, Dict[str, Any]]]) -> None:
+        pass
+
+    @abstractmethod
+    def realtime_bars(self,
+                      symbol: str,
+                      freq: str,
+                      charts: List[str] = None,
+                      adjustment=Adjustment.DIVIDENDS) -> AsyncIterator[Any]:
+        pass
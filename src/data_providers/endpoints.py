@@ -1,18 +1,35 @@
 """Endpoints module."""
 
+import asyncio
+import json
 from typing import Any, Dict, List, Union
 
 from dependency_injector.wiring import Provide, inject
-from fastapi import APIRouter, Depends, Query
+from fastapi import (APIRouter, Depends, Query, Request, WebSocket,
+                     WebSocketDisconnect)
 from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from pydantic import TypeAdapter
 
 from data_providers import API_VERSION
 from data_providers.containers import Container
-from data_providers.data_provider import DataProvider
-from models.data_models import Quote
+from data_providers.data_provider import AsyncDataProvider
+from models.data_models import PartialQuotes, Quote
+from models.quote_batch import QuoteBatch
 
 router = APIRouter(prefix=f'/{API_VERSION}/data')
 
+QuotesResponse = Union[Quote, Dict[str, Quote], PartialQuotes]
+
+_QUOTES_ADAPTER = TypeAdapter(QuotesResponse)
+
+# column-oriented representations of quotes, chosen by the `Accept` header
+_QUOTE_BATCH_FORMATS = {
+    'application/vnd.market-datasource.columns+json': QuoteBatch.to_json_columns,
+    'application/vnd.apache.arrow.stream': QuoteBatch.to_arrow_ipc,
+    'application/vnd.apache.parquet': QuoteBatch.to_parquet,
+}
+
 
 @router.get('/search',
             response_model=Dict[str, Union[None, Dict[str, Any]]],
@@ -25,7 +42,7 @@ async def search(
     search_type: str = Query(None),
     economic_category: str = Query(None),
     start: int = Query(0),
-    service: DataProvider = Depends(Provide[Container.client]),
+    service: AsyncDataProvider = Depends(Provide[Container.async_client]),
 ):
     if not symbols:
         raise RequestValidationError('"symbols" query is required')
@@ -37,26 +54,102 @@ async def search(
         'economic_category': economic_category,
         'start': start,
     }
-    resp = service.search(symbols=symbols, params=params)
+    resp = await service.search(symbols=symbols, params=params)
 
     return resp
 
 
-@router.get('/quotes',
-            response_model=Union[Quote, Dict[str, Quote]],
+@router.get('/symbols',
+            response_model=List[Dict[str, Any]],
             response_model_exclude_none=True)
 @inject
+async def symbols(
+    prefix: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=1000),
+    service: AsyncDataProvider = Depends(Provide[Container.async_client]),
+):
+    resp = await service.symbols(prefix=prefix, limit=limit)
+
+    return resp
+
+
+@router.get('/quotes',
+            response_model=QuotesResponse,
+            response_model_exclude_none=True,
+            responses={200: {'content': {i: {} for i in _QUOTE_BATCH_FORMATS}}})
+@inject
 async def quotes(
+    request: Request,
     symbols: List[str] = Query(None),
     fields: List[str] = Query(None),
-    service: DataProvider = Depends(Provide[Container.client]),
+    max_age: float = Query(None, ge=0),
+    partial: bool = Query(False),
+    service: AsyncDataProvider = Depends(Provide[Container.async_client]),
 ):
     if not symbols:
         raise RequestValidationError('"symbols" query is required')
 
-    resp = service.quotes(symbols=symbols, fields=fields)
+    media_type = _negotiate(request.headers.get('accept'), ['application/json', *_QUOTE_BATCH_FORMATS])
 
-    return resp
+    if media_type in _QUOTE_BATCH_FORMATS:
+        batch = await service.quotes(symbols=symbols, fields=fields, max_age=max_age, partial=partial, columnar=True)
+
+        return Response(content=_QUOTE_BATCH_FORMATS[media_type](batch), media_type=media_type)
+
+    resp = await service.quotes(symbols=symbols, fields=fields, max_age=max_age, partial=partial)
+
+    # quotes are built by the provider, serialized as they are rather than validated again for `response_model`
+    return Response(content=_QUOTES_ADAPTER.dump_json(resp, by_alias=True, exclude_none=True, warnings=False),
+                    media_type='application/json')
+
+
+@router.get('/quotes/stream')
+@inject
+async def quotes_stream(
+    symbols: List[str] = Query(None),
+    service: AsyncDataProvider = Depends(Provide[Container.async_client]),
+):
+    if not symbols:
+        raise RequestValidationError('"symbols" query is required')
+
+    subscription = await service.subscribe_quotes(symbols)
+
+    async def _events():
+        try:
+            async for update in subscription:
+                yield f'data: {json.dumps(update)}\n\n'
+        finally:
+            # response task is cancelled when client disconnects, the release must still happen
+            await asyncio.shield(service.unsubscribe_quotes(subscription))
+
+    return StreamingResponse(_events(), media_type='text/event-stream')
+
+
+@router.websocket('/quotes/ws')
+@inject
+async def quotes_ws(
+    websocket: WebSocket,
+    symbols: List[str] = Query(None),
+    service: AsyncDataProvider = Depends(Provide[Container.async_client]),
+):
+    if not symbols:
+        await websocket.close(code=1008, reason='"symbols" query is required')
+        return
+
+    await websocket.accept()
+
+    subscription = await service.subscribe_quotes(symbols)
+
+    try:
+        async for update in subscription:
+            await websocket.send_json(update)
+
+        # hub dropped this client because it could not keep up
+        await websocket.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await service.unsubscribe_quotes(subscription)
 
 
 @router.get('/economic_calendar',
@@ -68,11 +161,67 @@ async def economic_calendar(
     to_date: str = Query(None),
     countries: List[str] = Query(None),
     fetch_related_events: bool = Query(False),
-    service: DataProvider = Depends(Provide[Container.client]),
+    service: AsyncDataProvider = Depends(Provide[Container.async_client]),
 ):
-    resp = service.economic_calendar(from_date=from_date,
-                                     to_date=to_date,
-                                     countries=countries,
-                                     fetch_related_events=fetch_related_events)
+    resp = await service.economic_calendar(from_date=from_date,
+                                           to_date=to_date,
+                                           countries=countries,
+                                           fetch_related_events=fetch_related_events)
 
     return resp
+
+
+@router.get('/correlations',
+            response_model=List[Dict[str, Any]])
+@inject
+async def correlations(
+    markets: List[str] = Query(None),
+    exchanges: List[str] = Query(None),
+    sort_by: str = Query('market_cap_basic'),
+    sort_order: str = Query('desc', pattern='^(asc|desc)$'),
+    topn: int = Query(100, ge=2, le=5000),
+    freq: str = Query('1D'),
+    total_candles: int = Query(252, ge=2, le=5000),
+    periods: List[str] = Query(['1D', '5D', '10D', '21D']),
+    top_k: int = Query(1, ge=1, le=100),
+    service: AsyncDataProvider = Depends(Provide[Container.async_client]),
+):
+    if not markets and not exchanges:
+        raise RequestValidationError('"markets" or "exchanges" query is required')
+
+    resp = await service.correlations(markets=markets,
+                                      exchanges=exchanges,
+                                      sort=(sort_by, sort_order),
+                                      topn=topn,
+                                      freq=freq,
+                                      total_candles=total_candles,
+                                      periods=periods,
+                                      top_k=top_k)
+
+    return resp.reset_index().to_dict('records')
+
+
+def _negotiate(accept: str, offers: List[str]) -> str:
+    '''
+    This function returns the offer the `Accept` header prefers, the first offer when it accepts none of them
+    '''
+    ranked = []
+
+    for n, item in enumerate((accept or '').split(',')):
+        media_type, *params = [i.strip() for i in item.split(';')]
+        q = next((i.split('=', 1)[1] for i in params if i.startswith('q=')), '1')
+
+        try:
+            ranked.append((-float(q), n, media_type.lower()))
+        except ValueError:
+            continue
+
+    for q, _, media_type in sorted(ranked):
+        if q == 0:
+            break
+
+        for offer in offers:
+            if media_type in (offer, '*/*', f'{offer.split("/")[0]}/*'):
+                return offer
+
+    return offers[0]
@@ -0,0 +1,222 @@
+import re
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+SERVER_SUFFIX = '@server'
+
+# Arrays are `(bars, symbols)`: one column per symbol, its bars right-aligned and NaN-padded on top,
+# so every indicator runs once over all symbols whatever the length of their history
+
+
+def sma(x: np.ndarray, length: int) -> np.ndarray:
+    rst = np.full(x.shape, np.nan)
+    if len(x) < length:
+        return rst
+
+    # padding NaN must not leak into the running sums of later bars
+    valid = ~np.isnan(x)
+    zeros = np.zeros((1, *x.shape[1:]))
+    csum = np.cumsum(np.vstack([zeros, np.where(valid, x, 0)]), axis=0)
+    count = np.cumsum(np.vstack([zeros, valid]), axis=0)
+
+    window = count[length:] - count[:-length]
+    rst[length - 1:] = np.where(window == length, (csum[length:] - csum[:-length]) / length, np.nan)
+
+    return rst
+
+
+def stdev(x: np.ndarray, length: int) -> np.ndarray:
+    '''
+    This function returns the population standard deviation over `length` bars, as `ta.stdev` of Pine
+    '''
+    rst = np.full(x.shape, np.nan)
+    if len(x) < length:
+        return rst
+
+    windows = np.lib.stride_tricks.sliding_window_view(x, length, axis=0)
+    rst[length - 1:] = windows.std(axis=-1)
+
+    return rst
+
+
+def ema(x: np.ndarray, length: int) -> np.ndarray:
+    return _recursive(x, length, 2 / (length + 1))
+
+
+def rma(x: np.ndarray, length: int) -> np.ndarray:
+    '''
+    This function returns the Wilder moving average used by RSI and ATR
+    '''
+    return _recursive(x, length, 1 / length)
+
+
+def bbands(close: np.ndarray, length: int, mult: float = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    basis = sma(close, length)
+    dev = mult * stdev(close, length)
+
+    return basis, basis + dev, basis - dev
+
+
+def rsi(close: np.ndarray, length: int) -> np.ndarray:
+    change = np.diff(close, axis=0, prepend=np.nan)
+
+    up = rma(np.maximum(change, 0), length)
+    down = rma(np.maximum(-change, 0), length)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rst = 100 - 100 / (1 + up / down)
+
+    return np.where(down == 0, 100, np.where(up == 0, 0, rst))
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int) -> np.ndarray:
+    prev_close = np.vstack([np.full((1, *close.shape[1:]), np.nan), close[:-1]])
+
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+    return rma(tr, length)
+
+
+def highlow(high: np.ndarray, low: np.ndarray, length: int) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    This function returns the highest high and the lowest low over `length` bars
+    '''
+    highest = np.full(high.shape, np.nan)
+    lowest = np.full(low.shape, np.nan)
+    if len(high) < length:
+        return highest, lowest
+
+    highest[length - 1:] = np.lib.stride_tricks.sliding_window_view(high, length, axis=0).max(axis=-1)
+    lowest[length - 1:] = np.lib.stride_tricks.sliding_window_view(low, length, axis=0).min(axis=-1)
+
+    return highest, lowest
+
+
+_Indicator = Callable[[Dict[str, np.ndarray], int], List[np.ndarray]]
+
+INDICATORS: Dict[str, Tuple[_Indicator, Callable[[int], int]]] = {
+    # name: (function of the bars, warm-up bars before values match a series of the whole history)
+    'sma': (lambda b, n: [sma(b['close'], n)], lambda n: n),
+    'ema': (lambda b, n: [ema(b['close'], n)], lambda n: 10 * n),
+    'bbands': (lambda b, n: list(bbands(b['close'], n)), lambda n: n),
+    'rsi': (lambda b, n: [rsi(b['close'], n)], lambda n: 10 * n),
+    'atr': (lambda b, n: [atr(b['high'], b['low'], b['close'], n)], lambda n: 10 * n),
+    'highlow': (lambda b, n: list(highlow(b['high'], b['low'], n)), lambda n: n),
+}
+
+
+def parse_chart(chart: str) -> Tuple[str, int]:
+    '''
+    This function splits a chart name into indicator and length, `bbands20` is `('bbands', 20)`
+    '''
+    match = re.fullmatch(r'([a-z]+)(\d+)', chart)
+    if match is None:
+        return chart, None
+
+    return match.group(1), int(match.group(2))
+
+
+def split_charts(charts: List[str]) -> Tuple[List[str], List[str]]:
+    '''
+    This function splits charts into those computed locally and those requested from the server;
+    charts known locally are computed locally unless suffixed by `@server`
+    '''
+    local, server = [], []
+
+    for chart in charts or []:
+        if chart.endswith(SERVER_SUFFIX):
+            server.append(chart.removesuffix(SERVER_SUFFIX))
+        elif parse_chart(chart)[0] in INDICATORS and parse_chart(chart)[1]:
+            local.append(chart)
+        else:
+            server.append(chart)
+
+    return local, server
+
+
+def warmup(charts: List[str]) -> int:
+    rst = 0
+
+    for chart in charts:
+        name, length = parse_chart(chart)
+        rst = max(rst, INDICATORS[name][1](length))
+
+    return rst
+
+
+def columns(chart: str, count: int) -> List[str]:
+    if count > 1:
+        return [f'{chart}_{i}' for i in range(1, count + 1)]
+
+    return [chart]
+
+
+def add_indicators(ohlcv: pd.DataFrame,
+                   charts: List[str],
+                   tail: int = None) -> pd.DataFrame:
+    '''
+    This function adds the columns of local charts to an `ohlcv` frame indexed by `(timestamp, symbol)`,
+    named as the server names study columns (`ema10`, `bbands20_1`, ...); with `tail`,
+    only the last `tail` bars of each symbol are kept
+    '''
+    if ohlcv.empty or not charts:
+        return ohlcv
+
+    codes, uniques = pd.factorize(ohlcv.index.get_level_values('symbol'))
+    counts = np.bincount(codes)
+
+    # position of each bar in the history of its symbol, rows keep their order
+    order = np.argsort(ohlcv.index.get_level_values('timestamp'), kind='stable')
+    pos = np.empty(len(order), dtype=np.int64)
+    pos[order] = pd.Series(codes[order]).groupby(codes[order]).cumcount().to_numpy()
+
+    # right-align each symbol so the latest bars share the last row
+    rows = counts.max() - counts[codes] + pos
+    shape = (counts.max(), len(uniques))
+
+    bars = {}
+    for i in ['open', 'high', 'low', 'close', 'volume']:
+        if i not in ohlcv:
+            continue
+
+        values = np.full(shape, np.nan)
+        values[rows, codes] = ohlcv[i].to_numpy(dtype=np.float64)
+        bars[i] = values
+
+    ohlcv = ohlcv.copy()
+
+    for chart in charts:
+        name, length = parse_chart(chart)
+        outputs = INDICATORS[name][0](bars, length)
+
+        for column, values in zip(columns(chart, len(outputs)), outputs):
+            ohlcv[column] = values[rows, codes]
+
+    if tail is not None:
+        ohlcv = ohlcv[pos >= counts[codes] - tail]
+
+    return ohlcv
+
+
+def _recursive(x: np.ndarray, length: int, alpha: float) -> np.ndarray:
+    '''
+    This function runs `y = alpha * x + (1 - alpha) * y[-1]` seeded by the first `length`-bar average, as Pine does;
+    the loop is over bars only, each step updates every symbol at once
+    '''
+    seed = sma(x, length)
+    rst = np.full(x.shape, np.nan)
+
+    if not len(x):
+        return rst
+
+    prev = seed[0]
+    rst[0] = prev
+
+    for t in range(1, len(x)):
+        prev = np.where(np.isnan(prev), seed[t], alpha * x[t] + (1 - alpha) * prev)
+        rst[t] = prev
+
+    return rst
+
@@ -1,17 +1,27 @@
-from os.path import exists, join
-from typing import List, Union
+from typing import List, Optional, Union
 
 import pandas as pd
 import pytz
 
 from data_providers.enums import Adjustment
+from data_providers.store import OHLCVStore
 from data_providers.tradingview.tradingview import TradingView
 
 
 class Local(TradingView):
+    STORE_PATH: str = '/tmp/market_data'
+    STORE_MAX_BYTES: int = 1 << 30
+    # requests are keyed by their number of candles, not a date, so stored bars must age out
+    STORE_TTL: Optional[float] = 60 * 60
+
+    _store: Optional[OHLCVStore] = None
+
     @property
-    def filename(self):
-        return join('/tmp', f'{hex(id(self))}.h5')
+    def store(self) -> OHLCVStore:
+        if self._store is None:
+            self._store = OHLCVStore(self.STORE_PATH, max_bytes=self.STORE_MAX_BYTES, ttl=self.STORE_TTL)
+
+        return self._store
 
     def ohlcv(self,
               symbols: Union[str, List[str]],
@@ -19,24 +29,13 @@ class Local(TradingView):
               total_candles: int,
               charts: List[str] = None,
               adjustment=Adjustment.DIVIDENDS,
-              tzinfo: pytz.BaseTzInfo = pytz.UTC) -> pd.DataFrame:
-
-        df: pd.DataFrame
-
-        if exists(self.filename):
-            with pd.HDFStore(self.filename) as store:
-                df = store.get('ohlcv')
-                if 'symbol' and 'timestamp' in df:
-                    df = df.set_index(['symbol', 'timestamp'])
-        else:
-            df = super().ohlcv(symbols,
-                               freq,
-                               total_candles,
-                               charts,
-                               adjustment,
-                               tzinfo)
-
-            with pd.HDFStore(self.filename) as store:
-                store.put('ohlcv', df.reset_index())
-
-        return df
+              tzinfo: pytz.BaseTzInfo = pytz.UTC,
+              columns: List[str] = None) -> pd.DataFrame:
+        return self.store.ohlcv(super().ohlcv,
+                                symbols,
+                                freq,
+                                total_candles,
+                                charts,
+                                adjustment,
+                                tzinfo,
+                                columns)
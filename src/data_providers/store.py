@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from contextlib import contextmanager, suppress
+from os.path import getsize, join
+from time import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytz
+
+from data_providers.enums import Adjustment
+
+_STORE_VERSION = 1
+
+
+class ParquetStore:
+    '''
+    This class keeps frames on disk as Parquet files partitioned per frequency and symbol,
+    `{root}/{freq}/{symbol}/{digest}.parquet`, where the digest is computed from the request parameters
+    '''
+
+    def __init__(self,
+                 root: str,
+                 max_bytes: int = 1 << 30,
+                 ttl: Optional[float] = None) -> None:
+        self._root = root
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def root(self) -> str:
+        return self._root
+
+    @property
+    def size(self) -> int:
+        return sum(getsize(i) for i, _ in self._files())
+
+    def path(self, symbol: str, freq: str, params: Dict[str, Any]) -> str:
+        key = json.dumps({'v': _STORE_VERSION, 'symbol': symbol, 'freq': freq, **params},
+                         sort_keys=True, default=str)
+        digest = hashlib.sha1(key.encode()).hexdigest()
+
+        return join(self._root, _safe_name(freq), _safe_name(symbol), f'{digest}.parquet')
+
+    def read(self,
+             symbol: str,
+             freq: str,
+             params: Dict[str, Any],
+             columns: List[str] = None) -> Optional[pd.DataFrame]:
+        path = self.path(symbol, freq, params)
+
+        try:
+            if self._ttl is not None and time() - os.stat(path).st_mtime > self._ttl:
+                return None
+
+            table = pq.read_table(path, columns=columns, memory_map=True)
+        except (FileNotFoundError, pa.ArrowInvalid):
+            # missing, evicted by another process or not a complete file
+            return None
+
+        # access time drives eviction; mtime stays the write time used by ttl
+        with suppress(OSError):
+            os.utime(path, (time(), os.stat(path).st_mtime))
+
+        return table.to_pandas()
+
+    def write(self,
+              symbol: str,
+              freq: str,
+              params: Dict[str, Any],
+              df: pd.DataFrame,
+              evict=True) -> None:
+        '''
+        This method stores df; a batch of writes passes `evict=False` and evicts once it is done,
+        as eviction walks the whole store
+        '''
+        with atomic_write(self.path(symbol, freq, params)) as tmp:
+            pq.write_table(pa.Table.from_pandas(df), tmp)
+
+        if evict:
+            self.evict()
+
+    def evict(self) -> None:
+        '''
+        This method removes least recently read files until the store fits `max_bytes`
+        '''
+        files = [(getsize(i), stat.st_atime, i) for i, stat in self._files()]
+        size = sum(i[0] for i in files)
+
+        for file_size, _, path in sorted(files, key=lambda x: x[1]):
+            if size <= self._max_bytes:
+                break
+
+            with suppress(FileNotFoundError):
+                os.remove(path)
+
+            size -= file_size
+
+    def clear(self) -> None:
+        for path, _ in self._files():
+            with suppress(FileNotFoundError):
+                os.remove(path)
+
+    def _files(self):
+        for directory, _, filenames in os.walk(self._root):
+            for filename in filenames:
+                if not filename.endswith('.parquet'):
+                    continue
+
+                path = join(directory, filename)
+                with suppress(FileNotFoundError):
+                    yield path, os.stat(path)
+
+
+class OHLCVStore(ParquetStore):
+    '''
+    This class is a read-through cache of `DataProvider.ohlcv`; each symbol of a request is stored on its own,
+    so a later request reuses the symbols it shares with earlier ones
+    '''
+
+    def ohlcv(self,
+              fetch: Callable[..., pd.DataFrame],
+              symbols: Union[str, List[str]],
+              freq: str,
+              total_candles: int,
+              charts: List[str] = None,
+              adjustment=Adjustment.DIVIDENDS,
+              tzinfo: Union[str, pytz.BaseTzInfo] = pytz.UTC,
+              columns: List[str] = None) -> pd.DataFrame:
+        if isinstance(symbols, str):
+            symbols = [symbols]
+
+        if isinstance(tzinfo, str):
+            tzinfo = pytz.timezone(tzinfo)
+
+        params = {
+            'total_candles': total_candles,
+            'charts': sorted(charts or []),
+            'adjustment': adjustment.value,
+        }
+
+        dfs: Dict[str, pd.DataFrame] = {}
+        missing = []
+
+        for symbol in dict.fromkeys(symbols):
+            df = self.read(symbol, freq, params, columns=None if columns is None else ['Date', *columns])
+
+            if df is None:
+                missing.append(symbol)
+            else:
+                dfs[symbol] = df.set_index('Date')
+
+        if missing or not dfs:
+            ohlcv = fetch(missing, freq, total_candles, charts, adjustment, pytz.UTC)
+
+            for symbol, df in ohlcv.groupby(level='Symbol', sort=False):
+                df = df.droplevel('Symbol')
+                df.columns.name = None
+
+                self.write(symbol, freq, params, df.reset_index(), evict=False)
+                dfs[symbol] = df if columns is None else df[columns]
+
+            self.evict()
+
+            if not dfs:
+                # no bars for any symbol, the frame as the provider returned it
+                return ohlcv
+
+        df = pd.concat({i: dfs[i] for i in dict.fromkeys(symbols) if i in dfs}, names=['Symbol', 'Date']).swaplevel(0, 1)
+        df.index = df.index.set_levels(df.index.levels[0].tz_convert(tzinfo), level='Date')
+        df.rename_axis(axis=1, inplace=True, mapper='Field')
+
+        return df
+
+
+def write_chunks(path: str, chunks: Iterable[pd.DataFrame]) -> int:
+    '''
+    This function streams frames into one Parquet file, a row group per frame, so memory holds a single chunk;
+    the file appears atomically once every chunk is written and the number of rows is returned
+    '''
+    chunks = iter(chunks)
+    chunk = next(chunks, None)
+    rows = 0
+
+    # without any chunk no file appears
+    if chunk is None:
+        return rows
+
+    table = pa.Table.from_pandas(chunk.reset_index(), preserve_index=False)
+
+    with atomic_write(path) as tmp, pq.ParquetWriter(tmp, table.schema) as writer:
+        while True:
+            writer.write_table(table)
+            rows += len(chunk)
+
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+
+            table = pa.Table.from_pandas(chunk.reset_index(), preserve_index=False)
+
+    return rows
+
+
+@contextmanager
+def atomic_write(path: str) -> Iterator[str]:
+    '''
+    This function yields a temporary path next to `path` which replaces `path` once the block completes,
+    so readers of other processes see either the previous file or the complete new one
+    '''
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+
+    try:
+        yield tmp
+
+        os.replace(tmp, path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(tmp)
+        raise
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[^\w.-]', '_', str(name))
@@ -0,0 +1,216 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from math import nan, sqrt
+from typing import Deque, Dict, List, Tuple
+
+from data_providers.indicators import columns, parse_chart
+
+
+class StreamingIndicator(ABC):
+    '''
+    This class is the state of one indicator over a live series; the state only holds closed bars and
+    the forming bar is evaluated on top of it, so revising the forming bar or opening a new one costs O(1)
+    '''
+    outputs = 1
+
+    def __init__(self, length: int) -> None:
+        self._length = length
+        self._time: float = None
+        self._forming: Tuple[float, float, float] = None
+        self._values: Tuple[float, ...] = (nan,) * self.outputs
+
+    @property
+    def values(self) -> Tuple[float, ...]:
+        return self._values
+
+    def update(self, time: float, high: float, low: float, close: float) -> Tuple[float, ...]:
+        '''
+        This method takes a bar of timestamp `time`: the same timestamp revises the forming bar,
+        a later one closes it and opens the next; revisions of older bars are ignored
+        '''
+        if self._time is not None:
+            if time < self._time:
+                return self._values
+
+            if time > self._time:
+                self._close(*self._forming)
+
+        self._time = time
+        self._forming = (high, low, close)
+        self._values = self._evaluate(high, low, close)
+
+        return self._values
+
+    @abstractmethod
+    def _evaluate(self, high: float, low: float, close: float) -> Tuple[float, ...]:
+        pass
+
+    @abstractmethod
+    def _close(self, high: float, low: float, close: float) -> None:
+        pass
+
+
+class StreamingEMA(StreamingIndicator):
+    '''
+    This class is `ta.ema` of Pine: seeded by the average of the first `length` closes
+    '''
+
+    def __init__(self, length: int) -> None:
+        super().__init__(length)
+        self._alpha = 2 / (length + 1)
+        self._ema: float = None
+        self._sum = 0.
+        self._count = 0
+
+    def _evaluate(self, high: float, low: float, close: float) -> Tuple[float]:
+        if self._ema is not None:
+            return self._alpha * close + (1 - self._alpha) * self._ema,
+
+        if self._count + 1 == self._length:
+            return (self._sum + close) / self._length,
+
+        return nan,
+
+    def _close(self, high: float, low: float, close: float) -> None:
+        if self._ema is not None:
+            self._ema = self._evaluate(high, low, close)[0]
+            return
+
+        self._sum += close
+        self._count += 1
+
+        if self._count == self._length:
+            self._ema = self._sum / self._length
+
+
+class StreamingBands(StreamingIndicator):
+    '''
+    This class is the rolling mean and population deviation of closes, `(basis, upper, lower)` as Bollinger Bands
+    '''
+    outputs = 3
+
+    def __init__(self, length: int, mult: float = 2) -> None:
+        super().__init__(length)
+        self._mult = mult
+        # the last `length - 1` closed bars, the forming bar completes the window
+        self._window: Deque[float] = deque()
+        self._sum = 0.
+        self._sumsq = 0.
+        self._closed = 0
+
+    def _evaluate(self, high: float, low: float, close: float) -> Tuple[float, float, float]:
+        if len(self._window) < self._length - 1:
+            return nan, nan, nan
+
+        mean = (self._sum + close) / self._length
+        dev = self._mult * sqrt(max((self._sumsq + close * close) / self._length - mean * mean, 0))
+
+        return mean, mean + dev, mean - dev
+
+    def _close(self, high: float, low: float, close: float) -> None:
+        if self._length == 1:
+            return
+
+        if len(self._window) == self._length - 1:
+            oldest = self._window.popleft()
+            self._sum -= oldest
+            self._sumsq -= oldest * oldest
+
+        self._window.append(close)
+        self._sum += close
+        self._sumsq += close * close
+        self._closed += 1
+
+        # running sums drift, they are recomputed once per window so the cost stays O(1) amortized
+        if self._closed % self._length == 0:
+            self._sum = sum(self._window)
+            self._sumsq = sum(i * i for i in self._window)
+
+
+class StreamingSMA(StreamingBands):
+    outputs = 1
+
+    def _evaluate(self, high: float, low: float, close: float) -> Tuple[float]:
+        return super()._evaluate(high, low, close)[0],
+
+
+class StreamingHighLow(StreamingIndicator):
+    '''
+    This class is the highest high and lowest low over `length` bars, kept in monotonic queues
+    '''
+    outputs = 2
+
+    def __init__(self, length: int) -> None:
+        super().__init__(length)
+        self._highs: Deque[Tuple[int, float]] = deque()
+        self._lows: Deque[Tuple[int, float]] = deque()
+        self._closed = 0
+
+    def _evaluate(self, high: float, low: float, close: float) -> Tuple[float, float]:
+        if self._closed < self._length - 1:
+            return nan, nan
+
+        highest = max(self._highs[0][1], high) if self._highs else high
+        lowest = min(self._lows[0][1], low) if self._lows else low
+
+        return highest, lowest
+
+    def _close(self, high: float, low: float, close: float) -> None:
+        if self._length == 1:
+            self._closed += 1
+            return
+
+        i = self._closed
+        self._closed += 1
+
+        while self._highs and self._highs[-1][1] <= high:
+            self._highs.pop()
+        self._highs.append((i, high))
+
+        while self._lows and self._lows[-1][1] >= low:
+            self._lows.pop()
+        self._lows.append((i, low))
+
+        # only the last `length - 1` closed bars join the forming one
+        for queue in (self._highs, self._lows):
+            while queue[0][0] <= i - (self._length - 1):
+                queue.popleft()
+
+
+STREAMING_INDICATORS = {
+    'ema': StreamingEMA,
+    'sma': StreamingSMA,
+    'bbands': StreamingBands,
+    'highlow': StreamingHighLow,
+}
+
+
+class StreamingIndicators:
+    '''
+    This class keeps the streaming state of several charts, named as `add_indicators` names them
+    '''
+
+    def __init__(self, charts: List[str] = None) -> None:
+        self._charts = charts or []
+        self._indicators: Dict[str, StreamingIndicator] = {}
+
+        for chart in self._charts:
+            name, length = parse_chart(chart)
+
+            if name not in STREAMING_INDICATORS or not length:
+                raise ValueError(f'"{chart}" has no streaming implementation')
+
+            self._indicators[chart] = STREAMING_INDICATORS[name](length)
+
+    @property
+    def charts(self) -> List[str]:
+        return self._charts
+
+    def update(self, time: float, high: float, low: float, close: float) -> Dict[str, float]:
+        rst = {}
+
+        for chart, indicator in self._indicators.items():
+            values = indicator.update(time, high, low, close)
+            rst.update(zip(columns(chart, indicator.outputs), values))
+
+        return rst
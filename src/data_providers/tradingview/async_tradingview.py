@@ -0,0 +1,375 @@
+import asyncio
+from datetime import datetime
+from logging import INFO, StreamHandler, getLogger
+from time import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+import pytz
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+from data_providers.correlation import CorrelationStates, RollingCorrelation
+from data_providers.data_provider import AsyncDataProvider
+from data_providers.enums import Adjustment
+from data_providers.indicators import add_indicators, split_charts, warmup
+from data_providers.tradingview.async_tradingview_client import \
+    AsyncTradingViewClient
+from data_providers.tradingview.bar_cache import BarCache, freq_seconds
+from data_providers.tradingview.quote_cache import QuoteCache
+from data_providers.tradingview.quote_hub import QuoteHub, QuoteSubscription
+from data_providers.tradingview.realtime_bars import RealtimeBars
+from data_providers.tradingview.tradingview import (_build_quote_batch,
+                                                    _build_quotes,
+                                                    _correlation_candles,
+                                                    _correlation_closes,
+                                                    _correlation_periods,
+                                                    _format_ohlcv,
+                                                    _ordered_quotes,
+                                                    _ordered_statuses,
+                                                    _perf_horizons,
+                                                    _perf_ohlcv,
+                                                    _put_quotes,
+                                                    _quote_fields,
+                                                    _scan_payload)
+from infra.http import HttpClient
+from models.data_models import PartialQuotes, Quote
+from models.quote_batch import QuoteBatch
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+logger.addHandler(StreamHandler())
+
+
+class AsyncTradingView(AsyncDataProvider):
+    _tv: Optional[AsyncTradingViewClient] = None
+    _quote_hub: Optional[QuoteHub] = None
+    _quote_cache: Optional[QuoteCache] = None
+    _bar_cache: Optional[BarCache] = None
+    _correlation_states: Optional[CorrelationStates] = None
+    _watches: Optional[Dict[str, asyncio.Task]] = None
+    username: str = ''
+    password: str = ''
+    TOKEN: str = ''
+    TOKEN_TTL: float = 12 * 60 * 60
+    TOKEN_PATH: str = None
+    market: str = ''
+    WS_URL: str = None
+    WS_POOL_SIZE: int = 4
+    WS_MAX_SESSIONS_PER_SOCKET: int = 50
+    WS_IDLE_TIMEOUT: int = 300
+    WS_SESSIONS_PER_SHARD: int = None
+    REALTIME_QUEUE_SIZE: int = 100
+    QUOTE_CACHE_SIZE: int = 1000
+    QUOTE_CACHE_HOT_AFTER: int = 3
+    QUOTE_CACHE_MAX_LIVE: int = 100
+    BAR_CACHE_SIZE: int = 2000
+    QUOTES_DEADLINE: float = 30
+    VALIDATE_QUOTES: bool = False
+    HTTP_CONCURRENCY: int = 16
+    SEARCH_CACHE_SIZE: int = 10000
+    SEARCH_CACHE_TTL: float = 24 * 60 * 60
+    SYMBOL_DIRECTORY_PATH: str = None
+    CALENDAR_TTL: float = 24 * 60 * 60
+    CALENDAR_RECENT_TTL: float = 5 * 60
+    RELATED_EVENTS_TTL: float = 60 * 60
+    CORRELATION_STATE_DIR: str = None
+    CORRELATION_REFRESH: float = 60 * 60
+    CORRELATION_UNIVERSE_TTL: float = 7 * 24 * 60 * 60
+    HTTP: HttpClient = None
+
+    @property
+    def tv(self) -> AsyncTradingViewClient:
+        if not self._tv:
+            self._tv = AsyncTradingViewClient(self.username, self.password, self.TOKEN, self.market,
+                                              pool_size=self.WS_POOL_SIZE,
+                                              max_sessions_per_socket=self.WS_MAX_SESSIONS_PER_SOCKET,
+                                              idle_timeout=self.WS_IDLE_TIMEOUT,
+                                              http_concurrency=self.HTTP_CONCURRENCY,
+                                              ws_url=self.WS_URL,
+                                              token_ttl=self.TOKEN_TTL,
+                                              token_path=self.TOKEN_PATH,
+                                              search_cache_size=self.SEARCH_CACHE_SIZE,
+                                              search_cache_ttl=self.SEARCH_CACHE_TTL,
+                                              symbol_directory_path=self.SYMBOL_DIRECTORY_PATH,
+                                              calendar_ttl=self.CALENDAR_TTL,
+                                              calendar_recent_ttl=self.CALENDAR_RECENT_TTL,
+                                              related_events_ttl=self.RELATED_EVENTS_TTL,
+                                              http=self.HTTP)
+
+        return self._tv
+
+    @property
+    def quote_hub(self) -> QuoteHub:
+        if not self._quote_hub:
+            # all quote fields are subscribed so the cache of hot symbols can answer default requests
+            # values are not current while the hub reconnects
+            self._quote_hub = QuoteHub(self.tv, fields=_quote_fields(), queue_size=self.REALTIME_QUEUE_SIZE,
+                                       on_lost=self.quote_cache.clear_live)
+
+        return self._quote_hub
+
+    @property
+    def quote_cache(self) -> QuoteCache:
+        if self._quote_cache is None:
+            self._quote_cache = QuoteCache(max_size=self.QUOTE_CACHE_SIZE, hot_after=self.QUOTE_CACHE_HOT_AFTER)
+
+        return self._quote_cache
+
+    @property
+    def bar_cache(self) -> BarCache:
+        if self._bar_cache is None:
+            self._bar_cache = BarCache(max_size=self.BAR_CACHE_SIZE)
+
+        return self._bar_cache
+
+    @property
+    def correlation_states(self) -> CorrelationStates:
+        if self._correlation_states is None:
+            self._correlation_states = CorrelationStates(self.CORRELATION_STATE_DIR)
+
+        return self._correlation_states
+
+    async def search(self,
+                     symbols: List[str],
+                     params: Dict[str, Any] = None) -> Dict[str, Union[None, Dict[str, Any]]]:
+        if params is None:
+            params = {}
+
+        rst = await self.tv.search_multi(queries=symbols, params=params)
+
+        return rst
+
+    @retry(wait=wait_exponential(multiplier=1, min=4, max=10), stop=stop_after_attempt(3))
+    async def quotes(self,
+                     symbols: Union[str, List[str]],
+                     fields: List[str] = None,
+                     max_age: float = None,
+                     partial=False,
+                     columnar=False) -> Union[Quote, Dict[str, Quote], PartialQuotes, QuoteBatch]:
+        if partial and isinstance(symbols, str):
+            symbols = [symbols]
+
+        fields = _quote_fields(fields)
+        horizons = _perf_horizons(fields)
+
+        ohlcv: pd.DataFrame = None
+
+        if horizons:
+            (quotes, statuses), _ohlcv = await asyncio.gather(self._current_quotes(symbols, fields, max_age, partial),
+                                                              self.ohlcv(symbols=symbols,
+                                                                         freq='1D',
+                                                                         total_candles=252 * 2,
+                                                                         tzinfo='America/Chicago'))
+            ohlcv = _perf_ohlcv(_ohlcv)
+        else:
+            quotes, statuses = await self._current_quotes(symbols, fields, max_age, partial)
+
+        if columnar:
+            return _build_quote_batch(symbols, quotes, ohlcv, fields, horizons, statuses if partial else None)
+
+        rst = _build_quotes(symbols, quotes, ohlcv, fields, horizons, self.VALIDATE_QUOTES)
+
+        if partial:
+            return PartialQuotes(quotes=rst, status=statuses)
+
+        return rst
+
+    async def _current_quotes(self,
+                              symbols: Union[str, List[str]],
+                              fields: List[str],
+                              max_age: float = None,
+                              partial=False) -> Tuple[Union[Dict[str, Any], Dict[str, Dict[str, Any]]], Dict[str, str]]:
+        _symbols = [symbols] if isinstance(symbols, str) else symbols
+
+        for i in _symbols:
+            if self.quote_cache.touch(i):
+                self._watch(i)
+
+        quotes, missing = self.quote_cache.lookup(_symbols, fields, max_age)
+        statuses = dict.fromkeys(quotes, 'ok')
+
+        if missing and partial:
+            fresh, _statuses = await self.tv.current_quotes_partial(missing, fields=fields,
+                                                                    deadline=self.QUOTES_DEADLINE)
+            quotes.update(fresh)
+            statuses.update(_statuses)
+
+            _put_quotes(self.quote_cache, {k: v for k, v in fresh.items() if _statuses.get(k) == 'ok'}, fields)
+        elif missing:
+            fresh = await self.tv.current_quotes(missing, fields=fields)
+            quotes.update(_put_quotes(self.quote_cache, fresh, fields))
+            statuses.update(dict.fromkeys(fresh, 'ok'))
+
+        return _ordered_quotes(symbols, quotes), _ordered_statuses(_symbols, statuses)
+
+    def _watch(self, symbol: str) -> None:
+        '''
+        This method keeps the cache of a hot symbol current with a background realtime subscription
+        '''
+        if self._watches is None:
+            self._watches = {}
+
+        if symbol in self._watches or len(self._watches) >= self.QUOTE_CACHE_MAX_LIVE:
+            return
+
+        async def _consume():
+            subscription = None
+
+            try:
+                subscription = await self.quote_hub.subscribe([symbol])
+
+                async for update in subscription:
+                    for k, v in update.items():
+                        self.quote_cache.put(k, v)
+
+                    # fields are trusted only once the subscription delivered them
+                    self.quote_cache.set_live(symbol, self.quote_hub.fields)
+            except Exception as e:
+                logger.warning('Quote cache of %s is not kept current "%s"', symbol, e)
+            finally:
+                self.quote_cache.unset_live(symbol)
+                self._watches.pop(symbol, None)
+
+                if subscription is not None:
+                    await self.quote_hub.unsubscribe(subscription)
+
+        self._watches[symbol] = asyncio.create_task(_consume())
+
+    async def ohlcv(self,
+                    symbols: Union[str, List[str]],
+                    freq: str,
+                    total_candles: int,
+                    charts: List[str] = None,
+                    adjustment=Adjustment.DIVIDENDS,
+                    tzinfo: Union[str, pytz.BaseTzInfo] = pytz.UTC) -> pd.DataFrame:
+        if isinstance(symbols, str):
+            symbols = [symbols]
+
+        local_charts, server_charts = split_charts(charts)
+        # local charts are computed over earlier bars too, so their first values are settled
+        candles = total_candles + warmup(local_charts)
+
+        # study values depend on the requested history, so only plain series are cached
+        if server_charts or freq_seconds(freq) is None:
+            ohlcv = await self._fetch_ohlcv(symbols, freq, candles, server_charts, adjustment.value)
+        else:
+            for _candles, _symbols in self.bar_cache.plan(symbols, freq, adjustment.value, candles).items():
+                ohlcv = await self._fetch_ohlcv(_symbols, freq, _candles, [], adjustment.value)
+                self.bar_cache.update(ohlcv, freq, adjustment.value, _candles)
+
+            ohlcv = self.bar_cache.window(symbols, freq, adjustment.value, candles)
+
+        ohlcv = add_indicators(ohlcv, local_charts, tail=total_candles + 1)
+
+        return _format_ohlcv(ohlcv, tzinfo)
+
+    async def _fetch_ohlcv(self,
+                           symbols: List[str],
+                           freq: str,
+                           total_candles: int,
+                           charts: List[str],
+                           adjustment: str) -> pd.DataFrame:
+        ohlcv, timings = await self.tv.ohlcv_sharded(symbols=symbols,
+                                                     freq=freq,
+                                                     total_candles=total_candles,
+                                                     charts=charts,
+                                                     adjustment=adjustment,
+                                                     shard_size=self.WS_SESSIONS_PER_SHARD)
+
+        for i in timings:
+            logger.info('OHLCV shard %s: %s symbols in %.3f seconds', i.shard, i.symbols, i.seconds)
+
+        return ohlcv
+
+    async def symbols(self, prefix: str, limit: int = 20) -> List[Dict[str, Any]]:
+        '''
+        This method returns known symbols whose pro name, ticker or alias starts with `prefix`, without any request
+        '''
+        return self.tv.symbol_directory.prefix(prefix, limit)
+
+    async def economic_calendar(self,
+                                from_date: Union[str, datetime],
+                                to_date: Union[str, datetime],
+                                countries: List[str] = None,
+                                fetch_related_events=False) -> List[Dict[str, Any]]:
+        if isinstance(from_date, datetime):
+            from_date = from_date.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+        if isinstance(to_date, datetime):
+            to_date = to_date.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+        if countries is None:
+            countries = ['US']
+
+        rst = await self.tv.economic_calendar(from_date,
+                                              to_date,
+                                              countries,
+                                              fetch_related_events)
+
+        return rst
+
+    async def correlations(self,
+                           markets: Union[List[str]] = None,
+                           exchanges: Union[List[str]] = None,
+                           sort: Union[str, str] = None,
+                           topn: int = None,
+                           freq: int = '1D',
+                           total_candles: int = 252,
+                           tzinfo=None,
+                           periods=['1D', '5D', '10D', '21D'],
+                           top_k: int = 1) -> pd.DataFrame:
+        '''
+        This method returns the `top_k` most correlated symbols of each of the `topn` symbols of markets by `sort`,
+        for forward returns over each of `periods`, from a rolling state of the query as `TradingView` does
+        '''
+        key = CorrelationStates.key(markets=markets, exchanges=exchanges, sort=sort, topn=topn, freq=freq,
+                                    total_candles=total_candles, tzinfo=tzinfo)
+        state = await asyncio.to_thread(self.correlation_states.get, key)
+
+        candles = _correlation_candles(state, periods, freq, total_candles,
+                                       self.CORRELATION_REFRESH, self.CORRELATION_UNIVERSE_TTL)
+
+        # sums and matrix products run off the loop, they release the GIL
+        if candles is None:
+            assets = await self.tv.scan(_scan_payload(markets, exchanges, sort, topn))
+            symbols = pd.DataFrame(assets)['s']
+
+            ohlcv = await self.ohlcv(symbols=list(symbols),
+                                     freq=freq,
+                                     total_candles=total_candles,
+                                     tzinfo=tzinfo)
+
+            state = await asyncio.to_thread(RollingCorrelation.from_closes,
+                                            _correlation_closes(ohlcv),
+                                            _correlation_periods(state, periods),
+                                            total_candles)
+            await asyncio.to_thread(self.correlation_states.put, key, state)
+        elif candles:
+            ohlcv = await self.ohlcv(symbols=state.symbols,
+                                     freq=freq,
+                                     total_candles=candles,
+                                     tzinfo=tzinfo)
+
+            await asyncio.to_thread(state.extend, _correlation_closes(ohlcv))
+            state.refreshed_at = time()
+            await asyncio.to_thread(self.correlation_states.put, key, state)
+
+        rst = await asyncio.to_thread(state.correlations, periods, top_k)
+
+        return rst
+
+    async def subscribe_quotes(self, symbols: List[str]) -> QuoteSubscription:
+        return await self.quote_hub.subscribe(symbols)
+
+    async def unsubscribe_quotes(self, subscription: QuoteSubscription) -> None:
+        await self.quote_hub.unsubscribe(subscription)
+
+    def realtime_bars(self,
+                      symbol: str,
+                      freq: str,
+                      charts: List[str] = None,
+                      adjustment=Adjustment.DIVIDENDS) -> RealtimeBars:
+        '''
+        This method follows the forming bar of symbol with streaming indicators, e.g. `ema10`, `bbands20`, `highlow20`
+        '''
+        return RealtimeBars(self.tv, symbol, freq, charts, adjustment.value)
@@ -0,0 +1,475 @@
+import asyncio
+import json
+from time import monotonic
+from typing import Any, AsyncIterator, Dict, List, Tuple, Union
+
+import httpx
+import pandas as pd
+
+from data_providers.tradingview import tradingview_client
+from data_providers.tradingview.calendar_cache import (CalendarRange,
+                                                       EconomicCalendarCache)
+from data_providers.tradingview.connection_pool import AsyncConnectionPool
+from data_providers.tradingview.protocol import (FrameDecoder, asend_heartbeat,
+                                                 asend_message,
+                                                 generate_session,
+                                                 is_heartbeat)
+from data_providers.tradingview.quote_state import QuoteSessionState
+from data_providers.tradingview.search_cache import (SearchCache, SearchKey,
+                                                     search_keys)
+from data_providers.tradingview.sharding import (ShardTiming, afetch_sharded,
+                                                 plan_shards)
+from data_providers.tradingview.symbol_directory import (SymbolDirectory,
+                                                         symbol_directory)
+from data_providers.tradingview.token_manager import (TokenManager,
+                                                      token_manager)
+from data_providers.tradingview.tradingview_client import (
+    _WS_ORIGIN_, _BarChartsCollector, _chart_session_messages,
+    _chart_sessions_completed, _chart_timeout, _economic_calendar_request,
+    _chart_sessions, _economic_calendar_result, _get_auth_token, _named_frame,
+    _ohlcv_frame, _partial_quotes,
+    _quote_session_messages,
+    _quote_timeout, _related_events_request, _related_events_result,
+    _scan_request, _scan_result, _search_request, _search_result)
+from infra.http import HttpClient
+
+
+class AsyncTradingViewClient:
+    '''
+    This class is the asyncio variant of `TradingViewClient`; sockets and HTTP never block the event loop
+    '''
+
+    def __init__(self,
+                 username='',
+                 password='',
+                 token='',
+                 market='',
+                 pool_size=4,
+                 max_sessions_per_socket=50,
+                 idle_timeout=300,
+                 http_concurrency=8,
+                 ws_url: str = None,
+                 token_ttl: float = 12 * 60 * 60,
+                 token_path: str = None,
+                 search_cache_size=10000,
+                 search_cache_ttl: float = 24 * 60 * 60,
+                 symbol_directory_path: str = None,
+                 calendar_ttl: float = 24 * 60 * 60,
+                 calendar_recent_ttl: float = 5 * 60,
+                 related_events_ttl: float = 60 * 60,
+                 http: HttpClient = None) -> None:
+        self._username = username
+        self._password = password
+        self._market = market
+        self._token = token
+        self._pool_size = pool_size
+        self._max_sessions_per_socket = max_sessions_per_socket
+        self._idle_timeout = idle_timeout
+        self._http_concurrency = http_concurrency
+        self._ws_url = ws_url
+        self._token_ttl = token_ttl
+        self._token_path = token_path
+        self._search_cache_size = search_cache_size
+        self._search_cache_ttl = search_cache_ttl
+        self._symbol_directory_path = symbol_directory_path
+        self._calendar_ttl = calendar_ttl
+        self._calendar_recent_ttl = calendar_recent_ttl
+        self._related_events_ttl = related_events_ttl
+        self._token_manager: TokenManager = None
+        self._search_cache: SearchCache = None
+        self._symbol_directory: SymbolDirectory = None
+        self._calendar_cache: EconomicCalendarCache = None
+        self._pool: AsyncConnectionPool = None
+        self._http_client = http
+        # the client is closed with this one only when it is not shared
+        self._owns_http_client = http is None
+        self._http_slots: asyncio.Semaphore = None
+
+    @property
+    def username(self) -> str:
+        return self._username
+
+    @property
+    def password(self) -> str:
+        return self._password
+
+    @property
+    def market(self) -> str:
+        return self._market
+
+    @property
+    def ws_url(self) -> str:
+        return self._ws_url or tradingview_client._WS_URL_
+
+    @property
+    def pool(self) -> AsyncConnectionPool:
+        if not self._pool:
+            self._pool = AsyncConnectionPool(self.ws_url,
+                                             origin=_WS_ORIGIN_,
+                                             token=self.token,
+                                             size=self._pool_size,
+                                             max_sessions=self._max_sessions_per_socket,
+                                             idle_timeout=self._idle_timeout,
+                                             on_auth_error=self._token_rejected)
+
+        return self._pool
+
+    @property
+    def http_client(self) -> HttpClient:
+        if not self._http_client:
+            self._http_client = HttpClient(pool_size=self._http_concurrency)
+
+        return self._http_client
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        return self.http_client.async_session
+
+    @property
+    def http_slots(self) -> asyncio.Semaphore:
+        if not self._http_slots:
+            self._http_slots = asyncio.Semaphore(self._http_concurrency)
+
+        return self._http_slots
+
+    @property
+    def search_cache(self) -> SearchCache:
+        if not self._search_cache:
+            self._search_cache = SearchCache(max_size=self._search_cache_size, ttl=self._search_cache_ttl)
+
+        return self._search_cache
+
+    @property
+    def symbol_directory(self) -> SymbolDirectory:
+        if not self._symbol_directory:
+            self._symbol_directory = symbol_directory(self._symbol_directory_path)
+
+        return self._symbol_directory
+
+    @property
+    def calendar_cache(self) -> EconomicCalendarCache:
+        if not self._calendar_cache:
+            self._calendar_cache = EconomicCalendarCache(ttl=self._calendar_ttl,
+                                                         recent_ttl=self._calendar_recent_ttl,
+                                                         related_ttl=self._related_events_ttl)
+
+        return self._calendar_cache
+
+    @property
+    def token_manager(self) -> TokenManager:
+        if not self._token_manager:
+            self._token_manager = token_manager(lambda: _get_auth_token(self.http_client.session,
+                                                                        self.username,
+                                                                        self.password),
+                                                key=self.username,
+                                                ttl=self._token_ttl,
+                                                path=self._token_path)
+
+        return self._token_manager
+
+    async def token(self) -> str:
+        if self._token:
+            return self._token
+
+        token = self.token_manager.current
+
+        if token is None:
+            # sign-in and file lock block, the manager is shared with threads and sync clients
+            token = await asyncio.to_thread(self.token_manager.get)
+
+        return token
+
+    async def _token_rejected(self, token: str) -> None:
+        # a token given explicitly is not signed in again
+        if not self._token:
+            await asyncio.to_thread(self.token_manager.invalidate, token)
+
+    async def close(self) -> None:
+        if self._pool:
+            await self._pool.close()
+
+        if self._http_client and self._owns_http_client:
+            await self._http_client.aclose()
+
+    async def current_quotes(self,
+                             symbols: Union[str, List[str]],
+                             fields: List[str] = None) -> Union[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        return_single = isinstance(symbols, str)
+        _symbols = [symbols] if return_single else symbols
+
+        sess = generate_session('cs_')
+
+        async with await self.pool.channel(quote_sessions=[sess]) as ws:
+            for func, args in _quote_session_messages(sess, _symbols, fields):
+                await asend_message(ws, func, args)
+
+            rst = await _socket_quote(ws, symbols=symbols)
+
+        quotes = rst[sess]
+
+        if return_single:
+            k = next(iter(quotes.keys()))
+            return quotes[k]
+
+        return quotes
+
+    async def stream_quotes(self,
+                            symbols: List[str],
+                            fields: List[str] = None,
+                            deadline: float = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        async for i in self._stream_quotes(QuoteSessionState(symbols=symbols), symbols, fields, deadline):
+            yield i
+
+    async def current_quotes_partial(self,
+                                     symbols: List[str],
+                                     fields: List[str] = None,
+                                     deadline: float = None) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+        state = QuoteSessionState(symbols=symbols)
+
+        async for _ in self._stream_quotes(state, symbols, fields, deadline):
+            pass
+
+        return _partial_quotes(state)
+
+    async def _stream_quotes(self,
+                             state: QuoteSessionState,
+                             symbols: List[str],
+                             fields: List[str] = None,
+                             deadline: float = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        sess = generate_session('qs_')
+        end = None if deadline is None else monotonic() + deadline
+        decoder = FrameDecoder()
+
+        async with await self.pool.channel(quote_sessions=[sess]) as ws:
+            for func, args in _quote_session_messages(sess, symbols, fields):
+                await asend_message(ws, func, args)
+
+            while not state.completed:
+                try:
+                    msgs = await asyncio.wait_for(ws.recv(), None if end is None else max(end - monotonic(), 0))
+                except asyncio.TimeoutError:
+                    return
+
+                for i in decoder.feed(msgs):
+                    state.feed(json.loads(i))
+
+                for symbol in state.drain_completed():
+                    yield symbol, state.quotes[symbol]
+
+    async def ohlcv(self,
+                    symbols: Union[str, List[str]],
+                    freq: str,
+                    total_candles: int,
+                    charts: List[str] = None,
+                    adjustment='dividends') -> pd.DataFrame:
+        symbols = [symbols] if isinstance(symbols, str) else symbols
+        total_candles += 1  # preserve 1 bar because TradingView returns less than 1 bar
+        charts = charts or []
+
+        # names of one symbol share a chart session
+        names = self.symbol_directory.canonical(symbols)
+        sess_ls, sess_symbol_mapper = _chart_sessions(names)
+        sessions_completed = _chart_sessions_completed(sess_ls, charts)
+        resolved: Dict[str, Dict[str, Any]] = {}
+
+        async with await self.pool.channel(chart_sessions=sess_ls) as ws:
+            for _sess, _symbol in sess_symbol_mapper.items():
+                for func, args in _chart_session_messages(_sess, _symbol, freq, total_candles, charts, adjustment):
+                    await asend_message(ws, func, args)
+
+            df = await _parse_bar_charts(ws, sessions_completed=sessions_completed, resolved=resolved,
+                                         timeout=_chart_timeout(sess_ls))
+
+        self.symbol_directory.add_resolved({sess_symbol_mapper[k]: v for k, v in resolved.items()})
+        await asyncio.to_thread(self.symbol_directory.flush)
+
+        return _named_frame(_ohlcv_frame(df, sess_symbol_mapper), names)
+
+    async def ohlcv_sharded(self,
+                            symbols: Union[str, List[str]],
+                            freq: str,
+                            total_candles: int,
+                            charts: List[str] = None,
+                            adjustment='dividends',
+                            shard_size: int = None) -> Tuple[pd.DataFrame, List[ShardTiming]]:
+        symbols = [symbols] if isinstance(symbols, str) else symbols
+        shards = plan_shards(symbols, min(shard_size or self._max_sessions_per_socket, self._max_sessions_per_socket))
+
+        async def _fetch(_symbols: List[str]) -> pd.DataFrame:
+            return await self.ohlcv(_symbols, freq, total_candles, charts, adjustment)
+
+        return await afetch_sharded(_fetch, shards)
+
+    async def search_multi(self,
+                           queries: List[str],
+                           params: Dict[str, Any]) -> Dict[str, Union[None, Dict[str, Any]]]:
+        keys = search_keys(queries, params)
+
+        rst = self.symbol_directory.search(keys.values())
+        cached, missing = self.search_cache.lookup(i for i in keys.values() if i not in rst)
+        rst.update(cached)
+
+        if missing:
+            # concurrency is bounded by `http_slots`
+            found = dict(zip(missing, await asyncio.gather(*[self._search(i) for i in missing])))
+            self.search_cache.update(found)
+            self.symbol_directory.add_search_results(found)
+            await asyncio.to_thread(self.symbol_directory.flush)
+            rst.update(found)
+
+        resp = {i: rst[keys[i]] for i in queries}
+
+        return resp
+
+    async def search(self,
+                     query: str,
+                     country: str = 'US',
+                     exchange: str = '',
+                     search_type: str = '',
+                     economic_category: str = '',
+                     start: int = 0) -> Union[None,
+                                              Dict[str, Any],
+                                              Dict[str, Union[int, List[Dict[str, Any]]]]]:
+        params = {
+            'country': country,
+            'exchange': exchange,
+            'search_type': search_type,
+            'economic_category': economic_category,
+            'start': start,
+        }
+
+        return (await self.search_multi([query], params))[query]
+
+    async def refresh_symbol_directory(self, queries: List[str] = None) -> Dict[str, int]:
+        keys = list(search_keys(queries or self.symbol_directory.aliases(), {}).values())
+
+        found = dict(zip(keys, await asyncio.gather(*[self._search(i) for i in keys])))
+        self.search_cache.update(found)
+        self.symbol_directory.refresh(found)
+        await asyncio.to_thread(self.symbol_directory.flush, True)
+
+        return self.symbol_directory.stats
+
+    async def _search(self, key: SearchKey) -> Union[None,
+                                                     Dict[str, Any],
+                                                     Dict[str, Union[int, List[Dict[str, Any]]]]]:
+        url, params, headers = _search_request(*key)
+
+        async with self.http_slots:
+            res = await self.http.get(url, params=params, headers=headers)
+
+        return _search_result(key[0], res)
+
+    async def economic_calendar(self,
+                                from_date: str = None,
+                                to_date: str = None,
+                                countries: List[str] = None,
+                                fetch_related_events=False) -> List[Dict[str, Any]]:
+        if from_date is None or to_date is None:
+            result = await self._economic_calendar((from_date, to_date, countries))
+        else:
+            windows = self.calendar_cache.plan(from_date, to_date, countries)
+
+            for window, events in zip(windows, await asyncio.gather(*[self._economic_calendar(i) for i in windows])):
+                self.calendar_cache.update(window, events)
+
+            result = self.calendar_cache.events(from_date, to_date, countries)
+
+        if fetch_related_events:
+            related, missing = self.calendar_cache.related_lookup(i.get('id') for i in result)
+
+            if missing:
+                # concurrency is bounded by `http_slots`
+                fetched = dict(zip(missing, await asyncio.gather(*[self.economic_calendar_related_events(i)
+                                                                   for i in missing])))
+                self.calendar_cache.related_update(fetched)
+                related.update(fetched)
+
+            for i in result:
+                i['events'] = related[i.get('id')]
+
+        return result
+
+    async def _economic_calendar(self, window: CalendarRange) -> List[Dict[str, Any]]:
+        url, params, headers = _economic_calendar_request(*window)
+
+        async with self.http_slots:
+            resp = await self.http.get(url, params=params, headers=headers)
+
+        return _economic_calendar_result(resp)
+
+    async def economic_calendar_related_events(self, event_id: str) -> List[Dict[str, Any]]:
+        url, params, headers = _related_events_request(event_id)
+
+        async with self.http_slots:
+            resp = await self.http.get(url, params=params, headers=headers)
+
+        return _related_events_result(resp)
+
+    async def scan(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        url, data, headers = _scan_request(payload)
+
+        async with self.http_slots:
+            resp = await self.http.post(url, content=data, headers=headers)
+
+        return _scan_result(resp)
+
+
+async def _parse_bar_charts(ws,
+                            sessions_completed: Dict[str, bool],
+                            resolved: Dict[str, Dict[str, Any]] = None,
+                            timeout: float = None) -> pd.DataFrame:
+    collector = _BarChartsCollector(sessions_completed)
+    decoder = FrameDecoder()
+
+    async def _receive():
+        while not collector.completed:
+            msgs = await ws.recv()
+
+            for segment in decoder.feed(msgs):
+                if is_heartbeat(segment):
+                    await asend_heartbeat(ws, segment)
+                    continue
+
+                try:
+                    _segment_data = json.loads(segment)
+                except json.JSONDecodeError:
+                    continue
+
+                collector.feed(_segment_data)
+
+    # one stalled chart session must not hang the caller
+    try:
+        await asyncio.wait_for(_receive(), timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f'expect should be done within {timeout} seconds')
+
+    if resolved is not None:
+        resolved.update(collector.resolved)
+
+    return collector.to_frame()
+
+
+async def _socket_quote(ws, symbols: Union[str, List[str]] = None) -> dict:
+    _symbols = [symbols] if isinstance(symbols, str) else symbols
+    state = QuoteSessionState(symbols=_symbols)
+    decoder = FrameDecoder()
+
+    async def _receive():
+        while not state.completed:
+            msgs = await ws.recv()
+
+            for i in decoder.feed(msgs):
+                if is_heartbeat(i):
+                    await asend_heartbeat(ws, i)
+                    continue
+
+                state.feed(json.loads(i))
+
+    timeout = _quote_timeout(symbols)
+    try:
+        await asyncio.wait_for(_receive(), timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f'expect should be done within {timeout} seconds')
+
+    return state.result()
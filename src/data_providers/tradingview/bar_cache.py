@@ -0,0 +1,145 @@
+import re
+from collections import OrderedDict
+from math import ceil
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+_FREQ_SECONDS = {
+    'S': 1,
+    '': 60,
+    'H': 60 * 60,
+    'D': 24 * 60 * 60,
+    'W': 7 * 24 * 60 * 60,
+    # shortest month, so that the candles elapsed are never undercounted
+    'M': 28 * 24 * 60 * 60,
+}
+
+BarKey = Tuple[str, str, str]
+
+
+class _Entry:
+
+    def __init__(self, bars: pd.DataFrame, depth: int) -> None:
+        self.bars = bars
+        self.depth = depth
+
+
+class BarCache:
+    '''
+    This class keeps the bars of each `(symbol, freq, adjustment)`; once a symbol is cached deep enough,
+    only the bars since its last cached timestamp are requested again and merged over the tail
+    '''
+
+    def __init__(self, max_size: int = 2000) -> None:
+        self._max_size = max_size
+        self._entries: OrderedDict[BarKey, _Entry] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def plan(self,
+             symbols: List[str],
+             freq: str,
+             adjustment: str,
+             total_candles: int) -> Dict[int, List[str]]:
+        '''
+        This method groups symbols by the number of candles to request: the whole window for symbols
+        not cached deep enough, otherwise the candles elapsed since the last cached one (which may still be forming)
+        '''
+        seconds = freq_seconds(freq)
+        now = pd.Timestamp.now(tz='UTC')
+
+        rst: Dict[int, List[str]] = {}
+
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                entry = self._entries.get((symbol, freq, adjustment))
+
+                if seconds is None or entry is None or entry.depth < total_candles or entry.bars.empty:
+                    candles = total_candles
+                else:
+                    elapsed = (now - entry.bars.index[-1]).total_seconds()
+                    candles = min(max(ceil(elapsed / seconds), 1), total_candles)
+
+                rst.setdefault(candles, []).append(symbol)
+
+        return rst
+
+    def update(self,
+               ohlcv: pd.DataFrame,
+               freq: str,
+               adjustment: str,
+               total_candles: int) -> None:
+        '''
+        This method merges an `ohlcv` frame indexed by `(timestamp, symbol)`, fetched with `total_candles`;
+        fetched bars replace cached bars of the same timestamp
+        '''
+        if ohlcv.empty:
+            return
+
+        with self._lock:
+            for symbol, bars in ohlcv.groupby(level='symbol', sort=False):
+                bars = bars.droplevel('symbol')
+                key = (symbol, freq, adjustment)
+                entry = self._entries.get(key)
+
+                if entry is None:
+                    entry = _Entry(bars, total_candles)
+                else:
+                    bars = pd.concat([entry.bars, bars])
+                    entry.bars = bars.loc[~bars.index.duplicated(keep='last')].sort_index()
+                    entry.depth = max(entry.depth, total_candles)
+
+                # deepest window ever requested plus the spare bar `ohlcv` asks for
+                entry.bars = entry.bars.iloc[-(entry.depth + 1):]
+
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def window(self,
+               symbols: List[str],
+               freq: str,
+               adjustment: str,
+               total_candles: int) -> pd.DataFrame:
+        '''
+        This method returns the last `total_candles + 1` cached bars of symbols indexed by `(timestamp, symbol)`,
+        the same window `ohlcv` receives from the upstream
+        '''
+        dfs = {}
+
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                entry = self._entries.get((symbol, freq, adjustment))
+
+                if entry is not None:
+                    dfs[symbol] = entry.bars.iloc[-(total_candles + 1):]
+
+        if not dfs:
+            return pd.DataFrame()
+
+        df = pd.concat(dfs, names=['symbol', 'timestamp']).swaplevel(0, 1)
+
+        return df
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def freq_seconds(freq: str) -> Optional[int]:
+    '''
+    This function returns the length in seconds of a TradingView resolution (e.g. `15`, `4H`, `1D`, `1W`)
+    '''
+    match = re.fullmatch(r'(\d*)([SHDWM]?)', str(freq).upper())
+    if match is None or not any(match.groups()):
+        return None
+
+    count, unit = match.groups()
+
+    return int(count or 1) * _FREQ_SECONDS[unit]
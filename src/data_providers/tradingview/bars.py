@@ -0,0 +1,145 @@
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+SERIES_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+Bars = List[Dict[str, Union[int, List[float]]]]
+
+
+class BarBuffer:
+    '''
+    This class accumulates bars `{'i': index, 'v': [timestamp, ...]}` into growing NumPy arrays;
+    a bar with a known index (e.g. `du` update of the forming bar) is overwritten in place
+    '''
+
+    def __init__(self, capacity: int = 256) -> None:
+        self._capacity = capacity
+        self._index: np.ndarray = None
+        self._values: np.ndarray = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def width(self) -> int:
+        return 0 if self._values is None else self._values.shape[1]
+
+    @property
+    def index(self) -> np.ndarray:
+        return np.empty(0, dtype=np.int64) if self._index is None else self._index[:self._size]
+
+    @property
+    def values(self) -> np.ndarray:
+        return np.empty((0, self.width)) if self._values is None else self._values[:self._size]
+
+    def update(self, bars: Bars) -> None:
+        bars = [i for i in bars if i['i'] > 0]
+        if not bars:
+            return
+
+        index = np.fromiter((i['i'] for i in bars), dtype=np.int64, count=len(bars))
+        values = np.array([i['v'] for i in bars], dtype=np.float64)
+
+        if self._values is None:
+            self._index = np.empty(self._capacity, dtype=np.int64)
+            self._values = np.empty((self._capacity, values.shape[1]), dtype=np.float64)
+
+        last = self._index[self._size - 1] if self._size else -1
+
+        # usual case: history or new bars in order
+        if index[0] > last and (len(index) == 1 or np.all(index[1:] > index[:-1])):
+            self._append(index, values)
+            return
+
+        for i, v in zip(index, values):
+            self._upsert(i, v)
+
+    def to_frame(self, columns: List[str]) -> pd.DataFrame:
+        if self._values is None:
+            df = pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], tz='UTC'), dtype=np.float64)
+        else:
+            values = self.values
+            timestamps = pd.to_datetime(values[:, 0], unit='s', utc=True)
+            df = pd.DataFrame(values[:, 1:], index=timestamps, columns=columns)
+
+        df.rename_axis('timestamp', axis=0, inplace=True)
+
+        return df
+
+    def _append(self, index: np.ndarray, values: np.ndarray) -> None:
+        self._reserve(self._size + len(index))
+
+        self._index[self._size:self._size + len(index)] = index
+        self._values[self._size:self._size + len(index)] = values
+        self._size += len(index)
+
+    def _upsert(self, i: int, v: np.ndarray) -> None:
+        pos = int(np.searchsorted(self._index[:self._size], i))
+
+        if pos < self._size and self._index[pos] == i:
+            self._values[pos] = v
+            return
+
+        self._reserve(self._size + 1)
+
+        # older bar arrived late, shift the tail by one
+        self._index[pos + 1:self._size + 1] = self._index[pos:self._size]
+        self._values[pos + 1:self._size + 1] = self._values[pos:self._size]
+        self._index[pos] = i
+        self._values[pos] = v
+        self._size += 1
+
+    def _reserve(self, size: int) -> None:
+        if size <= len(self._index):
+            return
+
+        capacity = max(size, len(self._index) * 2)
+
+        index = np.empty(capacity, dtype=np.int64)
+        index[:self._size] = self._index[:self._size]
+
+        values = np.empty((capacity, self._values.shape[1]), dtype=np.float64)
+        values[:self._size] = self._values[:self._size]
+
+        self._index = index
+        self._values = values
+
+
+class ChartSessionBars:
+    '''
+    This class keeps the series and study buffers of one chart session until it is completed
+    '''
+
+    def __init__(self) -> None:
+        self._series = BarBuffer()
+        self._studies: Dict[str, BarBuffer] = {}
+
+    def update(self, name: str, data: Dict[str, Bars]) -> None:
+        s = data.get('s')
+        st = data.get('st')
+
+        if s is not None:
+            self._series.update(s)
+
+        if st is not None:
+            self._studies.setdefault(name, BarBuffer()).update(st)
+
+    def to_frame(self) -> pd.DataFrame:
+        dfs = [self._series.to_frame(SERIES_COLUMNS)]
+
+        for name, buffer in self._studies.items():
+            dfs.append(buffer.to_frame(_study_columns(name, buffer.width - 1)))
+
+        return pd.concat(dfs, axis=1)
+
+
+def _study_columns(name: str, count: int) -> List[str]:
+    name = name.removeprefix('s_')
+
+    if count > 1:
+        return [f'{name}_{i}' for i in range(1, count + 1)]
+
+    return [name]
@@ -0,0 +1,196 @@
+from datetime import date, datetime, timedelta, timezone
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+from cachetools import TTLCache
+
+# a day fetched for a country, or for every country with `None`
+CoverageKey = Tuple[Optional[str], date]
+
+CalendarRange = Tuple[str, str, Optional[List[str]]]
+
+_DAY = timedelta(days=1)
+
+
+class EconomicCalendarCache:
+    '''
+    This class keeps economic calendar events by UTC day and remembers which days were fetched for which countries,
+    so a window only costs requests for its missing days; days near today are fetched again after `recent_ttl`
+    seconds as their actual values get published, older days after `ttl` seconds. A fetched day replaces the events
+    of its countries, and days not fetched for `ttl` seconds are dropped.
+    Related events are memoized by event id for `related_ttl` seconds
+    '''
+
+    def __init__(self,
+                 ttl: float = 24 * 60 * 60,
+                 recent_ttl: float = 5 * 60,
+                 related_ttl: float = 60 * 60,
+                 related_size: int = 10000) -> None:
+        self._ttl = ttl
+        self._recent_ttl = recent_ttl
+        self._events: Dict[date, Dict[str, Dict[str, Any]]] = {}
+        self._event_days: Dict[str, date] = {}
+        self._coverage: Dict[CoverageKey, float] = {}
+        self._related: TTLCache = TTLCache(maxsize=related_size, ttl=related_ttl)
+        self._lock = Lock()
+
+    def plan(self,
+             from_date: Union[str, datetime],
+             to_date: Union[str, datetime],
+             countries: List[str] = None) -> List[CalendarRange]:
+        '''
+        This method returns the `(from, to, countries)` requests covering the days of the window not cached yet,
+        consecutive missing days being merged into one request
+        '''
+        days = _days(from_date, to_date)
+        now = monotonic()
+
+        missing: Dict[date, List[Optional[str]]] = {}
+
+        with self._lock:
+            for day in days:
+                absent = [i for i in (countries or [None]) if not self._covered(i, day, now)]
+                if absent:
+                    missing[day] = absent
+
+        rst: List[CalendarRange] = []
+        start: date = None
+        absent: List[Optional[str]] = []
+
+        for day in days:
+            if day in missing:
+                start = start or day
+                absent = list(dict.fromkeys([*absent, *missing[day]]))
+
+            if start is not None and (day not in missing or day == days[-1]):
+                end = day if day in missing else day - _DAY
+                rst.append((_day_start(start), _day_end(end), None if absent == [None] else absent))
+                start, absent = None, []
+
+        return rst
+
+    def update(self, window: CalendarRange, events: List[Dict[str, Any]]) -> None:
+        '''
+        This method stores the events fetched for a window returned by `plan`, its days being covered even without events;
+        events of its countries cached for its days and not fetched again were moved or cancelled, they are dropped
+        '''
+        from_date, to_date, countries = window
+        now = monotonic()
+
+        with self._lock:
+            self._evict(now)
+
+            for day in _days(from_date, to_date):
+                self._drop(day, [k for k, v in self._events.get(day, {}).items()
+                                 if countries is None or v.get('country') in countries])
+                self._events.setdefault(day, {})
+
+                for country in countries or [None]:
+                    self._coverage[(country, day)] = now
+
+            for event in events or []:
+                day = _timestamp(event['date']).date()
+                previous = self._event_days.get(event['id'])
+
+                if previous is not None and previous != day:
+                    self._drop(previous, [event['id']])
+
+                self._events.setdefault(day, {})[event['id']] = event
+                self._event_days[event['id']] = day
+
+    def events(self,
+               from_date: Union[str, datetime],
+               to_date: Union[str, datetime],
+               countries: List[str] = None) -> List[Dict[str, Any]]:
+        '''
+        This method returns copies of the cached events of the window, oldest first
+        '''
+        start, end = _timestamp(from_date), _timestamp(to_date)
+
+        rst = []
+        with self._lock:
+            for day in _days(from_date, to_date):
+                for event in self._events.get(day, {}).values():
+                    if countries is not None and event.get('country') not in countries:
+                        continue
+
+                    if start <= _timestamp(event['date']) <= end:
+                        rst.append(dict(event))
+
+        return sorted(rst, key=lambda x: x['date'])
+
+    def related_lookup(self, event_ids: Iterable[str]) -> Tuple[Dict[str, List[Dict[str, Any]]], List[str]]:
+        '''
+        This method splits event ids into memoized related events and distinct ids which must be fetched
+        '''
+        cached = {}
+        missing = []
+
+        with self._lock:
+            for i in dict.fromkeys(event_ids):
+                value = self._related.get(i)
+
+                if value is None:
+                    missing.append(i)
+                else:
+                    cached[i] = value
+
+        return cached, missing
+
+    def related_update(self, related: Dict[str, List[Dict[str, Any]]]) -> None:
+        with self._lock:
+            self._related.update(related)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
+            self._event_days.clear()
+            self._coverage.clear()
+            self._related.clear()
+
+    def _drop(self, day: date, event_ids: List[str]) -> None:
+        events = self._events.get(day, {})
+
+        for i in event_ids:
+            events.pop(i, None)
+
+            if self._event_days.get(i) == day:
+                del self._event_days[i]
+
+    def _evict(self, now: float) -> None:
+        for key in [k for k, v in self._coverage.items() if now - v >= self._ttl]:
+            del self._coverage[key]
+
+        covered = {day for _, day in self._coverage}
+
+        for day in [i for i in self._events if i not in covered]:
+            self._drop(day, list(self._events[day]))
+            del self._events[day]
+
+    def _covered(self, country: Optional[str], day: date, now: float) -> bool:
+        # days from yesterday on may still see actual values published
+        ttl = self._recent_ttl if day >= datetime.now(timezone.utc).date() - _DAY else self._ttl
+
+        return any(now - self._coverage.get((i, day), -ttl) < ttl for i in {country, None})
+
+
+def _timestamp(value: Union[str, datetime]) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+
+def _days(from_date: Union[str, datetime], to_date: Union[str, datetime]) -> List[date]:
+    start, end = _timestamp(from_date).date(), _timestamp(to_date).date()
+
+    return [start + _DAY * i for i in range((end - start).days + 1)]
+
+
+def _day_start(day: date) -> str:
+    return f'{day.isoformat()}T00:00:00.000Z'
+
+
+def _day_end(day: date) -> str:
+    return f'{day.isoformat()}T23:59:59.999Z'
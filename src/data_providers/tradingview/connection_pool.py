@@ -0,0 +1,614 @@
+import asyncio
+import json
+from queue import Empty, Queue
+from threading import Lock, Thread
+from time import monotonic
+from typing import Awaitable, Callable, Dict, List, Union
+
+from websocket import create_connection
+from websockets.asyncio.client import ClientConnection
+from websockets.asyncio.client import connect as async_connect
+
+from data_providers.tradingview.protocol import (FrameDecoder,
+                                                 asend_heartbeat,
+                                                 asend_message, is_heartbeat,
+                                                 prepend_header,
+                                                 send_heartbeat, send_message)
+
+
+class Channel:
+    '''
+    This class is a caller's view on a pooled socket; it only receives frames of its own sessions
+    and quacks like `WebSocket` (`send`/`recv`) so the receive loops work on it unchanged
+    '''
+
+    def __init__(self,
+                 connection: 'PooledConnection',
+                 quote_sessions: List[str] = None,
+                 chart_sessions: List[str] = None,
+                 dedicated=False) -> None:
+        self._connection = connection
+        self._quote_sessions = quote_sessions or []
+        self._chart_sessions = chart_sessions or []
+        self._dedicated = dedicated
+        self._queue: Queue = Queue()
+
+    @property
+    def sessions(self) -> List[str]:
+        return [*self._quote_sessions, *self._chart_sessions]
+
+    @property
+    def dedicated(self) -> bool:
+        return self._dedicated
+
+    def send(self, data: str) -> None:
+        self._connection.send(data)
+
+    def recv(self, timeout: float = None) -> str:
+        try:
+            item = self._queue.get(timeout=timeout)
+        except Empty:
+            raise TimeoutError(f'no message within {timeout} seconds')
+
+        if isinstance(item, Exception):
+            raise item
+
+        return item
+
+    def put(self, item: Union[str, Exception]) -> None:
+        self._queue.put(item)
+
+    def close(self) -> None:
+        for sess in self._quote_sessions:
+            self._connection.delete_session(self, 'quote_delete_session', sess)
+
+        for sess in self._chart_sessions:
+            self._connection.delete_session(self, 'chart_delete_session', sess)
+
+        if self._dedicated:
+            self._connection.close()
+
+    def __enter__(self) -> 'Channel':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+class PooledConnection:
+    '''
+    This class keeps one authenticated socket open, answers heartbeats in background
+    and routes incoming frames to channels by session id
+    '''
+
+    def __init__(self,
+                 url: str,
+                 headers: str,
+                 token: str,
+                 idle_timeout: float,
+                 on_auth_error: Callable[[str], None] = None) -> None:
+        self._ws = create_connection(url, headers=headers)
+        self._token = token
+        self._on_auth_error = on_auth_error
+        self._idle_timeout = idle_timeout
+        self._channels: Dict[str, Channel] = {}
+        self._lock = Lock()
+        self._send_lock = Lock()
+        self._last_used = monotonic()
+        self._closed = False
+        self._error: Exception = None
+        self._decoder = FrameDecoder()
+
+        send_message(self, 'set_auth_token', [token or 'unauthorized_user_token'])
+        send_message(self, 'set_data_quality', ['high'])
+
+        self._reader = Thread(target=self._read_forever, daemon=True)
+        self._reader.start()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def sessions_count(self) -> int:
+        return len(self._channels)
+
+    def has_room(self, sessions_count: int, max_sessions: int) -> bool:
+        if self._closed:
+            return False
+
+        return self.sessions_count == 0 or self.sessions_count + sessions_count <= max_sessions
+
+    def send(self, data: str) -> None:
+        with self._send_lock:
+            try:
+                self._ws.send(data)
+            except Exception as e:
+                raise ConnectionError(f'Socket is lost "{e}"') from e
+
+    def attach(self, channel: Channel) -> None:
+        with self._lock:
+            # the socket failed before the channel came, which must not wait for frames that never arrive
+            if self._error is not None:
+                channel.put(self._error)
+                return
+
+            self._channels.update({sess: channel for sess in channel.sessions})
+            self._last_used = monotonic()
+
+    def delete_session(self, channel: Channel, func: str, sess: str) -> None:
+        with self._lock:
+            if self._channels.get(sess) is not channel:
+                return
+
+            self._channels.pop(sess)
+            self._last_used = monotonic()
+
+        if not self._closed:
+            send_message(self, func, [sess])
+
+    def close(self) -> None:
+        self._closed = True
+        self._ws.close()
+
+    def _read_forever(self) -> None:
+        while not self._closed:
+            try:
+                msgs = self._ws.recv()
+            except Exception as e:
+                self._fail(ConnectionError(f'Socket is lost "{e}"'))
+                break
+
+            self._route(msgs)
+
+            if self._expire():
+                self._ws.close()
+                break
+
+    def _route(self, msgs: str) -> None:
+        for payload in self._decoder.feed(msgs):
+            if is_heartbeat(payload):
+                send_heartbeat(self, payload)
+                continue
+
+            # callers attach and detach channels meanwhile
+            with self._lock:
+                channel = self._channels.get(_session_of(payload))
+                channels = set(self._channels.values()) if channel is None else None
+
+            if channel is not None:
+                channel.put(prepend_header(payload))
+            elif '_error"' in payload[:64]:
+                # protocol errors do not carry a session so every caller must know
+                for _channel in channels:
+                    _channel.put(prepend_header(payload))
+
+                if _is_auth_error(payload):
+                    self._reject()
+
+    def _reject(self) -> None:
+        # the upstream refused the token of this socket, the next socket signs in again
+        if self._on_auth_error is not None:
+            self._on_auth_error(self._token)
+
+        self._fail(ConnectionError('Token of the socket is rejected'))
+        self._ws.close()
+
+    def _fail(self, error: Exception) -> None:
+        self._closed = True
+
+        with self._lock:
+            self._error = error
+            channels = set(self._channels.values())
+            self._channels.clear()
+
+        for channel in channels:
+            channel.put(error)
+
+    def _expire(self) -> bool:
+        # checked and closed in one hold of the lock `attach` takes, a channel attached later gets the error
+        with self._lock:
+            if self._channels or monotonic() - self._last_used <= self._idle_timeout:
+                return False
+
+            self._closed = True
+            self._error = ConnectionError('Socket is closed after idling')
+
+            return True
+
+
+class ConnectionPool:
+    '''
+    This class hands out channels on shared sockets; at most `size` sockets are kept,
+    each carrying up to `max_sessions` sessions, and sockets idle over `idle_timeout` seconds are closed
+    '''
+
+    def __init__(self,
+                 url: str,
+                 headers: str,
+                 token: Callable[[], str],
+                 size: int = 4,
+                 max_sessions: int = 50,
+                 idle_timeout: float = 300,
+                 on_auth_error: Callable[[str], None] = None) -> None:
+        self._url = url
+        self._headers = headers
+        self._token = token
+        self._on_auth_error = on_auth_error
+        self._size = size
+        self._max_sessions = max_sessions
+        self._idle_timeout = idle_timeout
+        self._connections: List[PooledConnection] = []
+        self._opening = 0
+        self._lock = Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def max_sessions(self) -> int:
+        return self._max_sessions
+
+    def channel(self,
+                quote_sessions: List[str] = None,
+                chart_sessions: List[str] = None) -> Channel:
+        sessions_count = len(quote_sessions or []) + len(chart_sessions or [])
+
+        with self._lock:
+            self._connections = [i for i in self._connections if not i.closed]
+
+            connection = next((i for i in self._connections
+                               if i.has_room(sessions_count, self._max_sessions)), None)
+
+            if connection is not None:
+                channel = Channel(connection, quote_sessions, chart_sessions)
+                connection.attach(channel)
+
+                return channel
+
+            # pool is exhausted, so caller gets a socket which is closed after use
+            dedicated = len(self._connections) + self._opening >= self._size
+
+            # the slot is taken now, the socket is opened (and the token fetched) without holding the lock
+            if not dedicated:
+                self._opening += 1
+
+        try:
+            connection = PooledConnection(self._url,
+                                          self._headers,
+                                          self._token(),
+                                          self._idle_timeout,
+                                          self._on_auth_error)
+        finally:
+            if not dedicated:
+                with self._lock:
+                    self._opening -= 1
+
+        channel = Channel(connection, quote_sessions, chart_sessions, dedicated=dedicated)
+
+        with self._lock:
+            if not dedicated:
+                self._connections.append(connection)
+
+            connection.attach(channel)
+
+        return channel
+
+    def close(self) -> None:
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+
+            self._connections = []
+
+
+class AsyncChannel:
+    '''
+    This class is the asyncio counterpart of `Channel`
+    '''
+
+    def __init__(self,
+                 connection: 'AsyncPooledConnection',
+                 quote_sessions: List[str] = None,
+                 chart_sessions: List[str] = None,
+                 dedicated=False) -> None:
+        self._connection = connection
+        self._quote_sessions = quote_sessions or []
+        self._chart_sessions = chart_sessions or []
+        self._dedicated = dedicated
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    @property
+    def sessions(self) -> List[str]:
+        return [*self._quote_sessions, *self._chart_sessions]
+
+    @property
+    def dedicated(self) -> bool:
+        return self._dedicated
+
+    async def send(self, data: str) -> None:
+        await self._connection.send(data)
+
+    async def recv(self) -> str:
+        item = await self._queue.get()
+
+        if isinstance(item, Exception):
+            raise item
+
+        return item
+
+    def put(self, item: Union[str, Exception]) -> None:
+        self._queue.put_nowait(item)
+
+    async def close(self) -> None:
+        for sess in self._quote_sessions:
+            await self._connection.delete_session(self, 'quote_delete_session', sess)
+
+        for sess in self._chart_sessions:
+            await self._connection.delete_session(self, 'chart_delete_session', sess)
+
+        if self._dedicated:
+            await self._connection.close()
+
+    async def __aenter__(self) -> 'AsyncChannel':
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+
+class AsyncPooledConnection:
+    '''
+    This class is the asyncio counterpart of `PooledConnection`; the reader is a task instead of a thread
+    '''
+
+    def __init__(self,
+                 ws: ClientConnection,
+                 idle_timeout: float,
+                 token: str = None,
+                 on_auth_error: Callable[[str], Awaitable[None]] = None) -> None:
+        self._ws = ws
+        self._token = token
+        self._on_auth_error = on_auth_error
+        self._idle_timeout = idle_timeout
+        self._channels: Dict[str, AsyncChannel] = {}
+        self._last_used = monotonic()
+        self._closed = False
+        self._error: Exception = None
+        self._decoder = FrameDecoder()
+        self._reader: asyncio.Task = None
+
+    @classmethod
+    async def open(cls,
+                   url: str,
+                   origin: str,
+                   token: str,
+                   idle_timeout: float,
+                   on_auth_error: Callable[[str], Awaitable[None]] = None) -> 'AsyncPooledConnection':
+        # timescale_update of long histories is larger than the default 1 MiB limit
+        ws = await async_connect(url, origin=origin, max_size=None)
+
+        connection = cls(ws, idle_timeout, token, on_auth_error)
+
+        await asend_message(connection, 'set_auth_token', [token or 'unauthorized_user_token'])
+        await asend_message(connection, 'set_data_quality', ['high'])
+
+        connection._reader = asyncio.create_task(connection._read_forever())
+
+        return connection
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def sessions_count(self) -> int:
+        return len(self._channels)
+
+    def has_room(self, sessions_count: int, max_sessions: int) -> bool:
+        if self._closed:
+            return False
+
+        return self.sessions_count == 0 or self.sessions_count + sessions_count <= max_sessions
+
+    async def send(self, data: str) -> None:
+        try:
+            await self._ws.send(data)
+        except Exception as e:
+            raise ConnectionError(f'Socket is lost "{e}"') from e
+
+    def attach(self, channel: AsyncChannel) -> None:
+        # the socket failed before the channel came, which must not wait for frames that never arrive
+        if self._error is not None:
+            channel.put(self._error)
+            return
+
+        self._channels.update({sess: channel for sess in channel.sessions})
+        self._last_used = monotonic()
+
+    async def delete_session(self, channel: AsyncChannel, func: str, sess: str) -> None:
+        if self._channels.get(sess) is not channel:
+            return
+
+        self._channels.pop(sess)
+        self._last_used = monotonic()
+
+        if not self._closed:
+            await asend_message(self, func, [sess])
+
+    async def close(self) -> None:
+        self._closed = True
+        await self._ws.close()
+
+    async def _read_forever(self) -> None:
+        while not self._closed:
+            try:
+                msgs = await self._ws.recv()
+            except Exception as e:
+                self._fail(ConnectionError(f'Socket is lost "{e}"'))
+                break
+
+            await self._route(msgs)
+
+            if self._expire():
+                await self._ws.close()
+                break
+
+    async def _route(self, msgs: str) -> None:
+        for payload in self._decoder.feed(msgs):
+            if is_heartbeat(payload):
+                await asend_heartbeat(self, payload)
+                continue
+
+            channel = self._channels.get(_session_of(payload))
+
+            if channel is not None:
+                channel.put(prepend_header(payload))
+            elif '_error"' in payload[:64]:
+                # protocol errors do not carry a session so every caller must know
+                for _channel in set(self._channels.values()):
+                    _channel.put(prepend_header(payload))
+
+                if _is_auth_error(payload):
+                    await self._reject()
+
+    async def _reject(self) -> None:
+        # the upstream refused the token of this socket, the next socket signs in again
+        if self._on_auth_error is not None:
+            await self._on_auth_error(self._token)
+
+        self._fail(ConnectionError('Token of the socket is rejected'))
+        await self._ws.close()
+
+    def _fail(self, error: Exception) -> None:
+        self._closed = True
+        self._error = error
+
+        channels = set(self._channels.values())
+        self._channels.clear()
+
+        for channel in channels:
+            channel.put(error)
+
+    def _expire(self) -> bool:
+        # closed as it is checked, a channel attached later gets the error
+        if self._channels or monotonic() - self._last_used <= self._idle_timeout:
+            return False
+
+        self._closed = True
+        self._error = ConnectionError('Socket is closed after idling')
+
+        return True
+
+
+class AsyncConnectionPool:
+    '''
+    This class is the asyncio counterpart of `ConnectionPool`
+    '''
+
+    def __init__(self,
+                 url: str,
+                 origin: str,
+                 token: Callable[[], Awaitable[str]],
+                 size: int = 4,
+                 max_sessions: int = 50,
+                 idle_timeout: float = 300,
+                 on_auth_error: Callable[[str], Awaitable[None]] = None) -> None:
+        self._url = url
+        self._origin = origin
+        self._token = token
+        self._on_auth_error = on_auth_error
+        self._size = size
+        self._max_sessions = max_sessions
+        self._idle_timeout = idle_timeout
+        self._connections: List[AsyncPooledConnection] = []
+        self._opening = 0
+        self._lock: asyncio.Lock = None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def max_sessions(self) -> int:
+        return self._max_sessions
+
+    async def channel(self,
+                      quote_sessions: List[str] = None,
+                      chart_sessions: List[str] = None) -> AsyncChannel:
+        sessions_count = len(quote_sessions or []) + len(chart_sessions or [])
+
+        # lock is bound to the running loop, so it is created lazily
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            self._connections = [i for i in self._connections if not i.closed]
+
+            connection = next((i for i in self._connections
+                               if i.has_room(sessions_count, self._max_sessions)), None)
+
+            if connection is not None:
+                channel = AsyncChannel(connection, quote_sessions, chart_sessions)
+                connection.attach(channel)
+
+                return channel
+
+            # pool is exhausted, so caller gets a socket which is closed after use
+            dedicated = len(self._connections) + self._opening >= self._size
+
+            # the slot is taken now, the socket is opened (and the token fetched) without holding the lock
+            if not dedicated:
+                self._opening += 1
+
+        try:
+            connection = await AsyncPooledConnection.open(self._url,
+                                                          self._origin,
+                                                          await self._token(),
+                                                          self._idle_timeout,
+                                                          self._on_auth_error)
+        finally:
+            if not dedicated:
+                self._opening -= 1
+
+        channel = AsyncChannel(connection, quote_sessions, chart_sessions, dedicated=dedicated)
+
+        if not dedicated:
+            self._connections.append(connection)
+
+        connection.attach(channel)
+
+        return channel
+
+    async def close(self) -> None:
+        for connection in self._connections:
+            await connection.close()
+
+        self._connections = []
+
+
+def _is_auth_error(payload: str) -> bool:
+    # the upstream rejects a token with `critical_error` naming the `set_auth_token` call
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        return False
+
+    if not isinstance(message, dict):
+        return False
+
+    p = message.get('p')
+
+    return message.get('m') == 'critical_error' and isinstance(p, list) and 'set_auth_token' in p
+
+
+def _session_of(payload: str) -> Union[str, None]:
+    key = payload.find('"p"')
+    if key < 0:
+        return None
+
+    start = payload.find('"', key + len('"p"')) + 1
+    end = payload.find('"', start)
+
+    return payload[start:end]
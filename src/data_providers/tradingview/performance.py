@@ -0,0 +1,122 @@
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# a horizon spans either the last `n` bars of a symbol or its last calendar period
+HORIZONS: Dict[str, Union[int, str]] = {
+    '24h': '24h',
+    '5d': 5,
+    '1m': 21,
+    'mtd': 'M',
+    'ytd': 'Y',
+}
+
+
+def perf_table(ohlcv: pd.DataFrame, horizons: List[str]) -> pd.DataFrame:
+    '''
+    This function computes the change, change percentage, low and high of every horizon for every symbol of
+    a long OHLCV frame (`Date`, `Symbol`, `High`, `Low`, `Close` columns) in one pass over flat arrays:
+    rows are sorted by symbol and date once, and each horizon becomes one window per symbol reduced with
+    `reduceat`. Horizons are keys of `HORIZONS` or pandas period aliases; `close` is the close of the first one
+    '''
+    if ohlcv.empty:
+        return pd.DataFrame(columns=['close', *[f'{i}_{j.lower()}' for j in horizons
+                                                for i in ['change', 'change_pct', 'low', 'high']]])
+
+    symbols = pd.unique(ohlcv['Symbol'])
+    codes = pd.Categorical(ohlcv['Symbol'], categories=symbols).codes
+    dates = ohlcv['Date'].to_numpy()
+
+    order = np.lexsort((dates, codes))
+    codes = codes[order]
+    dates = pd.DatetimeIndex(dates[order])
+    high = ohlcv['High'].to_numpy(dtype=float)[order]
+    low = ohlcv['Low'].to_numpy(dtype=float)[order]
+    close = ohlcv['Close'].to_numpy(dtype=float)[order]
+
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)]
+
+    columns: Dict[str, np.ndarray] = {}
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for horizon in horizons:
+            name = horizon.lower()
+            spec = HORIZONS.get(name, name)
+
+            if isinstance(spec, int):
+                last, prev, window_start = _bars_window(close, starts, ends, spec)
+                window_low = _reduce_windows(np.minimum, low, window_start, ends)
+                window_high = _reduce_windows(np.maximum, high, window_start, ends)
+            else:
+                last, prev, window_start = _period_window(close, dates.to_period(spec).asi8, codes, starts, ends)
+                # like a groupby, missing values are skipped
+                window_low = _reduce_windows(np.fmin, low, window_start, ends)
+                window_high = _reduce_windows(np.fmax, high, window_start, ends)
+
+            columns.setdefault('close', last)
+            columns[f'change_{name}'] = last - prev
+            columns[f'change_{name}_pct'] = (last - prev) / prev
+            columns[f'low_{name}'] = window_low
+            columns[f'high_{name}'] = window_high
+
+    return pd.DataFrame(columns, index=pd.Index(symbols[codes[starts]], name='Symbol'))
+
+
+def _bars_window(close: np.ndarray,
+                 starts: np.ndarray,
+                 ends: np.ndarray,
+                 n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    last = ends - 1
+    prev = last - n
+
+    # windows longer than the history of a symbol have no value, like a rolling window
+    window_start = ends - n
+    short = window_start < starts
+
+    return (close[last],
+            np.where(prev >= starts, close[np.maximum(prev, 0)], np.nan),
+            np.where(short, -1, window_start))
+
+
+def _period_window(close: np.ndarray,
+                   periods: np.ndarray,
+                   codes: np.ndarray,
+                   starts: np.ndarray,
+                   ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    last = ends - 1
+    bounds = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (periods[1:] != periods[:-1])])
+
+    # first row of the last period of each symbol, and of the period before it
+    period_start = bounds[np.searchsorted(bounds, last, side='right') - 1]
+    prev_start = bounds[np.maximum(np.searchsorted(bounds, period_start) - 1, 0)]
+
+    # position of the last close not missing up to each row
+    valid = np.maximum.accumulate(np.where(np.isnan(close), -1, np.arange(len(close))))
+
+    last_valid = valid[last]
+    prev_valid = valid[np.maximum(period_start - 1, 0)]
+
+    return (np.where(last_valid >= period_start, close[last_valid], np.nan),
+            np.where((period_start > starts) & (prev_valid >= prev_start), close[prev_valid], np.nan),
+            period_start)
+
+
+def _reduce_windows(ufunc: np.ufunc,
+                    values: np.ndarray,
+                    window_start: np.ndarray,
+                    ends: np.ndarray) -> np.ndarray:
+    '''
+    This function reduces `values[window_start[i]:ends[i]]` for disjoint windows at once, `-1` starts give NaN
+    '''
+    empty = window_start < 0
+
+    indices = np.empty(len(ends) * 2, dtype=np.intp)
+    indices[0::2] = np.where(empty, ends - 1, window_start)
+    indices[1::2] = ends
+
+    # the trailing element keeps the end of the last window in bounds
+    rst = ufunc.reduceat(np.append(values, np.nan), indices)[0::2]
+
+    return np.where(empty, np.nan, rst)
@@ -0,0 +1,96 @@
+import json
+import random
+import string
+from typing import Iterator
+
+_FRAME_MARK = '~m~'
+_HEARTBEAT_MARK = '~h~'
+
+
+class FrameDecoder:
+    '''
+    This class walks `~m~N~m~` length prefixes once and yields payloads;
+    a frame split across `recv()` calls is buffered until the rest arrives
+    '''
+
+    def __init__(self) -> None:
+        self._buffer = ''
+
+    def feed(self, data: str) -> Iterator[str]:
+        buffer = self._buffer + data if self._buffer else data
+        size = len(buffer)
+        pos = 0
+
+        while pos < size:
+            if not buffer.startswith(_FRAME_MARK, pos):
+                # garbage in front of a frame, skip to the next one
+                pos = buffer.find(_FRAME_MARK, pos + 1)
+                if pos < 0:
+                    pos = size
+                continue
+
+            length_end = buffer.find(_FRAME_MARK, pos + 3)
+            if length_end < 0:
+                break
+
+            length = buffer[pos + 3:length_end]
+            if not length.isdigit():
+                pos = length_end
+                continue
+
+            start = length_end + 3
+            end = start + int(length)
+
+            if end > size:
+                break
+
+            if end < size and not buffer.startswith(_FRAME_MARK, end):
+                # declared length disagrees with content (e.g. counted in UTF-16 units), resync on next frame
+                end = buffer.find(_FRAME_MARK, start)
+                end = size if end < 0 else end
+
+            if end > start:
+                yield buffer[start:end]
+
+            pos = end
+
+        self._buffer = buffer[pos:] if pos < size else ''
+
+
+def is_heartbeat(payload: str) -> bool:
+    return payload.startswith(_HEARTBEAT_MARK)
+
+
+def generate_session(prefix):
+    string_length = 12
+    letters = string.ascii_lowercase
+    random_string = ''.join(random.choice(letters) for i in range(string_length))
+    return prefix + random_string
+
+
+def prepend_header(st):
+    return '~m~' + str(len(st)) + '~m~' + st
+
+
+def construct_message(func, params):
+    return json.dumps({'m': func, 'p': params}, separators=(',', ':'))
+
+
+def create_message(func, params):
+    return prepend_header(construct_message(func, params))
+
+
+def send_message(ws, func, args):
+    ws.send(create_message(func, args))
+
+
+def send_heartbeat(ws, payload):
+    ws.send(prepend_header(payload))
+
+
+async def asend_message(ws, func, args):
+    await ws.send(create_message(func, args))
+
+
+async def asend_heartbeat(ws, payload):
+    await ws.send(prepend_header(payload))
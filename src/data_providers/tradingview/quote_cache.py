@@ -0,0 +1,165 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, List, Set, Tuple
+
+_MISSING = object()
+
+
+class QuoteCache:
+    '''
+    This class keeps the last value of each `(symbol, field)` with the time it was received;
+    symbols fed by a realtime subscription are current for their subscribed fields whatever their age
+    '''
+
+    def __init__(self,
+                 max_size: int = 1000,
+                 hot_after: int = 3) -> None:
+        self._max_size = max_size
+        self._hot_after = hot_after
+        self._entries: OrderedDict[str, Dict[str, Tuple[Any, float]]] = OrderedDict()
+        self._live: Dict[str, Set[str]] = {}
+        self._requests: Dict[str, int] = {}
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def live_symbols(self) -> List[str]:
+        return list(self._live)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            'size': len(self._entries),
+            'live': len(self._live),
+            'hits': self._hits,
+            'misses': self._misses,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self,
+            symbol: str,
+            fields: List[str],
+            max_age: float) -> Dict[str, Any]:
+        '''
+        This method returns the cached fields of symbol, or None if any of them is absent or older than `max_age` seconds
+        '''
+        with self._lock:
+            rst = self._get(symbol, fields, max_age)
+
+            if rst is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._entries.move_to_end(symbol)
+
+            return rst
+
+    def lookup(self,
+               symbols: List[str],
+               fields: List[str],
+               max_age: float = None) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        '''
+        This method splits symbols into cached quotes and symbols which must be fetched live
+        '''
+        if max_age is None or not fields:
+            return {}, list(symbols)
+
+        cached = {}
+        missing = []
+
+        for symbol in symbols:
+            rst = self.get(symbol, fields, max_age)
+
+            if rst is None:
+                missing.append(symbol)
+            else:
+                cached[symbol] = rst
+
+        return cached, missing
+
+    def put(self,
+            symbol: str,
+            values: Dict[str, Any],
+            fields: List[str] = None) -> None:
+        '''
+        This method stores received values; requested `fields` absent from values are remembered as missing
+        so they do not cause a miss next time
+        '''
+        now = monotonic()
+
+        with self._lock:
+            entry = self._entries.setdefault(symbol, {})
+            self._entries.move_to_end(symbol)
+
+            for i in fields or []:
+                if i not in values:
+                    entry[i] = (_MISSING, now)
+
+            entry.update({k: (v, now) for k, v in values.items()})
+
+            while len(self._entries) > self._max_size:
+                _symbol, _ = self._entries.popitem(last=False)
+                self._requests.pop(_symbol, None)
+
+    def touch(self, symbol: str) -> bool:
+        '''
+        This method counts a request of symbol and tells whether it is hot and not live yet
+        '''
+        with self._lock:
+            if symbol in self._live:
+                return False
+
+            self._requests[symbol] = self._requests.get(symbol, 0) + 1
+
+            return self._requests[symbol] >= self._hot_after
+
+    def set_live(self, symbol: str, fields: List[str]) -> None:
+        with self._lock:
+            self._live[symbol] = set(fields)
+
+    def unset_live(self, symbol: str) -> None:
+        with self._lock:
+            self._live.pop(symbol, None)
+            self._requests.pop(symbol, None)
+
+    def clear_live(self) -> None:
+        '''
+        This method drops all live marks, the values are current again once their subscription delivers them
+        '''
+        with self._lock:
+            self._live.clear()
+
+    def _get(self,
+             symbol: str,
+             fields: List[str],
+             max_age: float) -> Dict[str, Any]:
+        entry = self._entries.get(symbol)
+        if entry is None:
+            return None
+
+        live = self._live.get(symbol, set())
+        oldest = monotonic() - max_age
+
+        rst = {}
+        for i in fields:
+            item = entry.get(i)
+
+            if item is None or (i not in live and item[1] < oldest):
+                return None
+
+            if item[0] is not _MISSING:
+                rst[i] = item[0]
+
+        return rst
@@ -0,0 +1,286 @@
+import asyncio
+import json
+from contextlib import suppress
+from logging import INFO, StreamHandler, getLogger
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from data_providers.tradingview.async_tradingview_client import \
+    AsyncTradingViewClient
+from data_providers.tradingview.connection_pool import AsyncChannel
+from data_providers.tradingview.protocol import (FrameDecoder, asend_message,
+                                                 generate_session)
+from data_providers.tradingview.tradingview_client import \
+    _quote_session_messages
+
+REALTIME_FIELDS = ['lp', 'ch', 'lp_time', 'chp', 'volume']
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+logger.addHandler(StreamHandler())
+
+
+class QuoteSubscription:
+    '''
+    This class is one downstream consumer of `QuoteHub`; updates `{symbol: fields}` wait in a bounded queue
+    and a consumer which lets the queue fill up is dropped
+    '''
+
+    def __init__(self, symbols: List[str], queue_size: int = 100) -> None:
+        self._symbols = list(dict.fromkeys(symbols))
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._closed = False
+        self._dropped = False
+
+    @property
+    def symbols(self) -> List[str]:
+        return self._symbols
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def dropped(self) -> bool:
+        return self._dropped
+
+    def put(self, update: Dict[str, Dict[str, Any]]) -> bool:
+        if self._closed:
+            return False
+
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self._dropped = True
+            self.close()
+            return False
+
+        return True
+
+    async def get(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        if self._closed and self._queue.empty():
+            return None
+
+        return await self._queue.get()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+
+        self._closed = True
+
+        # pending updates are useless to a closed consumer, wake it up with the end marker
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+        self._queue.put_nowait(None)
+
+    def __aiter__(self) -> 'QuoteSubscription':
+        return self
+
+    async def __anext__(self) -> Dict[str, Dict[str, Any]]:
+        update = await self.get()
+
+        if update is None:
+            raise StopAsyncIteration
+
+        return update
+
+
+class QuoteHub:
+    '''
+    This class keeps one upstream `qs_` session for every subscribed symbol, whatever the number of consumers;
+    symbols are reference-counted and added/removed on the live session;
+    `on_lost` is called whenever the upstream session is lost
+    '''
+
+    def __init__(self,
+                 client: AsyncTradingViewClient,
+                 fields: List[str] = None,
+                 queue_size: int = 100,
+                 reconnect_delay: float = 1,
+                 on_lost: Callable[[], None] = None) -> None:
+        self._client = client
+        self._fields = fields or REALTIME_FIELDS
+        self._queue_size = queue_size
+        self._reconnect_delay = reconnect_delay
+        self._on_lost = on_lost
+        self._refs: Dict[str, int] = {}
+        self._subscriptions: Dict[str, Set[QuoteSubscription]] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._sess: str = None
+        self._channel: AsyncChannel = None
+        self._task: asyncio.Task = None
+        self._lock: asyncio.Lock = None
+        # unsubscribes of dropped consumers, referenced until done
+        self._unsubscribing: Set[asyncio.Task] = set()
+
+    @property
+    def fields(self) -> List[str]:
+        return self._fields
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._refs)
+
+    @property
+    def subscriptions_count(self) -> int:
+        return len(set().union(*self._subscriptions.values()))
+
+    def refs(self, symbol: str) -> int:
+        return self._refs.get(symbol, 0)
+
+    async def subscribe(self, symbols: List[str]) -> QuoteSubscription:
+        subscription = QuoteSubscription(symbols, self._queue_size)
+
+        async with self._get_lock():
+            added = []
+
+            for i in subscription.symbols:
+                self._subscriptions.setdefault(i, set()).add(subscription)
+                self._refs[i] = self._refs.get(i, 0) + 1
+
+                if self._refs[i] == 1:
+                    added.append(i)
+                elif i in self._last:
+                    # late consumer starts from the latest known state
+                    subscription.put({i: dict(self._last[i])})
+
+            if self._task is None or self._task.done():
+                self._task = asyncio.create_task(self._run())
+            elif added and self._channel is not None:
+                await asend_message(self._channel, 'quote_add_symbols', [self._sess, *added])
+
+        return subscription
+
+    async def unsubscribe(self, subscription: QuoteSubscription) -> None:
+        subscription.close()
+
+        async with self._get_lock():
+            removed = []
+
+            for i in subscription.symbols:
+                subscriptions = self._subscriptions.get(i)
+                if subscriptions is None or subscription not in subscriptions:
+                    continue
+
+                subscriptions.discard(subscription)
+                self._refs[i] -= 1
+
+                if self._refs[i] == 0:
+                    self._refs.pop(i)
+                    self._subscriptions.pop(i)
+                    self._last.pop(i, None)
+                    removed.append(i)
+
+            if not self._refs:
+                await self._stop()
+            elif removed and self._channel is not None:
+                with suppress(Exception):
+                    await asend_message(self._channel, 'quote_remove_symbols', [self._sess, *removed])
+
+    async def close(self) -> None:
+        async with self._get_lock():
+            for subscriptions in self._subscriptions.values():
+                for i in subscriptions:
+                    i.close()
+
+            self._refs.clear()
+            self._subscriptions.clear()
+            self._last.clear()
+
+            await self._stop()
+
+        # they wait for the lock, so they are awaited once it is released
+        await asyncio.gather(*self._unsubscribing, return_exceptions=True)
+
+    def _get_lock(self) -> asyncio.Lock:
+        # lock is bound to the running loop, so it is created lazily
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        return self._lock
+
+    async def _run(self) -> None:
+        while self._refs:
+            try:
+                async with self._get_lock():
+                    if not self._refs:
+                        break
+
+                    self._sess = generate_session('qs_')
+                    self._channel = await self._client.pool.channel(quote_sessions=[self._sess])
+
+                    for func, args in _quote_session_messages(self._sess, list(self._refs), self._fields):
+                        await asend_message(self._channel, func, args)
+
+                await self._read(self._channel)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning('Realtime quotes are lost "%s", reconnecting', e)
+
+                if self._on_lost is not None:
+                    self._on_lost()
+
+                await self._close_channel()
+                await asyncio.sleep(self._reconnect_delay)
+
+    async def _read(self, channel: AsyncChannel) -> None:
+        decoder = FrameDecoder()
+
+        while True:
+            msgs = await channel.recv()
+
+            for i in decoder.feed(msgs):
+                self._feed(json.loads(i))
+
+    def _feed(self, m_data: Dict[str, Any]) -> None:
+        m = m_data.get('m')
+        if not m:
+            return
+
+        p = m_data['p']
+
+        if 'error' in m:
+            raise ConnectionError(f'Client returns error "{m}", detail "{p[1:]}"')
+
+        if m != 'qsd' or not isinstance(p[1], dict) or p[1].get('s') != 'ok':
+            return
+
+        n = p[1]['n']
+        v = p[1]['v']
+
+        if n not in self._refs:
+            return
+
+        self._last.setdefault(n, {}).update(v)
+
+        for subscription in list(self._subscriptions.get(n, [])):
+            if not subscription.put({n: v}):
+                logger.warning('Drop slow quote consumer of %s', subscription.symbols)
+
+                # the reader must not wait for the lock, the unsubscribe runs aside
+                task = asyncio.create_task(self.unsubscribe(subscription))
+                self._unsubscribing.add(task)
+                task.add_done_callback(self._unsubscribed)
+
+    def _unsubscribed(self, task: asyncio.Task) -> None:
+        self._unsubscribing.discard(task)
+
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning('Unsubscribe of a slow quote consumer failed "%s"', task.exception())
+
+    async def _stop(self) -> None:
+        task, self._task = self._task, None
+
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+        await self._close_channel()
+
+    async def _close_channel(self) -> None:
+        channel, self._channel = self._channel, None
+
+        if channel is not None:
+            with suppress(Exception):
+                await channel.close()
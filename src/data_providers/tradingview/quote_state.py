@@ -0,0 +1,119 @@
+from typing import Any, Callable, Dict, List, Set
+
+
+class QuoteSessionState:
+    '''
+    This class merges quote session messages in place into `{symbol: fields}`;
+    completion is tracked with counters so `completed` costs the same whatever the number of symbols
+    '''
+
+    def __init__(self,
+                 symbols: List[str] = None,
+                 callback: Callable[[Dict[str, Dict[str, Any]]], None] = None) -> None:
+        self._callback = callback
+        self._sess: str = None
+        self._quotes: Dict[str, Dict[str, Any]] = {}
+        # dict keeps the requested order for `statuses`
+        self._expected: Dict[str, None] = dict.fromkeys(symbols or [])
+        self._done: Set[str] = set()
+        self._errors: Set[str] = set()
+        self._just_done: List[str] = []
+        # expected symbols without any message yet, symbols with messages but no `quote_completed`
+        self._unseen = len(self._expected)
+        self._incomplete = 0
+
+    @property
+    def sess(self) -> str:
+        return self._sess
+
+    @property
+    def quotes(self) -> Dict[str, Dict[str, Any]]:
+        return self._quotes
+
+    @property
+    def empty(self) -> bool:
+        return not self._quotes
+
+    @property
+    def completed(self) -> bool:
+        return bool(self._quotes) and self._unseen == 0 and self._incomplete == 0
+
+    @property
+    def statuses(self) -> Dict[str, str]:
+        '''
+        This method returns `ok`, `error` (no data), `partial` (data but not completed) or `timeout` (nothing yet)
+        for expected and received symbols
+        '''
+        rst = {}
+
+        for i in [*self._expected, *self._quotes]:
+            if i in self._errors or (i in self._done and not self._quotes[i]):
+                rst[i] = 'error'
+            elif i in self._done:
+                rst[i] = 'ok'
+            elif self._quotes.get(i):
+                rst[i] = 'partial'
+            else:
+                rst[i] = 'timeout'
+
+        return rst
+
+    def drain_completed(self) -> List[str]:
+        '''
+        This method returns symbols completed since the last call
+        '''
+        rst, self._just_done = self._just_done, []
+
+        return rst
+
+    def feed(self, m_data: Dict[str, Any]) -> None:
+        m = m_data.get('m')
+        if not m:
+            return
+
+        p = m_data['p']
+
+        if 'error' in m:
+            raise ConnectionError(f'Client returns error "{m}", detail "{p[1]}"')
+
+        if m == 'quote_completed':
+            self._sess = p[0]
+            self._complete(p[1])
+
+        elif isinstance(p[1], dict) and p[1].get('s') == 'ok':
+            self._sess = p[0]
+            n = p[1]['n']
+            v = p[1]['v']
+
+            self._entry(n).update(v)
+
+            if self._callback is not None:
+                self._callback({n: v})
+
+        elif isinstance(p[1], dict) and p[1].get('s') == 'error':
+            self._errors.add(p[1].get('n'))
+
+    def result(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        return {self._sess: self._quotes} if self._sess else {}
+
+    def _entry(self, symbol: str) -> Dict[str, Any]:
+        entry = self._quotes.get(symbol)
+
+        if entry is None:
+            entry = self._quotes[symbol] = {}
+
+            if symbol in self._expected:
+                self._unseen -= 1
+
+            if symbol not in self._done:
+                self._incomplete += 1
+
+        return entry
+
+    def _complete(self, symbol: str) -> None:
+        self._entry(symbol)
+
+        if symbol not in self._done:
+            self._done.add(symbol)
+            self._just_done.append(symbol)
+            self._incomplete -= 1
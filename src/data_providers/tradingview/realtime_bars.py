@@ -0,0 +1,130 @@
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+from data_providers.indicators import warmup
+from data_providers.streaming_indicators import StreamingIndicators
+from data_providers.tradingview.async_tradingview_client import \
+    AsyncTradingViewClient
+from data_providers.tradingview.bars import SERIES_COLUMNS
+from data_providers.tradingview.protocol import (FrameDecoder, asend_message,
+                                                 generate_session)
+from data_providers.tradingview.tradingview_client import \
+    _chart_session_messages
+
+
+class BarUpdate(NamedTuple):
+    symbol: str
+    timestamp: pd.Timestamp
+    bar: Dict[str, float]
+    indicators: Dict[str, float]
+    # True when the update opened a new bar, False when it revised the forming one
+    new: bool
+
+
+class RealtimeBars:
+    '''
+    This class follows the bars of one symbol on a chart session: history seeds the streaming indicators,
+    then every `du` update of the forming or a new bar is handed to callbacks and to async iterators
+    '''
+
+    def __init__(self,
+                 client: AsyncTradingViewClient,
+                 symbol: str,
+                 freq: str,
+                 charts: List[str] = None,
+                 adjustment='dividends') -> None:
+        self._client = client
+        self._symbol = symbol
+        self._freq = freq
+        self._charts = charts or []
+        self._adjustment = adjustment
+        self._indicators = StreamingIndicators(self._charts)
+        self._callbacks: List[Callable[[BarUpdate], Any]] = []
+        self._time: float = None
+
+    @property
+    def symbol(self) -> str:
+        return self._symbol
+
+    @property
+    def charts(self) -> List[str]:
+        return self._charts
+
+    def add_callback(self, callback: Callable[[BarUpdate], Any]) -> None:
+        self._callbacks.append(callback)
+
+    async def run(self) -> None:
+        '''
+        This method follows the bars for callbacks only
+        '''
+        async for _ in self:
+            pass
+
+    async def __aiter__(self) -> AsyncIterator[BarUpdate]:
+        sess = generate_session('cs_')
+        decoder = FrameDecoder()
+        history = True
+
+        # enough history for every indicator to be settled on the first live bar
+        total_candles = warmup(self._charts) + 1
+
+        async with await self._client.pool.channel(chart_sessions=[sess]) as ws:
+            for func, args in _chart_session_messages(sess, self._symbol, self._freq, total_candles, [],
+                                                      self._adjustment):
+                await asend_message(ws, func, args)
+
+            while True:
+                msgs = await ws.recv()
+
+                for i in decoder.feed(msgs):
+                    m_data = json.loads(i)
+                    m = m_data.get('m')
+                    if not m:
+                        continue
+
+                    p = m_data['p']
+
+                    if 'error' in m:
+                        raise ConnectionError(f'Client returns error "{m}", detail "{p[1:]}"')
+
+                    if m == 'series_completed':
+                        history = False
+                        continue
+
+                    if m not in ('timescale_update', 'du'):
+                        continue
+
+                    for bar in _series_bars(p[1]):
+                        update = self._feed(bar)
+
+                        if update is None or history:
+                            continue
+
+                        for callback in self._callbacks:
+                            callback(update)
+
+                        yield update
+
+    def _feed(self, values: List[float]) -> Optional[BarUpdate]:
+        time = values[0]
+
+        if self._time is not None and time < self._time:
+            return None
+
+        new = self._time is not None and time > self._time
+        self._time = time
+
+        bar = dict(zip(SERIES_COLUMNS, values[1:]))
+        indicators = self._indicators.update(time, bar['high'], bar['low'], bar['close'])
+
+        return BarUpdate(self._symbol, pd.Timestamp(time, unit='s', tz='UTC'), bar, indicators, new)
+
+
+def _series_bars(data: Dict[str, Any]) -> List[List[float]]:
+    series = data.get('s_ohlcv')
+    if not isinstance(series, dict):
+        return []
+
+    return [i['v'] for i in sorted(series.get('s', []), key=lambda x: x['i'])]
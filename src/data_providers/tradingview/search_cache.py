@@ -0,0 +1,84 @@
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Tuple
+
+from cachetools import TTLCache
+
+SearchKey = Tuple[str, str, str, str, str, int]
+
+_MISSING = object()
+
+
+def search_key(query: str,
+               country: str = 'US',
+               exchange: str = '',
+               search_type: str = '',
+               economic_category: str = '',
+               start: int = 0) -> SearchKey:
+    return query, country.upper(), exchange, search_type, economic_category, start
+
+
+def search_keys(queries: Iterable[str], params: Dict[str, Any]) -> Dict[str, SearchKey]:
+    '''
+    This function returns the key of every distinct query of a batch, in the order of the batch
+    '''
+    return {i: search_key(i,
+                          params.get('country', 'US'),
+                          params.get('exchange', ''),
+                          params.get('search_type', ''),
+                          params.get('economic_category', ''),
+                          params.get('start', 0))
+            for i in queries}
+
+
+class SearchCache:
+    '''
+    This class memoizes symbol search results, least recently used first evicted and none kept over `ttl` seconds;
+    a search which matched nothing is cached as well
+    '''
+
+    def __init__(self,
+                 max_size: int = 10000,
+                 ttl: float = 24 * 60 * 60) -> None:
+        self._entries: TTLCache = TTLCache(maxsize=max_size, ttl=ttl)
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, keys: Iterable[SearchKey]) -> Tuple[Dict[SearchKey, Any], List[SearchKey]]:
+        '''
+        This method splits keys into cached results and distinct keys which must be searched
+        '''
+        cached = {}
+        missing = []
+
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                value = self._entries.get(key, _MISSING)
+
+                if value is _MISSING:
+                    self._misses += 1
+                    missing.append(key)
+                else:
+                    self._hits += 1
+                    cached[key] = value
+
+        return cached, missing
+
+    def update(self, results: Dict[SearchKey, Any]) -> None:
+        with self._lock:
+            self._entries.update(results)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,75 @@
+import asyncio
+from concurrent.futures import Executor
+from time import perf_counter
+from typing import Awaitable, Callable, List, NamedTuple, Tuple
+
+import pandas as pd
+
+
+class ShardTiming(NamedTuple):
+    shard: int
+    symbols: int
+    seconds: float
+
+
+def plan_shards(symbols: List[str], shard_size: int) -> List[List[str]]:
+    '''
+    This function splits symbols into the fewest shards of at most `shard_size` symbols, balanced in size,
+    so one shard fits the chart sessions of one socket
+    '''
+    symbols = list(dict.fromkeys(symbols))
+
+    if not symbols:
+        return [symbols]
+
+    shard_size = max(shard_size, 1)
+    shards_no = -(-len(symbols) // shard_size)
+    size, extra = divmod(len(symbols), shards_no)
+
+    shards = []
+    start = 0
+    for i in range(shards_no):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(symbols[start:end])
+        start = end
+
+    return shards
+
+
+def fetch_sharded(fetch: Callable[[List[str]], pd.DataFrame],
+                  shards: List[List[str]],
+                  executor: Executor) -> Tuple[pd.DataFrame, List[ShardTiming]]:
+    def _fetch(shard: int, symbols: List[str]) -> Tuple[pd.DataFrame, ShardTiming]:
+        start = perf_counter()
+        df = fetch(symbols)
+
+        return df, ShardTiming(shard, len(symbols), perf_counter() - start)
+
+    if len(shards) == 1:
+        rst = [_fetch(0, shards[0])]
+    else:
+        rst = list(executor.map(_fetch, range(len(shards)), shards))
+
+    return _merge(rst)
+
+
+async def afetch_sharded(fetch: Callable[[List[str]], Awaitable[pd.DataFrame]],
+                         shards: List[List[str]]) -> Tuple[pd.DataFrame, List[ShardTiming]]:
+    async def _fetch(shard: int, symbols: List[str]) -> Tuple[pd.DataFrame, ShardTiming]:
+        start = perf_counter()
+        df = await fetch(symbols)
+
+        return df, ShardTiming(shard, len(symbols), perf_counter() - start)
+
+    rst = await asyncio.gather(*[_fetch(i, shard) for i, shard in enumerate(shards)])
+
+    return _merge(rst)
+
+
+def _merge(rst: List[Tuple[pd.DataFrame, ShardTiming]]) -> Tuple[pd.DataFrame, List[ShardTiming]]:
+    dfs = [df for df, _ in rst]
+    timings = [timing for _, timing in rst]
+
+    df = dfs[0] if len(dfs) == 1 else pd.concat(dfs)
+
+    return df, timings
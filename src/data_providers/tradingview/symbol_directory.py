@@ -0,0 +1,300 @@
+import json
+import re
+from bisect import bisect_left
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from data_providers.store import atomic_write
+from data_providers.tradingview.search_cache import SearchKey
+from tradingview.watchlist import (SYMBOLS_64_STOCKS, SYMBOLS_JPX,
+                                   SYMBOLS_LATIN_AMERICA, SYMBOLS_TREASURY)
+
+_WATCHLISTS = [SYMBOLS_64_STOCKS, SYMBOLS_LATIN_AMERICA, SYMBOLS_TREASURY, SYMBOLS_JPX]
+
+_MARKUP = re.compile(r'</?em>')
+
+# fields of `symbol_resolved` kept with the fields of search results
+_RESOLVED_FIELDS = ['name', 'pro_name', 'exchange', 'listed_exchange', 'description', 'type',
+                    'currency_code', 'session', 'timezone', 'pricescale', 'minmov']
+
+_DIRECTORIES: Dict[Optional[str], 'SymbolDirectory'] = {}
+_DIRECTORIES_LOCK = Lock()
+
+
+class SymbolDirectory:
+    '''
+    This class keeps what is known of symbols by pro name (e.g. `NASDAQ:AAPL`), with aliases such as `AAPL`
+    resolving to the pro name the upstream picked for them; names are indexed in a sorted array for prefix lookup.
+    Searches are only answered for the `(query, country)` an unfiltered search resolved to a single item.
+    With `path` the directory is loaded from and saved to a JSON file
+    '''
+
+    def __init__(self,
+                 path: str = None,
+                 save_interval: float = 60) -> None:
+        self._path = path
+        self._save_interval = save_interval
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._aliases: Dict[str, str] = {}
+        self._searches: Dict[Tuple[str, str], str] = {}
+        self._index: List[Tuple[str, str]] = None
+        self._lock = Lock()
+        self._dirty = False
+        self._saved_at = monotonic()
+        self._hits = 0
+        self._misses = 0
+
+        if path:
+            self.load()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            'symbols': len(self._records),
+            'aliases': len(self._aliases),
+            'hits': self._hits,
+            'misses': self._misses,
+        }
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        '''
+        This method returns the record of a pro name or alias
+        '''
+        key = name.upper()
+
+        with self._lock:
+            return self._records.get(self._aliases.get(key, key))
+
+    def canonical(self, names: Iterable[str]) -> Dict[str, str]:
+        '''
+        This method maps names to their pro names, unknown names to themselves
+        '''
+        with self._lock:
+            return {i: self._aliases.get(i.upper(), i) for i in names}
+
+    def search(self, keys: Iterable[SearchKey]) -> Dict[SearchKey, Dict[str, Any]]:
+        '''
+        This method answers the searches whose query and country an unfiltered search resolved to a single item,
+        when that item matches their filters and has details; other queries, even naming a known symbol, go upstream
+        '''
+        rst = {}
+
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                query, country, exchange, search_type, economic_category, start = key
+                record = self._records.get(self._searches.get((query, country)))
+
+                if (record is None or 'type' not in record or economic_category or start
+                        or (exchange and exchange.upper() != record.get('exchange', '').upper())
+                        or (search_type and search_type != record['type'])):
+                    self._misses += 1
+                    continue
+
+                self._hits += 1
+                rst[key] = record
+
+        return rst
+
+    def prefix(self, prefix: str, limit: int = 20) -> List[Dict[str, Any]]:
+        '''
+        This method returns up to `limit` records whose pro name, symbol or alias starts with `prefix`
+        '''
+        prefix = prefix.upper()
+        rst: Dict[str, Dict[str, Any]] = {}
+
+        with self._lock:
+            if self._index is None:
+                self._index = sorted({*((i, i) for i in self._records),
+                                      *((i.split(':', 1)[-1], i) for i in self._records),
+                                      *self._aliases.items()})
+
+            for key, name in self._index[bisect_left(self._index, (prefix,)):]:
+                if not key.startswith(prefix) or len(rst) >= limit:
+                    break
+
+                if name in self._records:
+                    rst.setdefault(name, self._records[name])
+
+        return list(rst.values())
+
+    def add_search_results(self, results: Dict[SearchKey, Optional[Dict[str, Any]]]) -> None:
+        '''
+        This method takes results of `search`, either the item a query resolved to or the whole response
+        '''
+        with self._lock:
+            for key, result in results.items():
+                if not result:
+                    continue
+
+                query, country = key[:2]
+                # a filtered search may rank first another symbol than the one the bare ticker stands for
+                unfiltered = not any(key[2:])
+
+                items = result['symbols'] if 'symbols' in result else [result]
+
+                # the upstream only returns a single item when its symbol is the query as it was typed
+                if unfiltered and 'symbols' in result:
+                    self._unsearch(query, country)
+
+                for n, item in enumerate(items):
+                    record = _search_record(item)
+                    if record is None:
+                        continue
+
+                    self._add(record)
+
+                    if n == 0 and unfiltered and record['symbol'].upper() == query.upper():
+                        self._alias(query, record['pro_name'])
+
+                    if unfiltered and 'symbols' not in result:
+                        self._searched(query, country, record['pro_name'])
+
+    def add_resolved(self, resolved: Dict[str, Dict[str, Any]]) -> None:
+        '''
+        This method takes `symbol_resolved` payloads by the symbol requested for them
+        '''
+        with self._lock:
+            for symbol, payload in resolved.items():
+                pro_name = payload.get('pro_name')
+                if not pro_name:
+                    continue
+
+                record = {i: payload[i] for i in _RESOLVED_FIELDS if i in payload}
+                record['symbol'] = pro_name.split(':', 1)[-1]
+
+                self._add(record)
+                self._alias(symbol, pro_name)
+
+    def add_watchlist(self, symbols: Dict[str, str]) -> None:
+        '''
+        This method takes a watchlist map of names to pro names, e.g. `{'TOYOTA MOTOR': 'TSE:7203'}`
+        '''
+        with self._lock:
+            for name, pro_name in symbols.items():
+                exchange, symbol = pro_name.split(':', 1)
+
+                if pro_name.upper() not in self._records:
+                    self._add({'symbol': symbol, 'exchange': exchange, 'pro_name': pro_name})
+
+                self._alias(name, pro_name)
+
+    def refresh(self, results: Dict[SearchKey, Optional[Dict[str, Any]]]) -> None:
+        '''
+        This method takes fresh search results of known names and drops the aliases the upstream no longer knows
+        '''
+        with self._lock:
+            for key, result in results.items():
+                if result is None and self._aliases.pop(key[0].upper(), None) is not None:
+                    self._changed()
+
+                if result is None:
+                    self._unsearch(*key[:2])
+
+        self.add_search_results(results)
+
+    def aliases(self) -> List[str]:
+        with self._lock:
+            return list(self._aliases)
+
+    def load(self) -> None:
+        try:
+            with open(self._path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+
+        with self._lock:
+            self._records.update(data.get('records', {}))
+            self._aliases.update(data.get('aliases', {}))
+            self._searches.update({(query, country): pro_name
+                                   for country, searches in data.get('searches', {}).items()
+                                   for query, pro_name in searches.items()})
+            self._index = None
+
+    def save(self) -> None:
+        with self._lock:
+            searches: Dict[str, Dict[str, str]] = {}
+            for (query, country), pro_name in self._searches.items():
+                searches.setdefault(country, {})[query] = pro_name
+
+            data = json.dumps({'records': self._records, 'aliases': self._aliases, 'searches': searches})
+            self._dirty = False
+            self._saved_at = monotonic()
+
+        with atomic_write(self._path) as tmp, open(tmp, 'w') as f:
+            f.write(data)
+
+    def flush(self, force=False) -> None:
+        '''
+        This method saves changes at most once per `save_interval` seconds, unless `force`
+        '''
+        if self._path and self._dirty and (force or monotonic() - self._saved_at >= self._save_interval):
+            self.save()
+
+    def _add(self, record: Dict[str, Any]) -> None:
+        key = record['pro_name'].upper()
+        current = self._records.get(key)
+
+        if current is None or any(current.get(k) != v for k, v in record.items()):
+            self._records[key] = {**(current or {}), **record}
+            self._changed()
+
+    def _alias(self, name: str, pro_name: str) -> None:
+        key, value = name.upper(), pro_name.upper()
+
+        if key != value and self._aliases.get(key) != value:
+            self._aliases[key] = value
+            self._changed()
+
+    def _searched(self, query: str, country: str, pro_name: str) -> None:
+        value = pro_name.upper()
+
+        if self._searches.get((query, country)) != value:
+            self._searches[(query, country)] = value
+            self._dirty = True
+
+    def _unsearch(self, query: str, country: str) -> None:
+        if self._searches.pop((query, country), None) is not None:
+            self._dirty = True
+
+    def _changed(self) -> None:
+        self._index = None
+        self._dirty = True
+
+
+def _search_record(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    symbol = item.get('symbol')
+    exchange = item.get('prefix') or item.get('exchange')
+
+    if not symbol or not exchange:
+        return None
+
+    symbol = _MARKUP.sub('', symbol)
+    record = {k: _MARKUP.sub('', v) if isinstance(v, str) else v for k, v in item.items()}
+    record.update(symbol=symbol, pro_name=f'{exchange}:{symbol}')
+
+    return record
+
+
+def symbol_directory(path: str = None) -> SymbolDirectory:
+    '''
+    This function returns the directory of `path` shared by every client of the process,
+    seeded with the static watchlists when it is created
+    '''
+    with _DIRECTORIES_LOCK:
+        directory = _DIRECTORIES.get(path)
+
+        if directory is None:
+            directory = _DIRECTORIES[path] = SymbolDirectory(path)
+
+            for i in _WATCHLISTS:
+                directory.add_watchlist(i)
+
+        return directory
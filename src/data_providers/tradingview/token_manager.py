@@ -0,0 +1,186 @@
+import fcntl
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from logging import INFO, StreamHandler, getLogger
+from threading import Lock, Timer
+from time import time
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from data_providers.store import atomic_write
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+logger.addHandler(StreamHandler())
+
+_MANAGERS: Dict[Tuple[str, Optional[str]], 'TokenManager'] = {}
+_MANAGERS_LOCK = Lock()
+
+
+class TokenManager:
+    '''
+    This class keeps a sign-in token for `ttl` seconds; one caller signs in while the others wait for its token,
+    and with `path` the token is shared through a locked file by every process of the host.
+    The token is refreshed in the background `refresh_before` seconds ahead of its expiry
+    '''
+
+    def __init__(self,
+                 fetch: Callable[[], str],
+                 key: str = '',
+                 ttl: float = 12 * 60 * 60,
+                 refresh_before: float = 5 * 60,
+                 path: str = None) -> None:
+        self._fetch = fetch
+        self._key = hashlib.sha1(key.encode()).hexdigest()
+        self._ttl = ttl
+        self._refresh_before = min(refresh_before, ttl / 2)
+        self._path = path
+        self._token: str = None
+        self._expires_at = 0.
+        self._lock = Lock()
+        self._timer: Timer = None
+        self._fetches = 0
+
+    @property
+    def expires_at(self) -> float:
+        return self._expires_at
+
+    @property
+    def fetches(self) -> int:
+        return self._fetches
+
+    @property
+    def current(self) -> Optional[str]:
+        '''
+        This method returns the token if it is still valid, without ever signing in
+        '''
+        token, expires_at = self._token, self._expires_at
+
+        return token if token is not None and time() < expires_at else None
+
+    def get(self) -> str:
+        token = self.current
+
+        if token is not None:
+            return token
+
+        with self._lock:
+            if self._token is None or time() >= self._expires_at:
+                self._refresh(force=False)
+
+            return self._token
+
+    def invalidate(self, token: str = None) -> None:
+        '''
+        This method drops a token rejected by the upstream, from memory and file, so that the next caller signs in;
+        a `token` other than the current one was replaced already, so sockets rejecting it together sign in once
+        '''
+        with self._lock:
+            if token is not None and token != self._token:
+                return
+
+            self._token, self._expires_at = None, 0.
+
+            if self._path:
+                with self._locked(fcntl.LOCK_EX):
+                    entries = self._read()
+                    entry = entries.get(self._key)
+
+                    if entry is not None and (token is None or entry['token'] == token):
+                        del entries[self._key]
+                        self._write(entries)
+
+    def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _refresh(self, force: bool) -> None:
+        if not self._path:
+            self._set(self._fetch(), time() + self._ttl)
+            return
+
+        with self._locked(fcntl.LOCK_EX):
+            entry = self._read().get(self._key)
+
+            # another process may have signed in while this one waited for the lock
+            if entry and entry['expires_at'] - time() > (self._refresh_before if force else 0):
+                self._set(entry['token'], entry['expires_at'], fetched=False)
+                return
+
+            self._set(self._fetch(), time() + self._ttl)
+
+            if self._token:
+                entries = self._read()
+                entries[self._key] = {'token': self._token, 'expires_at': self._expires_at}
+                self._write(entries)
+
+    def _set(self, token: str, expires_at: float, fetched=True) -> None:
+        self._token, self._expires_at = token, expires_at
+
+        if fetched:
+            self._fetches += 1
+
+        # anonymous access has nothing to refresh
+        if token:
+            self._schedule()
+
+    def _schedule(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+
+        self._timer = Timer(max(self._expires_at - self._refresh_before - time(), 0), self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            with self._lock:
+                self._refresh(force=True)
+        except Exception as e:
+            # callers still get the current token until it expires, then sign in themselves
+            logger.warning('Token refresh failed "%s"', e)
+
+    @contextmanager
+    def _locked(self, operation: int) -> Iterator[None]:
+        directory = os.path.dirname(os.path.abspath(self._path))
+        os.makedirs(directory, exist_ok=True)
+
+        with open(f'{self._path}.lock', 'a') as f:
+            fcntl.flock(f, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with open(self._path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write(self, entries: Dict[str, Dict[str, float]]) -> None:
+        with atomic_write(self._path) as tmp:
+            # tokens are credentials, only the owner reads them
+            os.chmod(tmp, 0o600)
+
+            with open(tmp, 'w') as f:
+                json.dump(entries, f)
+
+
+def token_manager(fetch: Callable[[], str],
+                  key: str = '',
+                  ttl: float = 12 * 60 * 60,
+                  path: str = None) -> TokenManager:
+    '''
+    This function returns the manager of `key` shared by every client of the process
+    '''
+    with _MANAGERS_LOCK:
+        manager = _MANAGERS.get((key, path))
+
+        if manager is None:
+            manager = _MANAGERS[(key, path)] = TokenManager(fetch, key=key, ttl=ttl, path=path)
+
+        return manager
@@ -1,18 +1,40 @@
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from logging import INFO, StreamHandler, getLogger
+from math import ceil
+from time import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
-import numpy as np
 import pandas as pd
 import pytz
 from pydantic.v1.utils import deep_update
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from data_providers.correlation import CorrelationStates, RollingCorrelation
 from data_providers.data_provider import DataProvider
 from data_providers.enums import Adjustment
+from data_providers.indicators import add_indicators, split_charts, warmup
+from data_providers.store import write_chunks
+from data_providers.tradingview.bar_cache import BarCache, freq_seconds
 from data_providers.tradingview.datetime import set_index_by_timestamp
+from data_providers.tradingview.performance import perf_table
+from data_providers.tradingview.quote_cache import QuoteCache
 from data_providers.tradingview.tradingview_client import TradingViewClient
-from models.data_models import Quote
+from infra.http import HttpClient
+from models.data_models import PartialQuotes, Quote
+from models.quote_batch import QuoteBatch
+
+_PERF_FIELDS = {
+    '24H': ['change_24h', 'change_24h_pct', 'low_24h', 'high_24h'],
+    '5D': ['change_5d', 'change_5d_pct', 'low_5d', 'high_5d'],
+    '1M': ['change_1m', 'change_1m_pct', 'low_1m', 'high_1m'],
+    'MTD': ['change_mtd', 'change_mtd_pct', 'low_mtd', 'high_mtd'],
+    'YTD': ['change_ytd', 'change_ytd_pct', 'low_ytd', 'high_ytd'],
+}
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+logger.addHandler(StreamHandler())
 
 
 class TradingView(DataProvider):
@@ -20,15 +42,56 @@ class TradingView(DataProvider):
 
     _tv: Optional[TradingViewClient] = None
     _executor: Optional[ThreadPoolExecutor] = None
+    _shard_executor: Optional[ThreadPoolExecutor] = None
+    _quote_cache: Optional[QuoteCache] = None
+    _bar_cache: Optional[BarCache] = None
+    _correlation_states: Optional[CorrelationStates] = None
     username: str = ''
     password: str = ''
     TOKEN: str = ''
+    TOKEN_TTL: float = 12 * 60 * 60
+    TOKEN_PATH: str = None
     market: str = ''
+    WS_URL: str = None
+    WS_POOL_SIZE: int = 4
+    WS_MAX_SESSIONS_PER_SOCKET: int = 50
+    WS_IDLE_TIMEOUT: int = 300
+    WS_SESSIONS_PER_SHARD: int = None
+    QUOTE_CACHE_SIZE: int = 1000
+    BAR_CACHE_SIZE: int = 2000
+    BACKFILL_CHUNK_SIZE: int = 5000
+    QUOTES_DEADLINE: float = 30
+    VALIDATE_QUOTES: bool = False
+    HTTP_CONCURRENCY: int = 16
+    SEARCH_CACHE_SIZE: int = 10000
+    SEARCH_CACHE_TTL: float = 24 * 60 * 60
+    SYMBOL_DIRECTORY_PATH: str = None
+    CALENDAR_TTL: float = 24 * 60 * 60
+    CALENDAR_RECENT_TTL: float = 5 * 60
+    RELATED_EVENTS_TTL: float = 60 * 60
+    CORRELATION_STATE_DIR: str = None
+    CORRELATION_REFRESH: float = 60 * 60
+    CORRELATION_UNIVERSE_TTL: float = 7 * 24 * 60 * 60
+    HTTP: HttpClient = None
 
     @property
     def tv(self) -> TradingViewClient:
         if not self._tv:
-            self._tv = TradingViewClient(self.username, self.password, self.TOKEN, self.market)
+            self._tv = TradingViewClient(self.username, self.password, self.TOKEN, self.market,
+                                         pool_size=self.WS_POOL_SIZE,
+                                         max_sessions_per_socket=self.WS_MAX_SESSIONS_PER_SOCKET,
+                                         idle_timeout=self.WS_IDLE_TIMEOUT,
+                                         http_concurrency=self.HTTP_CONCURRENCY,
+                                         ws_url=self.WS_URL,
+                                         token_ttl=self.TOKEN_TTL,
+                                         token_path=self.TOKEN_PATH,
+                                         search_cache_size=self.SEARCH_CACHE_SIZE,
+                                         search_cache_ttl=self.SEARCH_CACHE_TTL,
+                                         symbol_directory_path=self.SYMBOL_DIRECTORY_PATH,
+                                         calendar_ttl=self.CALENDAR_TTL,
+                                         calendar_recent_ttl=self.CALENDAR_RECENT_TTL,
+                                         related_events_ttl=self.RELATED_EVENTS_TTL,
+                                         http=self.HTTP)
 
         return self._tv
 
@@ -39,6 +102,35 @@ class TradingView(DataProvider):
 
         return self._executor
 
+    @property
+    def shard_executor(self) -> ThreadPoolExecutor:
+        # separate from `executor` because `quotes` already calls `ohlcv` on it
+        if not self._shard_executor:
+            self._shard_executor = ThreadPoolExecutor(max_workers=self.WS_POOL_SIZE or 1)
+
+        return self._shard_executor
+
+    @property
+    def quote_cache(self) -> QuoteCache:
+        if self._quote_cache is None:
+            self._quote_cache = QuoteCache(max_size=self.QUOTE_CACHE_SIZE)
+
+        return self._quote_cache
+
+    @property
+    def bar_cache(self) -> BarCache:
+        if self._bar_cache is None:
+            self._bar_cache = BarCache(max_size=self.BAR_CACHE_SIZE)
+
+        return self._bar_cache
+
+    @property
+    def correlation_states(self) -> CorrelationStates:
+        if self._correlation_states is None:
+            self._correlation_states = CorrelationStates(self.CORRELATION_STATE_DIR)
+
+        return self._correlation_states
+
     def search(self,
                symbols: List[str],
                params: Dict[str, Any] = None) -> Dict[str, Union[None, Dict[str, Any]]]:
@@ -52,102 +144,74 @@ class TradingView(DataProvider):
     @retry(wait=wait_exponential(multiplier=1, min=4, max=10), stop=stop_after_attempt(3))
     def quotes(self,
                symbols: Union[str, List[str]],
-               fields: List[str] = None) -> Union[Quote, Dict[str, Quote]]:
-        return_single = isinstance(symbols, str)
-
-        if fields is None:
-            fields = [*Quote.model_fields.keys()]
-        elif '*' in fields:
-            fields = []
-
-        fields = [Quote.fields_map().get(i, i) for i in fields or []]
-
-        is_get_change_24h = len(set(fields) & set(['change_24h', 'change_24h_pct', 'low_24h', 'high_24h'])) > 0
-        is_get_change_5d = len(set(fields) & set(['change_5d', 'change_5d_pct', 'low_5d', 'high_5d'])) > 0
-        is_get_change_1m = len(set(fields) & set(['change_1m', 'change_1m_pct', 'low_1m', 'high_1m'])) > 0
-        is_get_change_mtd = len(set(fields) & set(['change_mtd', 'change_mtd_pct', 'low_mtd', 'high_mtd'])) > 0
-        is_get_change_ytd = len(set(fields) & set(['change_ytd', 'change_ytd_pct', 'low_ytd', 'high_ytd'])) > 0
-
-        if True in [is_get_change_24h,
-                    is_get_change_5d,
-                    is_get_change_1m,
-                    is_get_change_mtd,
-                    is_get_change_ytd]:
+               fields: List[str] = None,
+               max_age: float = None,
+               partial=False,
+               columnar=False) -> Union[Quote, Dict[str, Quote], PartialQuotes, QuoteBatch]:
+        '''
+        This method answers from the last-value cache for symbols whose fields are younger than `max_age` seconds
+        and fetches only the others; with `partial`, symbols not completed within `QUOTES_DEADLINE` seconds
+        are reported in the status map instead of failing the whole request; with `columnar`, quotes are
+        returned as one `QuoteBatch`
+        '''
+        if partial and isinstance(symbols, str):
+            symbols = [symbols]
+
+        fields = _quote_fields(fields)
+        horizons = _perf_horizons(fields)
+
+        ohlcv: pd.DataFrame = None
+
+        if horizons:
             def _get_quotes_or_ohlcv(fn: str):
                 if fn == 'current_quotes':
-                    return self.tv.current_quotes(symbols, fields=fields)
+                    return self._current_quotes(symbols, fields, max_age, partial)
                 elif fn == 'ohlcv':
                     _ohlcv = self.ohlcv(symbols=symbols,
                                         freq='1D',
                                         total_candles=252 * 2,
-                                        tzinfo='America/Chicago').reset_index()
-
-                    _ohlcv['Date'] = _ohlcv['Date'].dt.tz_localize(None)
+                                        tzinfo='America/Chicago')
 
-                    return _ohlcv
+                    return _perf_ohlcv(_ohlcv)
 
                 return
 
-            quotes, ohlcv = self.executor.map(_get_quotes_or_ohlcv, ['current_quotes', 'ohlcv'])
+            (quotes, statuses), ohlcv = self.executor.map(_get_quotes_or_ohlcv, ['current_quotes', 'ohlcv'])
         else:
-            quotes = self.tv.current_quotes(symbols, fields=fields)
-
-        if return_single:
-            quotes = {symbols: quotes}
-
-        rst: Dict[str, Quote] = {}
-        for symbol, quote_dict in quotes.items():
-            quote_dict.update({'symbol': symbol})
+            quotes, statuses = self._current_quotes(symbols, fields, max_age, partial)
 
-            extra = {k: v for k, v in quote_dict.items()
-                     if k not in Quote.non_extra_keys()}
-            if extra:
-                quote_dict.update({'extra': extra})
+        if columnar:
+            return _build_quote_batch(symbols, quotes, ohlcv, fields, horizons, statuses if partial else None)
 
-            quote = Quote(**quote_dict)
+        rst = _build_quotes(symbols, quotes, ohlcv, fields, horizons, self.VALIDATE_QUOTES)
 
-            if quote.logoid:
-                quote.logo_url = f'{__class__.STORAGE_BASE_URL}/{quote.logoid}--big.svg'
+        if partial:
+            return PartialQuotes(quotes=rst, status=statuses)
 
-            if quote.source_logoid:
-                quote.source_logo_url = f'{__class__.STORAGE_BASE_URL}/{quote.source_logoid}--big.svg'
-
-            rst[symbol] = quote
-
-        if is_get_change_24h:
-            perf_dict = self.calc_perf(ohlcv, '24H')
-
-            for k, v in perf_dict.items():
-                rst[k] = rst[k].model_copy(update={_k: _v for _k, _v in v.items() if _k in fields})
-
-        if is_get_change_5d:
-            perf_dict = self.calc_perf(ohlcv, '5D')
-
-            for k, v in perf_dict.items():
-                rst[k] = rst[k].model_copy(update={_k: _v for _k, _v in v.items() if _k in fields})
-
-        if is_get_change_1m:
-            perf_dict = self.calc_perf(ohlcv, '1M')
-
-            for k, v in perf_dict.items():
-                rst[k] = rst[k].model_copy(update={_k: _v for _k, _v in v.items() if _k in fields})
+        return rst
 
-        if is_get_change_mtd:
-            perf_dict = self.calc_perf(ohlcv, 'MTD')
+    def _current_quotes(self,
+                        symbols: Union[str, List[str]],
+                        fields: List[str],
+                        max_age: float = None,
+                        partial=False) -> Tuple[Union[Dict[str, Any], Dict[str, Dict[str, Any]]], Dict[str, str]]:
+        _symbols = [symbols] if isinstance(symbols, str) else symbols
 
-            for k, v in perf_dict.items():
-                rst[k] = rst[k].model_copy(update={_k: _v for _k, _v in v.items() if _k in fields})
+        quotes, missing = self.quote_cache.lookup(_symbols, fields, max_age)
+        statuses = dict.fromkeys(quotes, 'ok')
 
-        if is_get_change_ytd:
-            perf_dict = self.calc_perf(ohlcv, 'YTD')
+        if missing and partial:
+            fresh, _statuses = self.tv.current_quotes_partial(missing, fields=fields, deadline=self.QUOTES_DEADLINE)
+            quotes.update(fresh)
+            statuses.update(_statuses)
 
-            for k, v in perf_dict.items():
-                rst[k] = rst[k].model_copy(update={_k: _v for _k, _v in v.items() if _k in fields})
+            _put_quotes(self.quote_cache, {k: v for k, v in fresh.items() if _statuses.get(k) == 'ok'}, fields)
+        elif missing:
+            fresh = self.tv.current_quotes(missing, fields=fields)
+            quotes.update(_put_quotes(self.quote_cache, fresh, fields))
+            statuses.update(dict.fromkeys(fresh, 'ok'))
 
-        if return_single:
-            return rst[symbols]
-
-        return rst
+        return _ordered_quotes(symbols, quotes), _ordered_statuses(_symbols, statuses)
 
     def ohlcv(self,
               symbols: Union[str, List[str]],
@@ -159,27 +223,84 @@ class TradingView(DataProvider):
         if isinstance(symbols, str):
             symbols = [symbols]
 
-        if isinstance(tzinfo, str):
-            tzinfo = pytz.timezone(tzinfo)
-
-        ohlcv = self.tv.ohlcv(symbols=symbols,
-                              freq=freq,
-                              total_candles=total_candles,
-                              charts=charts,
-                              adjustment=adjustment.value)
-
-        ohlcv = set_index_by_timestamp(ohlcv, tzinfo)
-        ohlcv.index.rename(inplace=True, names={'timestamp': 'Date',
-                                                'symbol': 'Symbol'})
-        ohlcv.rename(axis=1, inplace=True, mapper={'open': 'Open',
-                                                   'high': 'High',
-                                                   'low': 'Low',
-                                                   'close': 'Close',
-                                                   'volume': 'Volume'})
-        ohlcv.rename_axis(axis=1, inplace=True, mapper='Field')
+        local_charts, server_charts = split_charts(charts)
+        # local charts are computed over earlier bars too, so their first values are settled
+        candles = total_candles + warmup(local_charts)
+
+        # study values depend on the requested history, so only plain series are cached
+        if server_charts or freq_seconds(freq) is None:
+            ohlcv = self._fetch_ohlcv(symbols, freq, candles, server_charts, adjustment.value)
+        else:
+            for _candles, _symbols in self.bar_cache.plan(symbols, freq, adjustment.value, candles).items():
+                ohlcv = self._fetch_ohlcv(_symbols, freq, _candles, [], adjustment.value)
+                self.bar_cache.update(ohlcv, freq, adjustment.value, _candles)
+
+            ohlcv = self.bar_cache.window(symbols, freq, adjustment.value, candles)
+
+        ohlcv = add_indicators(ohlcv, local_charts, tail=total_candles + 1)
+
+        return _format_ohlcv(ohlcv, tzinfo)
+
+    def _fetch_ohlcv(self,
+                     symbols: List[str],
+                     freq: str,
+                     total_candles: int,
+                     charts: List[str],
+                     adjustment: str) -> pd.DataFrame:
+        ohlcv, timings = self.tv.ohlcv_sharded(symbols=symbols,
+                                               freq=freq,
+                                               total_candles=total_candles,
+                                               charts=charts,
+                                               adjustment=adjustment,
+                                               shard_size=self.WS_SESSIONS_PER_SHARD,
+                                               executor=self.shard_executor)
+
+        for i in timings:
+            logger.info('OHLCV shard %s: %s symbols in %.3f seconds', i.shard, i.symbols, i.seconds)
 
         return ohlcv
 
+    def ohlcv_backfill(self,
+                       symbol: str,
+                       freq: str,
+                       from_date: Union[str, datetime] = None,
+                       to_date: Union[str, datetime] = None,
+                       total_candles: int = None,
+                       adjustment=Adjustment.DIVIDENDS,
+                       tzinfo: Union[str, pytz.BaseTzInfo] = pytz.UTC) -> Iterator[pd.DataFrame]:
+        '''
+        This method yields the history of symbol in chunks of `BACKFILL_CHUNK_SIZE` bars, newest chunk first,
+        back to `from_date` or `total_candles` (whole history if neither is given)
+        '''
+        chunks = self.tv.ohlcv_backfill(symbol,
+                                        freq,
+                                        chunk_size=self.BACKFILL_CHUNK_SIZE,
+                                        from_ts=_utc_timestamp(from_date),
+                                        to_ts=_utc_timestamp(to_date),
+                                        total_candles=total_candles,
+                                        adjustment=adjustment.value)
+
+        for chunk in chunks:
+            yield _format_ohlcv(chunk, tzinfo)
+
+    def ohlcv_backfill_to_file(self,
+                               path: str,
+                               symbol: str,
+                               freq: str,
+                               from_date: Union[str, datetime] = None,
+                               to_date: Union[str, datetime] = None,
+                               total_candles: int = None,
+                               adjustment=Adjustment.DIVIDENDS) -> int:
+        chunks = self.ohlcv_backfill(symbol, freq, from_date, to_date, total_candles, adjustment)
+
+        return write_chunks(path, chunks)
+
+    def symbols(self, prefix: str, limit: int = 20) -> List[Dict[str, Any]]:
+        '''
+        This method returns known symbols whose pro name, ticker or alias starts with `prefix`, without any request
+        '''
+        return self.tv.symbol_directory.prefix(prefix, limit)
+
     def economic_calendar(self,
                           from_date: Union[str, datetime],
                           to_date: Union[str, datetime],
@@ -209,115 +330,254 @@ class TradingView(DataProvider):
                      freq: int = '1D',
                      total_candles: int = 252,
                      tzinfo=None,
-                     periods=['1D', '5D', '10D', '21D']) -> pd.DataFrame:
-        if isinstance(markets, str):
-            markets = [markets]
-
-        if isinstance(exchanges, str):
-            exchanges = [exchanges]
-
-        sort_by, sort_order = sort
-
-        payload = {
-            'columns': ['name', sort_by],
-            'range': [0, topn],
-            'sort': {'sortBy': sort_by, 'sortOrder': sort_order},
-            'markets': markets or [],
-        }
-        if exchanges:
-            payload = deep_update(payload,
-                                  {'filter': [{
-                                      'left': 'exchange',
-                                      'operation': 'in_range',
-                                      'right': exchanges or []}]})
-
-        # return payload
-        assets = self.tv.scan(payload)
-        symbols = pd.DataFrame(assets)['s']
-
-        ohlcv = self.ohlcv(symbols=list(symbols),
-                           freq=freq,
-                           total_candles=total_candles,
-                           tzinfo=tzinfo).stack().unstack('Symbol') \
-            .rename_axis(['Date', 'Field'], axis=0).swaplevel().sort_index() \
-            .ffill(axis=0).dropna(how='all')
-
-        rst = _calc_corr(ohlcv, periods)
+                     periods=['1D', '5D', '10D', '21D'],
+                     top_k: int = 1) -> pd.DataFrame:
+        '''
+        This method returns the `top_k` most correlated symbols of each of the `topn` symbols of markets by `sort`,
+        for forward returns over each of `periods`. Answers come from a rolling state of the query, updated with
+        the candles elapsed at most every `CORRELATION_REFRESH` seconds; the scan and every candle are requested
+        again only when the state lacks a period, is older than `CORRELATION_UNIVERSE_TTL` or too far behind
+        '''
+        key = CorrelationStates.key(markets=markets, exchanges=exchanges, sort=sort, topn=topn, freq=freq,
+                                    total_candles=total_candles, tzinfo=tzinfo)
+        state = self.correlation_states.get(key)
+
+        candles = _correlation_candles(state, periods, freq, total_candles,
+                                       self.CORRELATION_REFRESH, self.CORRELATION_UNIVERSE_TTL)
+
+        if candles is None:
+            assets = self.tv.scan(_scan_payload(markets, exchanges, sort, topn))
+            symbols = pd.DataFrame(assets)['s']
+
+            ohlcv = self.ohlcv(symbols=list(symbols),
+                               freq=freq,
+                               total_candles=total_candles,
+                               tzinfo=tzinfo)
+
+            state = RollingCorrelation.from_closes(_correlation_closes(ohlcv),
+                                                   _correlation_periods(state, periods),
+                                                   total_candles)
+            self.correlation_states.put(key, state)
+        elif candles:
+            ohlcv = self.ohlcv(symbols=state.symbols,
+                               freq=freq,
+                               total_candles=candles,
+                               tzinfo=tzinfo)
+
+            state.extend(_correlation_closes(ohlcv))
+            state.refreshed_at = time()
+            self.correlation_states.put(key, state)
+
+        rst = state.correlations(periods, top_k)
 
         return rst
 
     def calc_perf(self,
                   ohlcv: pd.DataFrame,
                   freq: str = '5d') -> Dict[str, Dict[str, Any]]:
-        symbols = ohlcv.Symbol.unique()
-        _ohlcv: pd.DataFrame = ohlcv.set_index(['Date', 'Symbol'])
+        return _calc_perf(ohlcv, freq)
+
+
+def _quote_fields(fields: List[str] = None) -> List[str]:
+    if fields is None:
+        fields = [*Quote.model_fields.keys()]
+    elif '*' in fields:
+        fields = []
+
+    return [Quote.fields_map().get(i, i) for i in fields or []]
+
+
+def _put_quotes(cache: QuoteCache,
+                quotes: Dict[str, Dict[str, Any]],
+                fields: List[str]) -> Dict[str, Dict[str, Any]]:
+    for k, v in quotes.items():
+        cache.put(k, v, fields)
+
+    return quotes
+
+
+def _ordered_quotes(symbols: Union[str, List[str]],
+                    quotes: Dict[str, Dict[str, Any]]) -> Union[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    if isinstance(symbols, str):
+        return quotes.get(symbols) or next(iter(quotes.values()))
+
+    # cache hits come first, keep the order of the request
+    return {**{i: quotes[i] for i in symbols if i in quotes}, **quotes}
+
+
+def _ordered_statuses(symbols: List[str], statuses: Dict[str, str]) -> Dict[str, str]:
+    return {**{i: statuses[i] for i in symbols if i in statuses}, **statuses}
+
+
+def _perf_horizons(fields: List[str]) -> List[str]:
+    '''
+    This function returns performance horizons (e.g. 24H, 5D) whose fields are requested
+    '''
+    return [k for k, v in _PERF_FIELDS.items() if set(fields) & set(v)]
+
+
+def _perf_ohlcv(ohlcv: pd.DataFrame) -> pd.DataFrame:
+    _ohlcv = ohlcv.reset_index()
+    _ohlcv['Date'] = _ohlcv['Date'].dt.tz_localize(None)
+
+    return _ohlcv
+
+
+def _perf_columns(ohlcv: pd.DataFrame,
+                  fields: List[str],
+                  horizons: List[str]) -> Optional[pd.DataFrame]:
+    '''
+    This function returns the requested performance fields by symbol
+    '''
+    if not horizons:
+        return None
+
+    perf_fields = [i for horizon in horizons for i in _PERF_FIELDS[horizon] if i in fields]
+
+    return perf_table(ohlcv, horizons)[perf_fields]
+
+
+def _build_quote_batch(symbols: Union[str, List[str]],
+                       quotes: Union[Dict[str, Any], Dict[str, Dict[str, Any]]],
+                       ohlcv: pd.DataFrame,
+                       fields: List[str],
+                       horizons: List[str],
+                       statuses: Dict[str, str] = None) -> QuoteBatch:
+    if isinstance(symbols, str):
+        quotes = {symbols: quotes}
+
+    return QuoteBatch.from_upstream(quotes,
+                                    columns=_perf_columns(ohlcv, fields, horizons),
+                                    status=statuses,
+                                    logo_base_url=TradingView.STORAGE_BASE_URL)
+
+
+def _build_quotes(symbols: Union[str, List[str]],
+                  quotes: Union[Dict[str, Any], Dict[str, Dict[str, Any]]],
+                  ohlcv: pd.DataFrame,
+                  fields: List[str],
+                  horizons: List[str],
+                  validate=False) -> Union[Quote, Dict[str, Quote]]:
+    return_single = isinstance(symbols, str)
+
+    if return_single:
+        quotes = {symbols: quotes}
+
+    perf = _perf_columns(ohlcv, fields, horizons)
+    perf = {} if perf is None else perf.to_dict('index')
+
+    items = [{**quote_dict, 'symbol': symbol, **perf.get(symbol, {})} for symbol, quote_dict in quotes.items()]
+
+    rst: Dict[str, Quote] = dict(zip(quotes, Quote.construct_many(items, validate=validate)))
+
+    for quote in rst.values():
+        if quote.logoid:
+            quote.logo_url = f'{TradingView.STORAGE_BASE_URL}/{quote.logoid}--big.svg'
+
+        if quote.source_logoid:
+            quote.source_logo_url = f'{TradingView.STORAGE_BASE_URL}/{quote.source_logoid}--big.svg'
+
+    if return_single:
+        return rst[symbols]
+
+    return rst
+
+
+def _utc_timestamp(date: Union[None, str, datetime]) -> Optional[pd.Timestamp]:
+    if date is None:
+        return None
+
+    date = pd.Timestamp(date)
+
+    return date.tz_localize('UTC') if date.tz is None else date.tz_convert('UTC')
+
+
+def _format_ohlcv(ohlcv: pd.DataFrame,
+                  tzinfo: Union[str, pytz.BaseTzInfo] = pytz.UTC) -> pd.DataFrame:
+    if isinstance(tzinfo, str):
+        tzinfo = pytz.timezone(tzinfo)
+
+    ohlcv = set_index_by_timestamp(ohlcv, tzinfo)
+    ohlcv.index.rename(inplace=True, names={'timestamp': 'Date',
+                                            'symbol': 'Symbol'})
+    ohlcv.rename(axis=1, inplace=True, mapper={'open': 'Open',
+                                               'high': 'High',
+                                               'low': 'Low',
+                                               'close': 'Close',
+                                               'volume': 'Volume'})
+    ohlcv.rename_axis(axis=1, inplace=True, mapper='Field')
+
+    return ohlcv
+
+
+def _calc_perf(ohlcv: pd.DataFrame,
+               freq: str = '5d') -> Dict[str, Dict[str, Any]]:
+    return perf_table(ohlcv, [freq]).to_dict('index')
 
-        freq = freq.lower()
-        freq_mapper = {
-            '24h': '24H',
-            '5d': 5,
-            '1m': 21,
-            'mtd': 'M',
-            'ytd': 'Y',
-        }
-        freq_num: Union[int, str] = freq_mapper.get(freq, freq)
 
-        perf_dict = {}
-        for s in symbols:
-            _ohlcv_sym: pd.DataFrame = _ohlcv.loc[:, s, :].copy()
+def _scan_payload(markets: Union[str, List[str]],
+                  exchanges: Union[str, List[str]],
+                  sort: Tuple[str, str],
+                  topn: int) -> Dict[str, Any]:
+    if isinstance(markets, str):
+        markets = [markets]
 
-            if isinstance(freq_num, str):
-                _ohlcv_agg: pd.DataFrame = _ohlcv_sym.Close.groupby(_ohlcv_sym.index.to_period(freq_num)).last().rename('close').to_frame()
-                _ohlcv_agg.loc[:, f'close_{freq}_prev'] = _ohlcv_agg.close.shift(1)
-                _ohlcv_agg.loc[:, f'change_{freq}'] = _ohlcv_agg.close - _ohlcv_agg[f'close_{freq}_prev']
-                _ohlcv_agg.loc[:, f'change_{freq}_pct'] = _ohlcv_agg[f'change_{freq}'] / _ohlcv_agg[f'close_{freq}_prev']
-                _ohlcv_agg.loc[:, f'low_{freq}'] = _ohlcv_sym.Low.groupby(_ohlcv_sym.index.to_period(freq_num)).min()
-                _ohlcv_agg.loc[:, f'high_{freq}'] = _ohlcv_sym.High.groupby(_ohlcv_sym.index.to_period(freq_num)).max()
-                _ohlcv_sym = _ohlcv_agg
+    if isinstance(exchanges, str):
+        exchanges = [exchanges]
 
-            elif isinstance(freq_num, int):
-                _ohlcv_sym.rename({'Close': 'close'}, axis=1, inplace=True)
-                _ohlcv_sym.loc[:, f'close_{freq}_prev'] = _ohlcv_sym.close.shift(freq_num)
-                _ohlcv_sym.loc[:, f'change_{freq}'] = _ohlcv_sym.close - _ohlcv_sym[f'close_{freq}_prev']
-                _ohlcv_sym.loc[:, f'change_{freq}_pct'] = _ohlcv_sym[f'change_{freq}'] / _ohlcv_sym[f'close_{freq}_prev']
-                _ohlcv_sym.loc[:, f'low_{freq}'] = _ohlcv_sym.Low.rolling(freq_num).min()
-                _ohlcv_sym.loc[:, f'high_{freq}'] = _ohlcv_sym.High.rolling(freq_num).max()
+    sort_by, sort_order = sort
 
-            cols_included = ['close',
-                             f'change_{freq}',
-                             f'change_{freq}_pct',
-                             f'low_{freq}',
-                             f'high_{freq}']
+    payload = {
+        'columns': ['name', sort_by],
+        'range': [0, topn],
+        'sort': {'sortBy': sort_by, 'sortOrder': sort_order},
+        'markets': markets or [],
+    }
+    if exchanges:
+        payload = deep_update(payload,
+                              {'filter': [{
+                                  'left': 'exchange',
+                                  'operation': 'in_range',
+                                  'right': exchanges or []}]})
 
-            perf_dict[s] = _ohlcv_sym[cols_included].iloc[-1].to_dict()
+    return payload
 
-        return perf_dict
 
+def _correlation_closes(ohlcv: pd.DataFrame) -> pd.DataFrame:
+    return ohlcv['Close'].unstack('Symbol').sort_index().ffill().dropna(how='all')
 
-def _calc_corr(ohlcv: pd.DataFrame, periods: List[str]) -> pd.DataFrame:
-    corr_ranks_ls: List[pd.DataFrame] = []
 
-    for p in periods:
-        closes = ohlcv.loc['Close']
-        num_intervals = closes.resample(p).count().max().max()
-        returns_fwd = closes.pct_change(-num_intervals)
+def _correlation_periods(state: Optional[RollingCorrelation], periods: List[str]) -> List[str]:
+    # periods asked before are kept when the state is built again
+    return list(dict.fromkeys([*(state.periods if state else []), *periods]))
 
-        _corr: pd.DataFrame = returns_fwd.corr() \
-            .rename_axis('s1', axis=0).rename_axis('s2', axis=1)
 
-        top_corr = np.argsort(_corr)[:, -2]
+def _correlation_candles(state: Optional[RollingCorrelation],
+                         periods: List[str],
+                         freq: str,
+                         total_candles: int,
+                         refresh: float,
+                         universe_ttl: float) -> Optional[int]:
+    '''
+    This function returns the number of candles to update `state` with, 0 when it is fresh, or `None` when it
+    must be built again from the scan and every candle
+    '''
+    seconds = freq_seconds(freq)
+    now = time()
 
-        pairs = pd.DataFrame({'s1': _corr.index,
-                              's2': _corr.columns[top_corr]})
+    if state is None or state.last_date is None or seconds is None or not set(periods) <= set(state.periods) \
+            or now - state.created_at >= universe_ttl:
+        return None
 
-        pairs_index = pd.MultiIndex.from_frame(pairs)
+    if now - state.refreshed_at < refresh:
+        return 0
 
-        _corr_ranks = _corr.stack().reindex(pairs_index).rename(p)
+    # candles without `tzinfo` are in UTC
+    last_date = state.last_date if state.last_date.tz else state.last_date.tz_localize('UTC')
+    elapsed = (pd.Timestamp.now(tz='UTC') - last_date).total_seconds()
 
-        corr_ranks_ls.append(_corr_ranks)
+    # the last candle kept may still have been forming, it is requested again
+    candles = ceil(elapsed / seconds) + 1
 
-    corr_ranks = pd.concat(corr_ranks_ls, axis=1).rename_axis('period', axis=1) \
-        .stack().rename('corr').reset_index().set_index(['period', 'corr']) \
-        .sort_index().reset_index().set_index(['period', 's1', 's2'])
+    return candles if candles < total_candles else None
 
-    return corr_ranks
\ No newline at end of file
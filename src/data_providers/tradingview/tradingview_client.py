@@ -1,24 +1,41 @@
 # @title Define TradingView class
 
 import json
-import random
-import re
-import string
-import time
-from datetime import datetime
-from itertools import repeat
-from time import perf_counter
-from typing import Any, Dict, List, Union
+from concurrent.futures import Executor, ThreadPoolExecutor
+from time import monotonic, perf_counter
+from typing import Any, Dict, Iterator, List, Tuple, Union
 
+import numpy as np
 import pandas as pd
-from pydantic.v1.utils import deep_update
-from requests import get, post
-from websocket import WebSocket, create_connection
+from requests import Session
+from websocket import WebSocket
+
+from data_providers.tradingview.bars import SERIES_COLUMNS, ChartSessionBars
+from data_providers.tradingview.calendar_cache import (CalendarRange,
+                                                       EconomicCalendarCache)
+from data_providers.tradingview.connection_pool import ConnectionPool
+from data_providers.tradingview.protocol import (FrameDecoder,
+                                                 generate_session,
+                                                 is_heartbeat,
+                                                 send_heartbeat,
+                                                 send_message)
+from data_providers.tradingview.quote_state import QuoteSessionState
+from data_providers.tradingview.search_cache import (SearchCache, SearchKey,
+                                                     search_keys)
+from data_providers.tradingview.sharding import (ShardTiming, fetch_sharded,
+                                                 plan_shards)
+from data_providers.tradingview.symbol_directory import (SymbolDirectory,
+                                                         symbol_directory)
+from data_providers.tradingview.token_manager import (TokenManager,
+                                                      token_manager)
+from infra.http import HttpClient
 
 _SCANNER_URL_ = 'https://scanner.tradingview.com'
 _API_URL_ = 'https://symbol-search.tradingview.com/symbol_search/v3'
 _ECONOMIC_URL = 'https://economic-calendar.tradingview.com'
 _WS_URL_ = 'wss://prodata.tradingview.com/socket.io/websocket?&type=chart'
+_WS_ORIGIN_ = 'https://data.tradingview.com'
+_WS_HEADERS_ = json.dumps({'Origin': _WS_ORIGIN_})
 
 _CHARTS_SETTINGS = {
     'ema10': ['Script@tv-scripting-101!', {'text': 'bmI9Ks46_u96awLDSJj8c4xVHubmEMw==_E3G6GqoJr5rLISOgO9nBsoc2e4nLvKBi1q5InR7AttexejdPJoAOC8z/vvUAqlCMpPiv11uwGy2v0EG7phDcDFZiaEKMt/1ooB+5hPaSKK7EuUzKTIGLFzbLtwjwO5Z7jR11jP1Z2MsAt9cN0smrwQMTjphpEDRVvzDqBcB2wZRR7BxQeQ9j7ynKMseInC5G34ToyLmrle0+4Dcw9IhWNkvpGLKhODeEIdjlfm6ZzEAu3cuuLIx9Kn1f1h6AdSVccLpVDzTy67dQ9TanhaaIy5Ogz+kuRYKTkkP63IaXvEn03t29DDUoWMxzQolZuBW6vDVAbHMgPm52yHN88uvJ5px4IGDbuRdJlTLrMpbgG4SAP+DWhKL6wbsu9MfYfe4bGMzfvF7vE/ltqlycHIHIjOS2SfFrqxmVg4eH1+V+/7g0JbnCvSJAeY/RKUCx+jJZa+Gm0mvhmvz+abYWJLpqTpBctZ8kYI+6EGVXgshUZrkahn+S0oGnvwOB4NzLMCSX9NLidpDZKuDuI2Whfb08toOkoGiF8JYhvnotLZSDa0DTDhwZtqQf0hAChG/3RK42S75LxcZwyTl39emlxdU9uDoDV+d/NHZFao+FSoNhSkTsqOnfuVp5l3V1yop8Psh64sbs2A1cGqu1', 'pineId': 'STD;EMA', 'pineVersion': '29.0', 'pineFeatures': {'v': '{\'indicator\':1,\'plot\':1,\'ta\':1}', 'f': True, 't': 'text'}, 'in_0': {'v': 10, 'f': True, 't': 'integer'}, 'in_1': {'v': 'close', 'f': True, 't': 'source'}, 'in_2': {'v': 0, 'f': True, 't': 'integer'}, 'in_3': {'v': 'EMA', 'f': True, 't': 'text'}, 'in_4': {'v': 5, 'f': True, 't': 'integer'}, 'in_5': {'v': '', 'f': True, 't': 'resolution'}, 'in_6': {'v': True, 'f': True, 't': 'bool'}}],
@@ -35,11 +52,45 @@ class TradingViewClient:
                  username='',
                  password='',
                  token='',
-                 market='') -> None:
+                 market='',
+                 pool_size=4,
+                 max_sessions_per_socket=50,
+                 idle_timeout=300,
+                 http_concurrency=16,
+                 ws_url: str = None,
+                 token_ttl: float = 12 * 60 * 60,
+                 token_path: str = None,
+                 search_cache_size=10000,
+                 search_cache_ttl: float = 24 * 60 * 60,
+                 symbol_directory_path: str = None,
+                 calendar_ttl: float = 24 * 60 * 60,
+                 calendar_recent_ttl: float = 5 * 60,
+                 related_events_ttl: float = 60 * 60,
+                 http: HttpClient = None) -> None:
         self._username = username
         self._password = password
         self._market = market
         self._token = token
+        self._pool_size = pool_size
+        self._max_sessions_per_socket = max_sessions_per_socket
+        self._idle_timeout = idle_timeout
+        self._http_concurrency = http_concurrency
+        self._ws_url = ws_url
+        self._token_ttl = token_ttl
+        self._token_path = token_path
+        self._search_cache_size = search_cache_size
+        self._search_cache_ttl = search_cache_ttl
+        self._symbol_directory_path = symbol_directory_path
+        self._calendar_ttl = calendar_ttl
+        self._calendar_recent_ttl = calendar_recent_ttl
+        self._related_events_ttl = related_events_ttl
+        self._token_manager: TokenManager = None
+        self._pool: ConnectionPool = None
+        self._http_client = http
+        self._executor: ThreadPoolExecutor = None
+        self._search_cache: SearchCache = None
+        self._symbol_directory: SymbolDirectory = None
+        self._calendar_cache: EconomicCalendarCache = None
 
     @property
     def username(self) -> str:
@@ -53,11 +104,88 @@ class TradingViewClient:
     def market(self) -> str:
         return self._market
 
+    @property
+    def ws_url(self) -> str:
+        # resolved late so a url patched on the module (e.g. a local stand-in server) is honoured
+        return self._ws_url or _WS_URL_
+
+    @property
+    def token_manager(self) -> TokenManager:
+        if not self._token_manager:
+            self._token_manager = token_manager(lambda: _get_auth_token(self.http, self.username, self.password),
+                                                key=self.username,
+                                                ttl=self._token_ttl,
+                                                path=self._token_path)
+
+        return self._token_manager
+
     @property
     def token(self) -> str:
+        # a token given explicitly is used as is
+        if self._token:
+            return self._token
+
+        return self.token_manager.get()
+
+    def _token_rejected(self, token: str) -> None:
+        # a token given explicitly is not signed in again
         if not self._token:
-            self._token = _get_auth_token(self.username, self.password)
-        return self._token
+            self.token_manager.invalidate(token)
+
+    @property
+    def pool(self) -> ConnectionPool:
+        if not self._pool:
+            self._pool = ConnectionPool(self.ws_url,
+                                        headers=_WS_HEADERS_,
+                                        token=lambda: self.token,
+                                        size=self._pool_size,
+                                        max_sessions=self._max_sessions_per_socket,
+                                        idle_timeout=self._idle_timeout,
+                                        on_auth_error=self._token_rejected)
+
+        return self._pool
+
+    @property
+    def http_client(self) -> HttpClient:
+        if not self._http_client:
+            # keep-alive connections for as many requests as the executor runs at once
+            self._http_client = HttpClient(pool_size=self._http_concurrency)
+
+        return self._http_client
+
+    @property
+    def http(self) -> Session:
+        return self.http_client.session
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if not self._executor:
+            self._executor = ThreadPoolExecutor(max_workers=self._http_concurrency)
+
+        return self._executor
+
+    @property
+    def search_cache(self) -> SearchCache:
+        if not self._search_cache:
+            self._search_cache = SearchCache(max_size=self._search_cache_size, ttl=self._search_cache_ttl)
+
+        return self._search_cache
+
+    @property
+    def symbol_directory(self) -> SymbolDirectory:
+        if not self._symbol_directory:
+            self._symbol_directory = symbol_directory(self._symbol_directory_path)
+
+        return self._symbol_directory
+
+    @property
+    def calendar_cache(self) -> EconomicCalendarCache:
+        if not self._calendar_cache:
+            self._calendar_cache = EconomicCalendarCache(ttl=self._calendar_ttl,
+                                                         recent_ttl=self._calendar_recent_ttl,
+                                                         related_ttl=self._related_events_ttl)
+
+        return self._calendar_cache
 
     def current_quotes(self,
                        symbols: Union[str, List[str]],
@@ -65,30 +193,16 @@ class TradingViewClient:
         return_single = isinstance(symbols, str)
         _symbols = [symbols] if return_single else symbols
 
-        # create tunnel
-        headers = json.dumps({'Origin': 'https://data.tradingview.com'})
-        ws = create_connection(_WS_URL_, headers=headers)
-        sess = _generate_session('cs_')
+        sess = generate_session('cs_')
 
-        # Send messages
-        if self.token:
-            _send_message(ws, 'set_auth_token', [self.token])
-        else:
-            _send_message(ws, 'set_auth_token', ['unauthorized_user_token'])
+        # borrow authenticated tunnel
+        with self.pool.channel(quote_sessions=[sess]) as ws:
+            for func, args in _quote_session_messages(sess, _symbols, fields):
+                send_message(ws, func, args)
 
-        # Then send a message through the tunnel
-        _send_message(ws, 'set_data_quality', ['high'])
-        _send_message(ws, 'quote_create_session', [sess])
-
-        if fields is not None:
-            _send_message(ws, 'quote_set_fields', [sess, *fields])
-
-        for i in _symbols:
-            _send_message(ws, 'quote_add_symbols', [sess, i])
-
-        # Start job
-        rst = _socket_quote(ws,
-                            symbols=symbols)
+            # Start job
+            rst = _socket_quote(ws,
+                                symbols=symbols)
 
         quotes = rst[sess]
 
@@ -98,6 +212,56 @@ class TradingViewClient:
 
         return quotes
 
+    def stream_quotes(self,
+                      symbols: List[str],
+                      fields: List[str] = None,
+                      deadline: float = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        '''
+        This method yields `(symbol, fields)` as soon as each symbol completes and stops after `deadline` seconds
+        '''
+        yield from self._stream_quotes(QuoteSessionState(symbols=symbols), symbols, fields, deadline)
+
+    def current_quotes_partial(self,
+                               symbols: List[str],
+                               fields: List[str] = None,
+                               deadline: float = None) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+        '''
+        This method returns what is received within `deadline` seconds and the status of every symbol
+        (`ok`, `partial`, `error`, `timeout`) instead of failing the whole batch
+        '''
+        state = QuoteSessionState(symbols=symbols)
+
+        for _ in self._stream_quotes(state, symbols, fields, deadline):
+            pass
+
+        return _partial_quotes(state)
+
+    def _stream_quotes(self,
+                       state: QuoteSessionState,
+                       symbols: List[str],
+                       fields: List[str] = None,
+                       deadline: float = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        sess = generate_session('qs_')
+        end = None if deadline is None else monotonic() + deadline
+        decoder = FrameDecoder()
+
+        # borrow authenticated tunnel
+        with self.pool.channel(quote_sessions=[sess]) as ws:
+            for func, args in _quote_session_messages(sess, symbols, fields):
+                send_message(ws, func, args)
+
+            while not state.completed:
+                try:
+                    msgs = ws.recv(timeout=None if end is None else max(end - monotonic(), 0))
+                except TimeoutError:
+                    return
+
+                for i in decoder.feed(msgs):
+                    state.feed(json.loads(i))
+
+                for symbol in state.drain_completed():
+                    yield symbol, state.quotes[symbol]
+
     def realtime_quotes(self,
                         symbols: Union[str, List[str]],
                         callback: callable) -> Union[Dict[str, Any], Dict[str, Dict[str, Any]]]:
@@ -105,31 +269,31 @@ class TradingViewClient:
         _symbols = [symbols] if return_single else symbols
         fields = ['lp', 'ch', 'lp_time', 'chp', 'volume']
 
-        # create tunnel
-        headers = json.dumps({'Origin': 'https://data.tradingview.com'})
-        ws = create_connection(_WS_URL_, headers=headers)
-        sess = _generate_session('qs_')
+        while True:
+            sess = generate_session('qs_')
+            received = []
 
-        # Send messages
-        if self.token:
-            _send_message(ws, 'set_auth_token', [self.token])
-        else:
-            _send_message(ws, 'set_auth_token', ['unauthorized_user_token'])
-
-        _send_message(ws, 'set_data_quality', ['high'])
-        _send_message(ws, 'quote_create_session', [sess])
+            def _callback(data: Dict[str, Any]) -> None:
+                received.append(True)
+                callback(data)
 
-        if fields is not None:
-            _send_message(ws, 'quote_set_fields', [sess, *fields])
+            try:
+                # borrow authenticated tunnel
+                with self.pool.channel(quote_sessions=[sess]) as ws:
+                    for func, args in _quote_session_messages(sess, _symbols, fields):
+                        send_message(ws, func, args)
 
-        for i in _symbols:
-            _send_message(ws, 'quote_add_symbols', [sess, i])
+                    # Start job
+                    _ = _socket_quote(ws,
+                                      symbols=symbols,
+                                      realtime=True,
+                                      callback=_callback)
 
-        # Start job
-        _ = _socket_quote(ws,
-                          symbols=symbols,
-                          realtime=True,
-                          callback=callback)
+                return
+            except ConnectionError:
+                # a socket lost while it was delivering updates is replaced, one failing from the start is not
+                if not received:
+                    raise
 
     def ohlcv(self,
               symbols: Union[str, List[str]],
@@ -141,54 +305,120 @@ class TradingViewClient:
         total_candles += 1  # preserve 1 bar because TradingView returns less than 1 bar
         charts = charts or []
 
-        # create tunnel
-        headers = json.dumps({'Origin': 'https://data.tradingview.com'})
-        ws = create_connection(_WS_URL_, headers=headers)
+        # names of one symbol share a chart session
+        names = self.symbol_directory.canonical(symbols)
+        sess_ls, sess_symbol_mapper = _chart_sessions(names)
+        sessions_completed = _chart_sessions_completed(sess_ls, charts)
+        resolved: Dict[str, Dict[str, Any]] = {}
+
+        # borrow authenticated tunnel
+        with self.pool.channel(chart_sessions=sess_ls) as ws:
+            for _sess, _symbol in sess_symbol_mapper.items():
+                for func, args in _chart_session_messages(_sess, _symbol, freq, total_candles, charts, adjustment):
+                    send_message(ws, func, args)
+
+            # Start job
+            df = _parse_bar_charts(ws,
+                                   sessions_completed=sessions_completed,
+                                   resolved=resolved,
+                                   timeout=_chart_timeout(sess_ls))
+
+        self.symbol_directory.add_resolved({sess_symbol_mapper[k]: v for k, v in resolved.items()})
+        self.symbol_directory.flush()
+
+        return _named_frame(_ohlcv_frame(df, sess_symbol_mapper), names)
+
+    def ohlcv_backfill(self,
+                       symbol: str,
+                       freq: str,
+                       chunk_size: int = 5000,
+                       from_ts: pd.Timestamp = None,
+                       to_ts: pd.Timestamp = None,
+                       total_candles: int = None,
+                       adjustment='dividends') -> Iterator[pd.DataFrame]:
+        '''
+        This method pages backwards over one chart session with `request_more_data` and yields chunks of bars,
+        newest chunk first, until `from_ts`, `total_candles` or the start of the history is reached
+        '''
+        sess = generate_session('cs_')
+        collector = _BackfillCollector(symbol)
+        decoder = FrameDecoder()
+        fetched = 0
+
+        # borrow authenticated tunnel
+        with self.pool.channel(chart_sessions=[sess]) as ws:
+            for func, args in _chart_session_messages(sess, symbol, freq, chunk_size, [], adjustment):
+                send_message(ws, func, args)
+
+            while True:
+                _receive_backfill(ws, collector, decoder, timeout=_chart_timeout([sess]))
+
+                df = collector.chunk()
+                if df.empty:
+                    break
 
-        # Send messages
-        if self.token:
-            _send_message(ws, 'set_auth_token', [self.token])
-        else:
-            _send_message(ws, 'set_auth_token', ['unauthorized_user_token'])
+                fetched += len(df)
+                if total_candles is not None and fetched > total_candles:
+                    df = df.iloc[fetched - total_candles:]
 
-        sess_ls = [_generate_session('cs_') for _ in symbols]
-        sess_symbol_mapper = dict(zip(sess_ls, symbols))
-        sessions_completed: Dict[str, bool] = {}
+                timestamps = df.index.get_level_values('timestamp')
+                if to_ts is not None:
+                    df = df.loc[timestamps <= to_ts]
+                    timestamps = df.index.get_level_values('timestamp')
+                if from_ts is not None:
+                    df = df.loc[timestamps >= from_ts]
 
-        # Then send a message through the tunnel
-        _send_message(ws, 'set_data_quality', ['high'])
-        for _sess, _symbol in sess_symbol_mapper.items():
-            _send_message(ws, 'chart_create_session', [_sess, ''])
-            _send_message(ws, 'resolve_symbol', [_sess, 'sds_sym', "={\"adjustment\":\"" + adjustment + "\",\"currency-id\":\"USD\",\"symbol\":\"" + _symbol + "\"}"])
-            _send_message(ws, 'create_series', [_sess, 's_ohlcv', 's', 'sds_sym', str(freq), total_candles, ""])
-            sessions_completed = deep_update(sessions_completed, {f'{_sess}__s_ohlcv': False})
+                if not df.empty:
+                    yield df
 
-            for chart in charts:
-                chart_setting = _CHARTS_SETTINGS[chart]
-                _send_message(ws, 'create_study', [_sess, f's_{chart}', 'st1', 's_ohlcv', *chart_setting])
-                sessions_completed = deep_update(sessions_completed, {f'{_sess}__s_{chart}': False})
+                if ((from_ts is not None and collector.oldest <= from_ts.timestamp())
+                        or (total_candles is not None and fetched >= total_candles)):
+                    break
 
-        # Start job
-        df = _parse_bar_charts(ws, sessions_completed=sessions_completed)
+                send_message(ws, 'request_more_data', [sess, 's_ohlcv', chunk_size])
+
+    def ohlcv_sharded(self,
+                      symbols: Union[str, List[str]],
+                      freq: str,
+                      total_candles: int,
+                      charts: List[str] = None,
+                      adjustment='dividends',
+                      shard_size: int = None,
+                      executor: Executor = None) -> Tuple[pd.DataFrame, List[ShardTiming]]:
+        '''
+        This method fetches shards of `shard_size` symbols (default and at most: sessions per socket) in parallel
+        on `executor`, each shard on its own channel, and returns the merged frame with per-shard timings; a shard
+        as large as a socket carries is only given an empty socket
+        '''
+        symbols = [symbols] if isinstance(symbols, str) else symbols
+        shards = plan_shards(symbols, min(shard_size or self._max_sessions_per_socket, self._max_sessions_per_socket))
 
-        df['symbol'] = df.apply(lambda x: sess_symbol_mapper[x['session']], axis=1)
-        df = df.drop('session', axis=1).reset_index().set_index(['timestamp', 'symbol'])
-        df = df.loc[~df.index.duplicated(keep='first')]
+        def _fetch(_symbols: List[str]) -> pd.DataFrame:
+            return self.ohlcv(_symbols, freq, total_candles, charts, adjustment)
 
-        return df
+        return fetch_sharded(_fetch, shards, executor)
 
     def search_multi(self,
                      queries: List[str],
                      params: Dict[str, Any]) -> Dict[str, Union[None, Dict[str, Any]]]:
-        search_iter = self._executor.map(self.search,
-                                         queries,
-                                         repeat(params.get('country', 'US')),
-                                         repeat(params.get('exchange', '')),
-                                         repeat(params.get('search_type', '')),
-                                         repeat(params.get('economic_category', '')),
-                                         repeat(params.get('start', 0)))
+        '''
+        This method searches each distinct query once, answering from the symbol directory and the search cache
+        where it can
+        '''
+        keys = search_keys(queries, params)
+
+        rst = self.symbol_directory.search(keys.values())
+        cached, missing = self.search_cache.lookup(i for i in keys.values() if i not in rst)
+        rst.update(cached)
 
-        resp = dict(zip(queries, search_iter))
+        if missing:
+            found = dict(zip(missing, self.executor.map(self._search, missing)))
+            self.search_cache.update(found)
+            self.symbol_directory.add_search_results(found)
+            self.symbol_directory.flush()
+            rst.update(found)
+
+        resp = {i: rst[keys[i]] for i in queries}
 
         return resp
 
@@ -201,363 +431,528 @@ class TradingViewClient:
                start: int = 0) -> Union[None,
                                         Dict[str, Any],
                                         Dict[str, Union[int, List[Dict[str, Any]]]]]:
-        # text = what you want to search!
-        # search_type = 'stocks' | 'funds' | 'futures' | 'forex' | 'crypto' | 'index' | 'bond' | 'economic' | 'options'
-        # country = 'US'
-        # it returns first matching item
         params = {
-            'text': query,
-            'country': country.upper(),
+            'country': country,
             'exchange': exchange,
             'search_type': search_type,
             'economic_category': economic_category,
             'start': start,
         }
-        headers = headers = {
-            'Accept': 'application/json',
-            'Origin': 'https://www.tradingview.com',
-        }
 
-        res = get(_API_URL_, params=params, headers=headers, timeout=60)
-        if res.status_code != 200:
-            raise ConnectionError(f'Client returns error "{res.status_code} {res.content}"')
+        return self.search_multi([query], params)[query]
 
-        res = res.json()
+    def refresh_symbol_directory(self, queries: List[str] = None) -> Dict[str, int]:
+        '''
+        This method searches again `queries` (default: every name known to the symbol directory), bypassing caches,
+        and returns the directory stats
+        '''
+        keys = list(search_keys(queries or self.symbol_directory.aliases(), {}).values())
 
-        if not res.get('symbols'):
-            return None
+        found = dict(zip(keys, self.executor.map(self._search, keys)))
+        self.search_cache.update(found)
+        self.symbol_directory.refresh(found)
+        self.symbol_directory.flush(force=True)
 
-        if res['symbols'][0].get('symbol') == query:
-            return res['symbols'][0]
+        return self.symbol_directory.stats
 
-        return res
+    def _search(self, key: SearchKey) -> Union[None,
+                                               Dict[str, Any],
+                                               Dict[str, Union[int, List[Dict[str, Any]]]]]:
+        url, params, headers = _search_request(*key)
+
+        res = self.http.get(url, params=params, headers=headers, timeout=60)
+
+        return _search_result(key[0], res)
 
     def economic_calendar(self,
                           from_date: str = None,
                           to_date: str = None,
                           countries: List[str] = None,
                           fetch_related_events=False) -> List[Dict[str, Any]]:
-        url = f'{_ECONOMIC_URL}/events'
+        '''
+        This method fetches only the days of the window missing from the calendar cache; an open window is not cached
+        '''
+        if from_date is None or to_date is None:
+            result = self._economic_calendar((from_date, to_date, countries))
+        else:
+            windows = self.calendar_cache.plan(from_date, to_date, countries)
 
-        headers = {
-            'origin': 'https://www.tradingview.com'
-        }
+            for window, events in zip(windows, self.executor.map(self._economic_calendar, windows)):
+                self.calendar_cache.update(window, events)
 
-        params = {
-            'from': from_date,
-            'to': to_date,
-        }
+            result = self.calendar_cache.events(from_date, to_date, countries)
 
-        if isinstance(countries, list):
-            params['countries'] = ','.join(countries)
+        if fetch_related_events:
+            related, missing = self.calendar_cache.related_lookup(i.get('id') for i in result)
 
-        resp = get(url, params=params, headers=headers, timeout=60)
+            if missing:
+                fetched = dict(zip(missing, self.executor.map(self.economic_calendar_related_events, missing)))
+                self.calendar_cache.related_update(fetched)
+                related.update(fetched)
 
-        if resp.status_code != 200:
-            raise ConnectionError(f'Client returns error "{resp.status_code} {resp.content}"')
+            for i in result:
+                i['events'] = related[i.get('id')]
 
-        data = resp.json()
-        status = data.get('status')
+        return result
 
-        if status != 'ok':
-            raise ConnectionError(f'Client returns error "{status} {data.get("errmsg")}"')
+    def _economic_calendar(self, window: CalendarRange) -> List[Dict[str, Any]]:
+        url, params, headers = _economic_calendar_request(*window)
 
-        result = data.get('result')
+        resp = self.http.get(url, params=params, headers=headers, timeout=60)
 
-        if fetch_related_events:
-            event_ids = [i.get('id') for i in result]
-            events_ls = list(self._executor.map(self.economic_calendar_related_events, event_ids))
+        return _economic_calendar_result(resp)
 
-            for i, _ in enumerate(result):
-                result[i]['events'] = events_ls[i]
+    def economic_calendar_related_events(self, event_id: str) -> List[Dict[str, Any]]:
+        url, params, headers = _related_events_request(event_id)
 
-        return result
+        resp = self.http.get(url, params=params, headers=headers, timeout=60)
 
-    def economic_calendar_related_events(self, event_id: str) -> List[Dict[str, Any]]:
-        url = f'{_ECONOMIC_URL}/related_events'
+        return _related_events_result(resp)
 
-        headers = {
-            'origin': 'https://www.tradingview.com'
-        }
+    def scan(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        url, data, headers = _scan_request(payload)
 
-        params = {
-            'eventId': event_id,
-            'countback': 8,
-        }
+        resp = self.http.post(url, data=data, headers=headers, timeout=60)
 
-        resp = get(url, params=params, headers=headers, timeout=60)
+        return _scan_result(resp)
 
-        if resp.status_code != 200:
-            raise ConnectionError(f'Client returns error "{resp.status_code} {resp.content}"')
 
-        data = resp.json()
-        status = data.get('status')
+def _get_auth_token(http: Session, username, password):
+    if not username or not password:
+        return ''
 
-        if status != 'ok':
-            return []
+    sign_in_url = 'https://www.tradingview.com/accounts/signin/'
 
-        result = data.get('result')
+    data = {'username': username, 'password': password, 'remember': 'on'}
+    headers = {'Referer': 'https://www.tradingview.com'}
+    resp = http.post(url=sign_in_url, data=data,
+                     headers=headers, timeout=60)
 
-        return result
+    auth_token = resp.json()['user']['auth_token']
 
-    def scan(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
-        url = f'{_SCANNER_URL_}/global/scan'
+    return auth_token
 
-        headers = {
-            'Content-Type': 'application/json'
-        }
 
-        resp = post(url, data=json.dumps(payload), headers=headers, timeout=60)
+def _quote_session_messages(sess: str,
+                            symbols: List[str],
+                            fields: List[str] = None) -> List[Tuple[str, List[Any]]]:
+    messages = [('quote_create_session', [sess])]
 
-        if resp.status_code != 200:
-            raise ConnectionError(f'Client returns error "{resp.status_code} {resp.content}"')
+    if fields is not None:
+        messages.append(('quote_set_fields', [sess, *fields]))
 
-        data = resp.json()
+    for i in symbols:
+        messages.append(('quote_add_symbols', [sess, i]))
 
-        error = data.get('error')
-        if error:
-            raise ConnectionError(f'Client returns error "{resp.status_code} {error}"')
+    return messages
 
-        result = data.get('data')
 
-        return result
+def _chart_session_messages(sess: str,
+                            symbol: str,
+                            freq: str,
+                            total_candles: int,
+                            charts: List[str],
+                            adjustment: str) -> List[Tuple[str, List[Any]]]:
+    messages = [
+        ('chart_create_session', [sess, '']),
+        ('resolve_symbol', [sess, 'sds_sym', "={\"adjustment\":\"" + adjustment + "\",\"currency-id\":\"USD\",\"symbol\":\"" + symbol + "\"}"]),
+        ('create_series', [sess, 's_ohlcv', 's', 'sds_sym', str(freq), total_candles, ""]),
+    ]
 
+    for chart in charts:
+        chart_setting = _CHARTS_SETTINGS[chart]
+        messages.append(('create_study', [sess, f's_{chart}', 'st1', 's_ohlcv', *chart_setting]))
 
-def _get_auth_token(username, password):
-    if not username or not password:
-        return ''
+    return messages
 
-    sign_in_url = 'https://www.tradingview.com/accounts/signin/'
 
-    data = {'username': username, 'password': password, 'remember': 'on'}
-    headers = {'Referer': 'https://www.tradingview.com'}
-    resp = post(url=sign_in_url, data=data,
-                headers=headers, timeout=60)
+def _chart_sessions_completed(sess_ls: List[str], charts: List[str]) -> Dict[str, bool]:
+    sessions_completed: Dict[str, bool] = {}
 
-    auth_token = resp.json()['user']['auth_token']
+    for _sess in sess_ls:
+        sessions_completed[f'{_sess}__s_ohlcv'] = False
 
-    return auth_token
+        for chart in charts:
+            sessions_completed[f'{_sess}__s_{chart}'] = False
 
+    return sessions_completed
 
-def _parse_bar_charts(ws, sessions_completed: Dict[str, bool]) -> pd.DataFrame:
-    symbol_dict: Dict[str, pd.DataFrame] = {}
-    s_dict: Dict[str, pd.DataFrame] = {}
-    st_dict: Dict[str, pd.DataFrame] = {}
 
-    while True:
-        try:
-            msgs = ws.recv()
+def _chart_sessions(names: Dict[str, str]) -> Tuple[List[str], Dict[str, str]]:
+    symbols = list(dict.fromkeys(names.values()))
+    sess_ls = [generate_session('cs_') for _ in symbols]
 
-            if re.findall(r'~m~\d+~m~~h~\d+', msgs):
-                _send_ping_packet(ws, msgs)
-                continue
+    return sess_ls, dict(zip(sess_ls, symbols))
 
-            if not msgs or '"session_id"' in msgs:
-                continue
 
-            segments = filter(None, re.split(r'~m~\d+~m~', msgs))
+def _named_frame(df: pd.DataFrame, names: Dict[str, str]) -> pd.DataFrame:
+    '''
+    This function labels the bars fetched for each pro name with the names they were requested by
+    '''
+    if all(k == v for k, v in names.items()):
+        return df
 
-            for segment in segments:
-                _segment_data: Dict[str, Any]
+    symbols = df.index.get_level_values('symbol')
+    dfs = {k: df.loc[symbols == v].droplevel('symbol') for k, v in names.items()}
 
-                try:
-                    _segment_data = json.loads(segment)
-                except json.JSONDecodeError:
-                    continue
+    return pd.concat(dfs, names=['symbol', 'timestamp']).swaplevel(0, 1)
 
-                m = _segment_data.get('m')
-                if m is None:
-                    continue
 
-                if 'error' in m:
-                    raise ConnectionError(f'Client returns error "{m}", detail "{_segment_data}"')
-
-                p = _segment_data['p']
-                sess = p[0]
-
-                if m in ['symbol_resolved']:
-                    symbol_dict[sess] = p[2].get('pro_name')
-
-                if m in ['series_completed', 'study_completed']:
-                    sessions_completed.update({f'{sess}__{p[1]}': True})
-
-                if m in ['timescale_update', 'du']:
-                    series = next(iter(p[1]))
-
-                    s = p[1][series].get('s')
-                    st = p[1][series].get('st')
-
-                    if s is not None:
-                        _df = _parse_series(s)
-                        _df_exist = s_dict.get(sess, pd.DataFrame())
-                        # concat by 'index' or 'columns'
-                        _axis = {True: 1, False: 0}[bool(set(_df.columns) - set(_df_exist.columns))]
-                        s_dict[sess] = pd.concat([s_dict.get(sess), _df], axis=_axis)
-
-                    if st is not None:
-                        _df = _parse_study(st, name=series)
-                        _df_exist = st_dict.get(sess, pd.DataFrame())
-                        # concat by 'index' or 'columns'
-                        _axis = {True: 1, False: 0}[bool(set(_df.columns) - set(_df_exist.columns))]
-                        st_dict[sess] = pd.concat([st_dict.get(sess), _df], axis=_axis)
-
-            if all(sessions_completed.values()):
-                dfs: List[pd.DataFrame] = []
-                for _sess, _symbol in symbol_dict.items():
-                    s = s_dict.get(_sess)
-                    st = st_dict.get(_sess)
-                    _df = pd.concat([s, st], axis=1)
-                    _df['symbol'] = [_symbol] * len(_df)
-                    _df['symbol'] = _df.symbol.astype('string')
-                    _df['session'] = [_sess] * len(_df)
-                    _df['session'] = _df.session.astype('string')
-                    dfs.append(_df)
-
-                df = pd.concat(dfs, axis=0)
-
-                return df
-        except KeyboardInterrupt:
-            break
-        except Exception as e:
-            print("=========except", datetime.now(), e)
-            if ('closed' in str(e) or 'lost' in str(e)):
-                print("=========try")
-                # self.realtime_bar_chart(5, 1, callback)
-            break
+def _ohlcv_frame(df: pd.DataFrame, sess_symbol_mapper: Dict[str, str]) -> pd.DataFrame:
+    df['symbol'] = df['session'].map(sess_symbol_mapper)
+    df = df.drop('session', axis=1).reset_index().set_index(['timestamp', 'symbol'])
+    df = df.loc[~df.index.duplicated(keep='first')]
 
+    return df
 
-def _socket_quote(ws: WebSocket,
-                  symbols: Union[str, List[str]] = None,
-                  realtime=False,
-                  callback: callable = None) -> Union[None, dict]:
+
+def _search_request(query: str,
+                    country: str = 'US',
+                    exchange: str = '',
+                    search_type: str = '',
+                    economic_category: str = '',
+                    start: int = 0) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+    # text = what you want to search!
+    # search_type = 'stocks' | 'funds' | 'futures' | 'forex' | 'crypto' | 'index' | 'bond' | 'economic' | 'options'
+    # country = 'US'
+    params = {
+        'text': query,
+        'country': country.upper(),
+        'exchange': exchange,
+        'search_type': search_type,
+        'economic_category': economic_category,
+        'start': start,
+    }
+    headers = {
+        'Accept': 'application/json',
+        'Origin': 'https://www.tradingview.com',
+    }
+
+    return _API_URL_, params, headers
+
+
+def _search_result(query: str, res) -> Union[None,
+                                             Dict[str, Any],
+                                             Dict[str, Union[int, List[Dict[str, Any]]]]]:
+    # it returns first matching item
+    if res.status_code != 200:
+        raise ConnectionError(f'Client returns error "{res.status_code} {res.content}"')
+
+    res = res.json()
+
+    if not res.get('symbols'):
+        return None
+
+    if res['symbols'][0].get('symbol') == query:
+        return res['symbols'][0]
+
+    return res
+
+
+def _economic_calendar_request(from_date: str = None,
+                               to_date: str = None,
+                               countries: List[str] = None) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+    url = f'{_ECONOMIC_URL}/events'
+
+    headers = {
+        'origin': 'https://www.tradingview.com'
+    }
+
+    params = {
+        'from': from_date,
+        'to': to_date,
+    }
+
+    if isinstance(countries, list):
+        params['countries'] = ','.join(countries)
+
+    return url, params, headers
+
+
+def _economic_calendar_result(resp) -> List[Dict[str, Any]]:
+    if resp.status_code != 200:
+        raise ConnectionError(f'Client returns error "{resp.status_code} {resp.content}"')
+
+    data = resp.json()
+    status = data.get('status')
+
+    if status != 'ok':
+        raise ConnectionError(f'Client returns error "{status} {data.get("errmsg")}"')
+
+    return data.get('result')
+
+
+def _related_events_request(event_id: str) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+    url = f'{_ECONOMIC_URL}/related_events'
+
+    headers = {
+        'origin': 'https://www.tradingview.com'
+    }
+
+    params = {
+        'eventId': event_id,
+        'countback': 8,
+    }
+
+    return url, params, headers
+
+
+def _related_events_result(resp) -> List[Dict[str, Any]]:
+    if resp.status_code != 200:
+        raise ConnectionError(f'Client returns error "{resp.status_code} {resp.content}"')
+
+    data = resp.json()
+    status = data.get('status')
+
+    if status != 'ok':
+        return []
+
+    return data.get('result')
+
+
+def _scan_request(payload: Dict[str, Any]) -> Tuple[str, str, Dict[str, str]]:
+    url = f'{_SCANNER_URL_}/global/scan'
+
+    headers = {
+        'Content-Type': 'application/json'
+    }
+
+    return url, json.dumps(payload), headers
+
+
+def _scan_result(resp) -> List[Dict[str, Any]]:
+    if resp.status_code != 200:
+        raise ConnectionError(f'Client returns error "{resp.status_code} {resp.content}"')
+
+    data = resp.json()
+
+    error = data.get('error')
+    if error:
+        raise ConnectionError(f'Client returns error "{resp.status_code} {error}"')
+
+    return data.get('data')
+
+
+class _BarChartsCollector:
     '''
-    timeout is 3 seconds per 1 symbols
+    This class consumes chart session messages until every series and study is completed
     '''
-    msg = {}
-    timeout_per_symbol = 3
-    t1 = perf_counter()
 
-    while True:
-        try:
-            msgs = ws.recv()
+    def __init__(self, sessions_completed: Dict[str, bool]) -> None:
+        self._sessions_completed = sessions_completed
+        self._symbol_dict: Dict[str, str] = {}
+        self._resolved: Dict[str, Dict[str, Any]] = {}
+        self._bars_dict: Dict[str, ChartSessionBars] = {}
 
-            if re.findall(r'~m~\d+~m~~h~\d+', msgs):
-                _send_ping_packet(ws, msgs)
-                continue
+    @property
+    def completed(self) -> bool:
+        return all(self._sessions_completed.values())
 
-            if not msgs or '"session_id"' in msgs:
-                continue
+    @property
+    def resolved(self) -> Dict[str, Dict[str, Any]]:
+        return self._resolved
 
-            m_items = filter(None, re.split(r'~m~\d+~m~', msgs))
-            m_items = list(m_items)
+    def feed(self, segment_data: Dict[str, Any]) -> None:
+        m = segment_data.get('m')
+        if m is None:
+            return
 
-            m: str = None
-            for i in m_items:
-                data = {}
-                m_data = json.loads(i)
+        if 'error' in m:
+            raise ConnectionError(f'Client returns error "{m}", detail "{segment_data}"')
 
-                m = m_data.get('m')
-                if not m:
-                    continue
+        p = segment_data['p']
+        sess = p[0]
 
-                p = m_data['p']
-                sess = p[0]
+        if m in ['symbol_resolved']:
+            self._symbol_dict[sess] = p[2].get('pro_name')
+            self._resolved[sess] = p[2]
 
-                if 'error' in m:
-                    raise ConnectionError(f'Client returns error "{m}", detail "{p[1]}"')
+        if m in ['series_completed', 'study_completed']:
+            self._sessions_completed.update({f'{sess}__{p[1]}': True})
 
-                if m == 'quote_completed':
-                    data = {sess: {p[1]: {m: True}}}
+        if m in ['timescale_update', 'du']:
+            bars = self._bars_dict.setdefault(sess, ChartSessionBars())
 
-                elif isinstance(p[1], dict) and p[1].get('s') == 'ok':
-                    n = p[1]['n']
-                    v = p[1]['v']
+            for series, data in p[1].items():
+                if isinstance(data, dict):
+                    bars.update(series, data)
 
-                    data = {sess: {n: v}}
+    def to_frame(self) -> pd.DataFrame:
+        dfs: List[pd.DataFrame] = []
+        for _sess, _symbol in self._symbol_dict.items():
+            _df = self._bars_dict.get(_sess, ChartSessionBars()).to_frame()
+            _df['symbol'] = [_symbol] * len(_df)
+            _df['symbol'] = _df.symbol.astype('string')
+            _df['session'] = [_sess] * len(_df)
+            _df['session'] = _df.session.astype('string')
+            dfs.append(_df)
 
-                    if callback is not None:
-                        callback({n: v})
+        df = pd.concat(dfs, axis=0)
 
-                msg = deep_update(msg, data)
+        return df
 
-            if not realtime:
-                _symbols = [symbols] if isinstance(symbols, str) else symbols
-                sess = next(iter(msg.keys()))
 
-                duration = perf_counter() - t1
-                timeout = timeout_per_symbol * len(_symbols)
-                is_timeout = duration > timeout
-                if is_timeout:
-                    raise TimeoutError(f'expect should be done within {timeout} seconds, actually over {duration}')
+class _BackfillCollector:
+    '''
+    This class gathers the series bars of one paging round; bars not older than those already handed out
+    (e.g. `du` updates of the forming bar) are ignored
+    '''
 
-                quote_completed = all([v.get('quote_completed') for _, v in msg[sess].items()])
-                enough_symbols = not set(_symbols) - set(msg[sess].keys())
+    def __init__(self, symbol: str) -> None:
+        self.symbol = symbol
+        self.oldest: float = None
+        self.completed = False
+        self._bars: Dict[float, List[float]] = {}
 
-                if enough_symbols and quote_completed:
-                    _ = [v.pop('quote_completed', None) for _, v in msg[sess].items()]
-                    break
+    def feed(self, segment_data: Dict[str, Any]) -> None:
+        m = segment_data.get('m')
+        if m is None:
+            return
 
-        except KeyboardInterrupt:
-            break
-        except Exception as e:
-            if not realtime:
-                raise e
+        if 'error' in m:
+            raise ConnectionError(f'Client returns error "{m}", detail "{segment_data}"')
 
-            print("=========except", datetime.now(), e)
-            if ('closed' in str(e) or 'lost' in str(e)):
-                print("=========try")
+        p = segment_data['p']
 
-            time.sleep(30)
+        if m == 'symbol_resolved':
+            self.symbol = p[2].get('pro_name') or self.symbol
 
-    return msg
+        if m == 'series_completed':
+            self.completed = True
 
+        if m in ['timescale_update', 'du']:
+            data = p[1].get('s_ohlcv')
+            if not isinstance(data, dict):
+                return
 
-def _generate_session(prefix):
-    string_length = 12
-    letters = string.ascii_lowercase
-    random_string = ''.join(random.choice(letters) for i in range(string_length))
-    return prefix + random_string
+            for bar in data.get('s', []):
+                v = bar['v']
+                if self.oldest is None or v[0] < self.oldest:
+                    self._bars[v[0]] = v
 
+    def chunk(self) -> pd.DataFrame:
+        bars, self._bars = self._bars, {}
+        self.completed = False
 
-def _prepend_header(st):
-    return '~m~' + str(len(st)) + '~m~' + st
+        if not bars:
+            return pd.DataFrame()
 
+        values = np.array([bars[i] for i in sorted(bars)], dtype=np.float64)
+        self.oldest = values[0, 0]
 
-def _construct_message(func, params):
-    return json.dumps({'m': func, 'p': params}, separators=(',', ':'))
+        index = pd.MultiIndex.from_arrays([pd.to_datetime(values[:, 0], unit='s', utc=True),
+                                           pd.array([self.symbol] * len(values), dtype='string')],
+                                          names=['timestamp', 'symbol'])
 
+        return pd.DataFrame(values[:, 1:], index=index, columns=SERIES_COLUMNS[:values.shape[1] - 1])
 
-def _create_message(func, params):
-    return _prepend_header(_construct_message(func, params))
 
+def _partial_quotes(state: QuoteSessionState) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    quotes = {k: v for k, v in state.quotes.items() if v}
 
-def _send_message(ws, func, args):
-    ws.send(_create_message(func, args))
+    return quotes, state.statuses
 
 
-def _send_ping_packet(ws, result):
-    ping_str = re.findall('.......(.*)', result)
-    if len(ping_str) != 0:
-        ping_str = ping_str[0]
-        ws.send('~m~' + str(len(ping_str)) + '~m~' + ping_str)
+def _quote_timeout(symbols: Union[str, List[str]]) -> float:
+    '''
+    timeout is 3 seconds per 1 symbols
+    '''
+    timeout_per_symbol = 3
+    _symbols = [symbols] if isinstance(symbols, str) else symbols
 
+    return timeout_per_symbol * len(_symbols)
 
-def _parse_series(data: List[Dict[str, Union[int, List[float]]]]) -> pd.DataFrame:
-    df_raw = pd.DataFrame(data)
-    df_raw = df_raw[df_raw.i > 0]
-    df = pd.DataFrame(df_raw.v.to_list()).set_index(0).rename_axis('timestamp', axis=0)
-    df.index = pd.to_datetime(df.index, unit='s', utc=True)
-    df.columns = ['open', 'high', 'low', 'close', 'volume']
-    return df
 
+def _chart_timeout(sessions: List[str]) -> float:
+    '''
+    timeout is 30 seconds and 3 more per chart session
+    '''
+    return 30 + 3 * len(sessions)
 
-def _parse_study(data: List[Dict[str, Union[int, List[float]]]], name: str) -> pd.DataFrame:
-    df_raw = pd.DataFrame(data)
-    df_raw = df_raw[df_raw.i > 0]
-    df = pd.DataFrame(df_raw.v.to_list()).set_index(0).rename_axis('timestamp', axis=0)
-    df.index = pd.to_datetime(df.index, unit='s', utc=True)
-    if len(df.columns) > 1:
-        df.columns = [f'{name.removeprefix("s_")}_{i}' for i in df.columns]
-    else:
-        df.columns = [f'{name.removeprefix("s_")}']
-    return df
+
+def _parse_bar_charts(ws,
+                      sessions_completed: Dict[str, bool],
+                      resolved: Dict[str, Dict[str, Any]] = None,
+                      timeout: float = None) -> pd.DataFrame:
+    collector = _BarChartsCollector(sessions_completed)
+    decoder = FrameDecoder()
+    end = None if timeout is None else monotonic() + timeout
+
+    # errors (e.g. of the pooled socket) reach the caller as they are, a session never completing raises TimeoutError
+    while True:
+        msgs = ws.recv(timeout=None if end is None else max(end - monotonic(), 0))
+
+        for segment in decoder.feed(msgs):
+            _segment_data: Dict[str, Any]
+
+            if is_heartbeat(segment):
+                send_heartbeat(ws, segment)
+                continue
+
+            try:
+                _segment_data = json.loads(segment)
+            except json.JSONDecodeError:
+                continue
+
+            collector.feed(_segment_data)
+
+        if collector.completed:
+            if resolved is not None:
+                resolved.update(collector.resolved)
+
+            return collector.to_frame()
+
+
+def _receive_backfill(ws, collector: _BackfillCollector, decoder: FrameDecoder, timeout: float = None) -> None:
+    while not collector.completed:
+        # a stalled page raises TimeoutError rather than blocking the borrowed channel forever
+        msgs = ws.recv(timeout=timeout)
+
+        for segment in decoder.feed(msgs):
+            if is_heartbeat(segment):
+                send_heartbeat(ws, segment)
+                continue
+
+            try:
+                _segment_data = json.loads(segment)
+            except json.JSONDecodeError:
+                continue
+
+            collector.feed(_segment_data)
+
+
+def _socket_quote(ws: WebSocket,
+                  symbols: Union[str, List[str]] = None,
+                  realtime=False,
+                  callback: callable = None) -> Union[None, dict]:
+    _symbols = [symbols] if isinstance(symbols, str) else symbols
+    state = QuoteSessionState(symbols=_symbols, callback=callback)
+    t1 = perf_counter()
+
+    decoder = FrameDecoder()
+
+    while True:
+        try:
+            msgs = ws.recv()
+
+            for i in decoder.feed(msgs):
+                if is_heartbeat(i):
+                    send_heartbeat(ws, i)
+                    continue
+
+                state.feed(json.loads(i))
+
+            if not realtime and not state.empty:
+                duration = perf_counter() - t1
+                timeout = _quote_timeout(symbols)
+                is_timeout = duration > timeout
+                if is_timeout:
+                    raise TimeoutError(f'expect should be done within {timeout} seconds, actually over {duration}')
+
+                if state.completed:
+                    break
+
+        except KeyboardInterrupt:
+            break
+
+    return state.result()
@@ -0,0 +1,14 @@
+from dependency_injector import containers
+from dependency_injector.providers import Configuration, Singleton
+
+from infra.http import HttpClient
+
+
+class Container(containers.DeclarativeContainer):
+    config = Configuration(yaml_files=['config.yml'])
+
+    http = Singleton(HttpClient,
+                     pool_size=config.HTTP.POOL_SIZE,
+                     max_hosts=config.HTTP.MAX_HOSTS,
+                     timeout=config.HTTP.TIMEOUT,
+                     http2=config.HTTP.HTTP2)
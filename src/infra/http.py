@@ -0,0 +1,312 @@
+import asyncio
+from bisect import bisect_left
+from importlib.util import find_spec
+from logging import INFO, StreamHandler, getLogger
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional, Type
+from urllib.parse import urlparse
+from weakref import WeakKeyDictionary
+
+import httpx
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+logger.addHandler(StreamHandler())
+
+# upper bounds in seconds of the latency histogram buckets, the last bucket takes the slower requests
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class HostMetrics:
+    '''
+    This class counts the requests and connections of one host, with a histogram of request latencies
+    '''
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.requests = 0
+        self.errors = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.in_use = 0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def opened(self) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+    def reused(self) -> None:
+        with self._lock:
+            self.connections_reused += 1
+
+    def acquired(self) -> None:
+        with self._lock:
+            self.in_use += 1
+
+    def released(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def observe(self, seconds: float, error=False) -> None:
+        with self._lock:
+            self.requests += 1
+            self.errors += error
+            self.latency_sum += seconds
+            self.latency_buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'connections_opened': self.connections_opened,
+                'connections_reused': self.connections_reused,
+                'in_use': self.in_use,
+                'latency': {
+                    'count': self.requests,
+                    'sum': self.latency_sum,
+                    'buckets': {str(k): v for k, v in zip([*LATENCY_BUCKETS, 'inf'], self.latency_buckets)},
+                },
+            }
+
+
+class HttpMetrics:
+    '''
+    This class keeps the metrics of every host an `HttpClient` talked to
+    '''
+
+    def __init__(self) -> None:
+        self._hosts: Dict[str, HostMetrics] = {}
+        self._lock = Lock()
+
+    def host(self, name: str) -> HostMetrics:
+        with self._lock:
+            metrics = self._hosts.get(name)
+
+            if metrics is None:
+                metrics = self._hosts[name] = HostMetrics()
+
+            return metrics
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            hosts = dict(self._hosts)
+
+        return {k: v.snapshot() for k, v in sorted(hosts.items())}
+
+
+class HttpClient:
+    '''
+    This class is the HTTP layer shared by the upstream clients: a `requests` session for sync callers and
+    an `httpx` client per event loop for async callers, both keeping up to `pool_size` keep-alive connections
+    per host for up to `max_hosts` hosts and applying `timeout` to requests which do not set one.
+    HTTP/2 is used by the async client with `http2` when the `h2` package is installed
+    '''
+
+    def __init__(self,
+                 pool_size=10,
+                 max_hosts=10,
+                 timeout: float = 60,
+                 http2=False) -> None:
+        self._pool_size = pool_size
+        self._max_hosts = max_hosts
+        self._timeout = timeout
+        self._http2 = http2
+        self._metrics = HttpMetrics()
+        self._session: Session = None
+        self._async_sessions: WeakKeyDictionary = WeakKeyDictionary()
+        self._lock = Lock()
+
+    @property
+    def metrics(self) -> HttpMetrics:
+        return self._metrics
+
+    @property
+    def session(self) -> Session:
+        with self._lock:
+            if not self._session:
+                adapter = _MeteredAdapter(self._metrics,
+                                          timeout=self._timeout,
+                                          pool_connections=self._max_hosts,
+                                          pool_maxsize=self._pool_size)
+                self._session = Session()
+                self._session.mount('https://', adapter)
+                self._session.mount('http://', adapter)
+
+            return self._session
+
+    @property
+    def async_session(self) -> httpx.AsyncClient:
+        '''
+        This property returns the client of the running event loop, connections cannot outlive their loop
+        '''
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            client = self._async_sessions.get(loop)
+
+            if client is None:
+                client = self._async_sessions[loop] = self._async_client()
+
+            return client
+
+    def close(self) -> None:
+        with self._lock:
+            session, self._session = self._session, None
+
+        if session:
+            session.close()
+
+    async def aclose(self) -> None:
+        with self._lock:
+            client = self._async_sessions.pop(asyncio.get_running_loop(), None)
+
+        if client:
+            await client.aclose()
+
+    def _async_client(self) -> httpx.AsyncClient:
+        http2 = self._http2 and find_spec('h2') is not None
+
+        if self._http2 and not http2:
+            logger.warning('HTTP/2 requires the h2 package, falling back to HTTP/1.1')
+
+        connections = self._pool_size * self._max_hosts
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=None,
+                                                                 max_keepalive_connections=connections),
+                                             http2=http2)
+
+        return httpx.AsyncClient(transport=_MeteredTransport(transport, self._metrics), timeout=self._timeout)
+
+
+class _MeteredAdapter(HTTPAdapter):
+
+    def __init__(self, metrics: HttpMetrics, timeout: float = None, **kwargs) -> None:
+        self._metrics = metrics
+        self._timeout = timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _metered_pool(HTTPConnectionPool, self._metrics),
+            'https': _metered_pool(HTTPSConnectionPool, self._metrics),
+        }
+
+    def send(self, request, timeout=None, **kwargs):
+        metrics = self._metrics.host(urlparse(request.url).hostname)
+        start = perf_counter()
+
+        try:
+            resp = super().send(request, timeout=self._timeout if timeout is None else timeout, **kwargs)
+        except Exception:
+            metrics.observe(perf_counter() - start, error=True)
+            raise
+
+        metrics.observe(perf_counter() - start, error=resp.status_code >= 500)
+
+        return resp
+
+
+def _metered_pool(pool_cls: Type[HTTPConnectionPool], metrics: HttpMetrics) -> Type[HTTPConnectionPool]:
+
+    class _Connection(pool_cls.ConnectionCls):
+
+        def connect(self) -> None:
+            super().connect()
+            metrics.host(self.host).opened()
+
+    class _Pool(pool_cls):
+        ConnectionCls = _Connection
+
+        def _get_conn(self, timeout=None):
+            conn = super()._get_conn(timeout=timeout)
+
+            host = metrics.host(self.host)
+            host.acquired()
+            # a pooled connection still open, connections opened for the request are counted by `connect`
+            if getattr(conn, 'sock', None) is not None:
+                host.reused()
+
+            return conn
+
+        def _put_conn(self, conn) -> None:
+            metrics.host(self.host).released()
+            super()._put_conn(conn)
+
+    return _Pool
+
+
+class _MeteredTransport(httpx.AsyncBaseTransport):
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, metrics: HttpMetrics) -> None:
+        self._transport = transport
+        self._metrics = metrics
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        metrics = self._metrics.host(request.url.host)
+        trace = request.extensions.get('trace')
+        opened = False
+
+        async def _trace(event: str, info: Dict[str, Any]) -> None:
+            nonlocal opened
+            # only emitted when the pool opens a connection for the request
+            if event == 'connection.connect_tcp.complete':
+                opened = True
+
+            if trace:
+                await trace(event, info)
+
+        request.extensions = {**request.extensions, 'trace': _trace}
+
+        metrics.acquired()
+        start = perf_counter()
+
+        try:
+            resp = await self._transport.handle_async_request(request)
+        except Exception:
+            metrics.released()
+            metrics.observe(perf_counter() - start, error=True)
+            raise
+
+        if opened:
+            metrics.opened()
+        else:
+            metrics.reused()
+
+        def _done() -> None:
+            metrics.released()
+            metrics.observe(perf_counter() - start, error=resp.status_code >= 500)
+
+        return httpx.Response(status_code=resp.status_code,
+                              headers=resp.headers,
+                              stream=_MeteredStream(resp.stream, _done),
+                              extensions=resp.extensions)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _MeteredStream(httpx.AsyncByteStream):
+
+    def __init__(self, stream: httpx.AsyncByteStream, done: Callable[[], None]) -> None:
+        self._stream = stream
+        self._done: Optional[Callable[[], None]] = done
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            # the request is done once its body was read or dropped
+            if self._done:
+                self._done, done = None, self._done
+                done()
@@ -8,7 +8,9 @@ from google.cloud.logging import Client as LoggingClient
 
 from data_providers.containers import Container as DataContainerV1
 from data_providers.endpoints import router as data_endpoints
+from data_providers.tradingview.async_tradingview import AsyncTradingView
 from data_providers.tradingview.tradingview import TradingView
+from infra.containers import Container as InfraContainer
 from news.containers import Container as NewsContainerV1
 from news.endpoints import router as news_endpoints
 from news.seeking_alpha import SeekingAlpha
@@ -21,17 +23,72 @@ client.setup_logging(log_level=INFO)
 
 
 def create_app() -> FastAPI:
-    data_container_v1 = DataContainerV1()
+    infra_container = InfraContainer()
+
+    data_container_v1 = DataContainerV1(http=infra_container.http)
     data_container_v1.wire(packages=['data_providers'])
     data_container_v1.client.override(Singleton(TradingView).add_attributes(
         WORKERS_NO=data_container_v1.config.MARKET_DATA.WORKERS_NO,
+        TOKEN_TTL=data_container_v1.config.MARKET_DATA.AUTH.TOKEN_TTL,
+        TOKEN_PATH=data_container_v1.config.MARKET_DATA.AUTH.TOKEN_PATH,
+        WS_URL=data_container_v1.config.MARKET_DATA.WEBSOCKET.URL,
+        WS_POOL_SIZE=data_container_v1.config.MARKET_DATA.WEBSOCKET.POOL_SIZE,
+        WS_MAX_SESSIONS_PER_SOCKET=data_container_v1.config.MARKET_DATA.WEBSOCKET.MAX_SESSIONS_PER_SOCKET,
+        WS_IDLE_TIMEOUT=data_container_v1.config.MARKET_DATA.WEBSOCKET.IDLE_TIMEOUT,
+        WS_SESSIONS_PER_SHARD=data_container_v1.config.MARKET_DATA.WEBSOCKET.SESSIONS_PER_SHARD,
+        QUOTE_CACHE_SIZE=data_container_v1.config.MARKET_DATA.QUOTE_CACHE.SIZE,
+        BAR_CACHE_SIZE=data_container_v1.config.MARKET_DATA.BAR_CACHE.SIZE,
+        BACKFILL_CHUNK_SIZE=data_container_v1.config.MARKET_DATA.BACKFILL.CHUNK_SIZE,
+        QUOTES_DEADLINE=data_container_v1.config.MARKET_DATA.QUOTES_DEADLINE,
+        VALIDATE_QUOTES=data_container_v1.config.MARKET_DATA.VALIDATE_QUOTES,
+        HTTP_CONCURRENCY=data_container_v1.config.MARKET_DATA.HTTP_CONCURRENCY,
+        SEARCH_CACHE_SIZE=data_container_v1.config.MARKET_DATA.SEARCH_CACHE.SIZE,
+        SEARCH_CACHE_TTL=data_container_v1.config.MARKET_DATA.SEARCH_CACHE.TTL,
+        SYMBOL_DIRECTORY_PATH=data_container_v1.config.MARKET_DATA.SYMBOL_DIRECTORY.PATH,
+        CALENDAR_TTL=data_container_v1.config.MARKET_DATA.ECONOMIC_CALENDAR.TTL,
+        CALENDAR_RECENT_TTL=data_container_v1.config.MARKET_DATA.ECONOMIC_CALENDAR.RECENT_TTL,
+        RELATED_EVENTS_TTL=data_container_v1.config.MARKET_DATA.ECONOMIC_CALENDAR.RELATED_EVENTS_TTL,
+        CORRELATION_STATE_DIR=data_container_v1.config.MARKET_DATA.CORRELATIONS.STATE_DIR,
+        CORRELATION_REFRESH=data_container_v1.config.MARKET_DATA.CORRELATIONS.REFRESH,
+        CORRELATION_UNIVERSE_TTL=data_container_v1.config.MARKET_DATA.CORRELATIONS.UNIVERSE_TTL,
+        HTTP=data_container_v1.http,
+    ))
+    data_container_v1.async_client.override(Singleton(AsyncTradingView).add_attributes(
+        WORKERS_NO=data_container_v1.config.MARKET_DATA.WORKERS_NO,
+        TOKEN_TTL=data_container_v1.config.MARKET_DATA.AUTH.TOKEN_TTL,
+        TOKEN_PATH=data_container_v1.config.MARKET_DATA.AUTH.TOKEN_PATH,
+        WS_URL=data_container_v1.config.MARKET_DATA.WEBSOCKET.URL,
+        WS_POOL_SIZE=data_container_v1.config.MARKET_DATA.WEBSOCKET.POOL_SIZE,
+        WS_MAX_SESSIONS_PER_SOCKET=data_container_v1.config.MARKET_DATA.WEBSOCKET.MAX_SESSIONS_PER_SOCKET,
+        WS_IDLE_TIMEOUT=data_container_v1.config.MARKET_DATA.WEBSOCKET.IDLE_TIMEOUT,
+        WS_SESSIONS_PER_SHARD=data_container_v1.config.MARKET_DATA.WEBSOCKET.SESSIONS_PER_SHARD,
+        REALTIME_QUEUE_SIZE=data_container_v1.config.MARKET_DATA.REALTIME.QUEUE_SIZE,
+        QUOTE_CACHE_SIZE=data_container_v1.config.MARKET_DATA.QUOTE_CACHE.SIZE,
+        QUOTE_CACHE_HOT_AFTER=data_container_v1.config.MARKET_DATA.QUOTE_CACHE.HOT_AFTER,
+        QUOTE_CACHE_MAX_LIVE=data_container_v1.config.MARKET_DATA.QUOTE_CACHE.MAX_LIVE,
+        BAR_CACHE_SIZE=data_container_v1.config.MARKET_DATA.BAR_CACHE.SIZE,
+        QUOTES_DEADLINE=data_container_v1.config.MARKET_DATA.QUOTES_DEADLINE,
+        VALIDATE_QUOTES=data_container_v1.config.MARKET_DATA.VALIDATE_QUOTES,
+        HTTP_CONCURRENCY=data_container_v1.config.MARKET_DATA.HTTP_CONCURRENCY,
+        SEARCH_CACHE_SIZE=data_container_v1.config.MARKET_DATA.SEARCH_CACHE.SIZE,
+        SEARCH_CACHE_TTL=data_container_v1.config.MARKET_DATA.SEARCH_CACHE.TTL,
+        SYMBOL_DIRECTORY_PATH=data_container_v1.config.MARKET_DATA.SYMBOL_DIRECTORY.PATH,
+        CALENDAR_TTL=data_container_v1.config.MARKET_DATA.ECONOMIC_CALENDAR.TTL,
+        CALENDAR_RECENT_TTL=data_container_v1.config.MARKET_DATA.ECONOMIC_CALENDAR.RECENT_TTL,
+        RELATED_EVENTS_TTL=data_container_v1.config.MARKET_DATA.ECONOMIC_CALENDAR.RELATED_EVENTS_TTL,
+        CORRELATION_STATE_DIR=data_container_v1.config.MARKET_DATA.CORRELATIONS.STATE_DIR,
+        CORRELATION_REFRESH=data_container_v1.config.MARKET_DATA.CORRELATIONS.REFRESH,
+        CORRELATION_UNIVERSE_TTL=data_container_v1.config.MARKET_DATA.CORRELATIONS.UNIVERSE_TTL,
+        HTTP=data_container_v1.http,
     ))
 
-    new_container_v1 = NewsContainerV1()
+    new_container_v1 = NewsContainerV1(http=infra_container.http)
     new_container_v1.wire(packages=['news'])
-    new_container_v1.client.override(Singleton(SeekingAlpha))
+    new_container_v1.client.override(Singleton(SeekingAlpha).add_attributes(
+        HTTP=new_container_v1.http,
+    ))
 
-    tick_data_container_v1 = TickDataContainerV1()
+    tick_data_container_v1 = TickDataContainerV1(http=infra_container.http)
     tick_data_container_v1.wire(packages=['tick_data'])
     tick_data_container_v1.client.override(Singleton(JPX).add_attributes(
         WORKERS_NO=tick_data_container_v1.config.TICK_DATA.WORKERS_NO,
@@ -40,9 +97,11 @@ def create_app() -> FastAPI:
         PASSWORD=tick_data_container_v1.config.TICK_DATA.JPX.PASSWORD,
         TOKEN_TTL=tick_data_container_v1.config.TICK_DATA.JPX.TOKEN_TTL,
         GCS_BUCKET_NAME=tick_data_container_v1.config.TICK_DATA.JPX.GCS_BUCKET_NAME,
+        HTTP=tick_data_container_v1.http,
     ))
 
     _app = FastAPI()
+    _app.infra_container = infra_container
     _app.container = new_container_v1
     _app.new_container_v1 = new_container_v1
     _app.tick_data_container_v1 = tick_data_container_v1
@@ -60,6 +119,11 @@ async def healthz():
     return 'ok'
 
 
+@app.get('/metrics/http')
+async def http_metrics():
+    return app.infra_container.http().metrics.snapshot()
+
+
 @app.exception_handler(ConnectionRefusedError)
 async def value_error_exception_handler(request: Request, exc: ConnectionRefusedError):
     return JSONResponse(
@@ -1,4 +1,5 @@
-from typing import Dict, List
+from functools import cache
+from typing import Any, Dict, FrozenSet, Iterable, List
 
 from pydantic import BaseModel as Model
 
@@ -6,6 +7,7 @@ from pydantic import BaseModel as Model
 class BaseModel(Model):
 
     @classmethod
+    @cache
     def fields_map(cls) -> Dict[str, str]:
         '''
         This method returns dictionary of differences between class fields and provider's fields
@@ -16,10 +18,52 @@ class BaseModel(Model):
         return fields_map
 
     @classmethod
-    def non_extra_keys(cls) -> List[str]:
+    @cache
+    def aliases_map(cls) -> Dict[str, str]:
         '''
-        This method returns list of fields name which is preserved; other fields should be in "extra" attribute
+        This method returns dictionary of provider's fields and class fields to class fields
         '''
-        keys = cls.model_fields.keys()
-        aliases = [v.alias for _, v in cls.model_fields.items() if v.alias]
-        return list(set([*keys, *aliases]))
+        return {**{k: k for k in cls.model_fields}, **{v: k for k, v in cls.fields_map().items()}}
+
+    @classmethod
+    @cache
+    def non_extra_keys(cls) -> FrozenSet[str]:
+        '''
+        This method returns set of fields name which is preserved; other fields should be in "extra" attribute
+        '''
+        return frozenset(cls.aliases_map())
+
+    @classmethod
+    def construct_many(cls,
+                       items: Iterable[Dict[str, Any]],
+                       validate=False) -> List['BaseModel']:
+        '''
+        This method builds models from provider's dicts, keys other than fields and aliases go to "extra"
+        when the class has it; values are trusted as they are unless `validate`
+        '''
+        names = cls.aliases_map()
+        with_extra = 'extra' in cls.model_fields
+
+        rst = []
+        for item in items:
+            values = {}
+            extra = {}
+
+            for k, v in item.items():
+                name = names.get(k)
+
+                if name is None:
+                    extra[k] = v
+                else:
+                    values[name] = v
+
+            if extra and with_extra:
+                values['extra'] = extra
+
+            if validate:
+                aliases = cls.fields_map()
+                rst.append(cls.model_validate({aliases.get(k, k): v for k, v in values.items()}))
+            else:
+                rst.append(cls.model_construct(**values))
+
+        return rst
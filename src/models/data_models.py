@@ -54,3 +54,8 @@ class Quote(BaseQuote):
     high_ytd: Union[float, None] = Field(serialization_alias='high_ytd', alias='high_ytd', default=None)
 
     extra: Dict[str, Any] = None
+
+
+class PartialQuotes(BaseModel):
+    quotes: Dict[str, Quote] = {}
+    status: Dict[str, str] = {}
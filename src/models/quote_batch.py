@@ -0,0 +1,182 @@
+import json
+from io import BytesIO
+from typing import Any, Dict, Iterator, List, get_args
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pydantic_core import to_json
+
+from models.data_models import Quote
+
+_ARROW_TYPES = {float: pa.float64(), int: pa.int64(), str: pa.string()}
+
+
+def _arrow_type(annotation: Any) -> pa.DataType:
+    args = [i for i in get_args(annotation) if i is not type(None)] or [annotation]
+
+    return _ARROW_TYPES.get(args[0], pa.string())
+
+
+# one column per field of `Quote`, the symbol being the index and `extra` kept as JSON text
+QUOTE_SCHEMA = pa.schema([
+    pa.field('symbol', pa.string(), nullable=False),
+    *[pa.field(k, pa.string() if k == 'extra' else _arrow_type(v.annotation))
+      for k, v in Quote.model_fields.items() if k != 'symbol'],
+])
+
+
+class QuoteBatch:
+    '''
+    This class keeps quotes of many symbols as Arrow columns, one per `Quote` field, rather than one object per
+    symbol and field; a symbol's `Quote` is built on access. Symbols left out of partial results are in `status`
+    '''
+
+    def __init__(self,
+                 table: pa.Table,
+                 status: Dict[str, str] = None) -> None:
+        self._table = table
+        self._status = status
+        self._rows: Dict[str, int] = None
+
+    @classmethod
+    def from_upstream(cls,
+                      quotes: Dict[str, Dict[str, Any]],
+                      columns: pd.DataFrame = None,
+                      status: Dict[str, str] = None,
+                      logo_base_url: str = None) -> 'QuoteBatch':
+        '''
+        This method fills the columns from upstream quote dicts by symbol, keyed by fields or aliases as
+        `Quote.construct_many` takes them; `columns` indexed by symbol (e.g. performance fields) take precedence
+        '''
+        symbols = list(quotes)
+        rows = list(quotes.values())
+        names = Quote.aliases_map()
+        non_extra = Quote.non_extra_keys()
+
+        arrays: Dict[str, pa.Array] = {'symbol': pa.array(symbols, pa.string())}
+
+        for field in QUOTE_SCHEMA:
+            name = field.name
+            if name in arrays:
+                continue
+
+            if columns is not None and name in columns:
+                values = columns[name].reindex(symbols).to_numpy()
+            elif name == 'extra':
+                values = [{k: v for k, v in i.items() if k not in non_extra} for i in rows]
+                values = [json.dumps(i, default=str) if i else None for i in values]
+            else:
+                keys = [k for k, v in names.items() if v == name]
+                values = [next((i[k] for k in keys if k in i), None) for i in rows]
+
+            arrays[name] = _arrow_array(values, field.type)
+
+        if logo_base_url:
+            for logoid, url in [('logoid', 'logo_url'), ('source_logoid', 'source_logo_url')]:
+                arrays[url] = pc.if_else(pc.is_null(arrays[url]), _logo_urls(arrays[logoid], logo_base_url), arrays[url])
+
+        return cls(pa.Table.from_pydict(arrays, schema=_schema(arrays)), status)
+
+    @property
+    def table(self) -> pa.Table:
+        return self._table
+
+    @property
+    def status(self) -> Dict[str, str]:
+        return self._status
+
+    @property
+    def symbols(self) -> List[str]:
+        return self._table.column('symbol').to_pylist()
+
+    def __len__(self) -> int:
+        return self._table.num_rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._row_index()
+
+    def __getitem__(self, symbol: str) -> Quote:
+        row = self._table.slice(self._row_index()[symbol], 1).to_pylist()[0]
+
+        return _quote(row)
+
+    def to_quotes(self) -> Dict[str, Quote]:
+        '''
+        This method returns the per-symbol view, as `TradingView.quotes` returns without `columnar`
+        '''
+        return {i['symbol']: _quote(i) for i in self._table.to_pylist()}
+
+    def to_json_columns(self) -> bytes:
+        '''
+        This method returns `{"symbols": [...], "columns": {field: [...]}}`, without columns having no values
+        '''
+        columns = {i: self._table.column(i).to_pylist() for i in self._table.column_names[1:]
+                   if self._table.column(i).null_count < self._table.num_rows}
+
+        data = {'symbols': self.symbols, 'columns': columns}
+        if self._status is not None:
+            data['status'] = self._status
+
+        return to_json(data)
+
+    def to_arrow_ipc(self) -> bytes:
+        sink = BytesIO()
+
+        with pa.ipc.new_stream(sink, self._table_with_status().schema) as writer:
+            writer.write_table(self._table_with_status())
+
+        return sink.getvalue()
+
+    def to_parquet(self) -> bytes:
+        sink = BytesIO()
+        pq.write_table(self._table_with_status(), sink)
+
+        return sink.getvalue()
+
+    def _table_with_status(self) -> pa.Table:
+        # statuses name symbols which have no row, they travel in the schema metadata
+        if self._status is None:
+            return self._table
+
+        return self._table.replace_schema_metadata({**(self._table.schema.metadata or {}),
+                                                    b'status': json.dumps(self._status).encode()})
+
+    def _row_index(self) -> Dict[str, int]:
+        if self._rows is None:
+            self._rows = {k: n for n, k in enumerate(self.symbols)}
+
+        return self._rows
+
+
+def _arrow_array(values: Any, arrow_type: pa.DataType) -> pa.Array:
+    # Arrow truncates floats into integer columns, fractional values (e.g. volumes of crypto pairs) keep them float
+    if pa.types.is_integer(arrow_type) and any(isinstance(i, float) and not i.is_integer() for i in values):
+        arrow_type = pa.float64()
+
+    try:
+        # NaN of computed columns is a missing value as well
+        return pa.array(values, arrow_type, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if i is None else str(i) for i in values], pa.string())
+
+
+def _schema(arrays: Dict[str, pa.Array]) -> pa.Schema:
+    # columns keep their declared type unless upstream values required another one
+    return pa.schema([pa.field(i.name, arrays[i.name].type, nullable=i.nullable) for i in QUOTE_SCHEMA])
+
+
+def _logo_urls(logoids: pa.Array, base_url: str) -> pa.Array:
+    logoids = pc.if_else(pc.equal(logoids, ''), pa.scalar(None, pa.string()), logoids)
+
+    return pc.binary_join_element_wise(f'{base_url}/', logoids, '--big.svg', '')
+
+
+def _quote(row: Dict[str, Any]) -> Quote:
+    extra = row.pop('extra', None)
+
+    return Quote.model_construct(**row, extra=json.loads(extra) if extra else None)
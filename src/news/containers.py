@@ -1,7 +1,8 @@
 from dependency_injector import containers
 from dependency_injector.providers import (AbstractSingleton, Configuration,
-                                           Dict, Singleton)
+                                           Dependency, Dict, Singleton)
 
+from infra.http import HttpClient
 from news.provider import NewsProvider, ProviderSelector
 from news.seeking_alpha import SeekingAlpha
 from news.trading_view import TradingView
@@ -10,10 +11,13 @@ from news.trading_view import TradingView
 class Container(containers.DeclarativeContainer):
     config = Configuration(yaml_files=['config.yml'])
 
+    http = Dependency(instance_of=HttpClient, default=Singleton(HttpClient))
+
     client = AbstractSingleton(NewsProvider).add_attributes(
         WORKERS_NO=config.NEWS.WORKERS_NO,
         THROTTLING_SECONDS=config.NEWS.THROTTLING_SECONDS,
         DB_TABLE=config.NEWS.DB_TABLE,
+        HTTP=http,
     )
 
     source_selector = Singleton(ProviderSelector).add_attributes(
@@ -23,6 +27,7 @@ class Container(containers.DeclarativeContainer):
                 THROTTLING_SECONDS=config.NEWS.SeekingAlpha.THROTTLING_SECONDS,
                 BASE_URL=config.NEWS.SeekingAlpha.BASE_URL,
                 DB_TABLE=config.NEWS.SeekingAlpha.DB_TABLE,
+                HTTP=http,
             ),
             TradingView.__name__: Singleton(TradingView).add_attributes(
                 WORKERS_NO=config.NEWS.TradingView.WORKERS_NO,
@@ -30,6 +35,7 @@ class Container(containers.DeclarativeContainer):
                 BASE_URL=config.NEWS.TradingView.BASE_URL,
                 DB_TABLE=config.NEWS.TradingView.DB_TABLE,
                 BASE_URL_WEB=config.NEWS.TradingView.BASE_URL_WEB,
+                HTTP=http,
             ),
         }),
     )
@@ -4,8 +4,10 @@ from typing import Dict, List, Union
 
 import pandas as pd
 from google.cloud.bigquery import Client as BigQueryClient
+from requests import Session
 
 from infra.big_query import credentials, frame_to_big_query
+from infra.http import HttpClient
 from models.news_enums import Category
 from models.news_model import MasterData, News, Paging
 
@@ -15,6 +17,14 @@ class NewsProvider(ABC):
     THROTTLING_SECONDS: int = None
     BASE_URL: str = None
     DB_TABLE: str = None
+    HTTP: HttpClient = None
+
+    @property
+    def http(self) -> Session:
+        if self.HTTP is None:
+            self.HTTP = HttpClient()
+
+        return self.HTTP.session
 
     def master_data(self) -> MasterData:
         rst = MasterData(categories=map(str.lower, Category._member_names_))
@@ -8,7 +8,6 @@ from os.path import join
 from typing import List, Union
 
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
 from dateutil.parser import parse as date_parse
 
@@ -129,7 +128,7 @@ class SeekingAlpha(NewsProvider):
             **self.HEADERS,
         }
 
-        resp = requests.request('GET', url, params=params, headers=headers)
+        resp = self.http.get(url, params=params, headers=headers)
 
         data = resp.json()
 
@@ -151,7 +150,7 @@ class SeekingAlpha(NewsProvider):
             **self.HEADERS,
         }
 
-        resp = requests.request('GET', url, headers=headers)
+        resp = self.http.get(url, headers=headers)
 
         html = resp.text
 
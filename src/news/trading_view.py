@@ -5,7 +5,6 @@ from os.path import join
 from typing import Any, Dict, List, Union
 
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
 
 from models.news_enums import Category as BaseCategory
@@ -79,8 +78,8 @@ class TradingView(NewsProvider):
             **self.HEADERS,
         }
 
-        resp = requests.get(url, params=params, headers=headers,
-                            timeout=self.TIMEOUT)
+        resp = self.http.get(url, params=params, headers=headers,
+                             timeout=self.TIMEOUT)
 
         data: Dict[str, Union[Dict[str, Any], Any]] = resp.json()
 
@@ -94,7 +93,7 @@ class TradingView(NewsProvider):
     def detail(self,
                url: str,
                return_html: bool = True) -> str:
-        resp = requests.get(url, headers=self.HEADERS, timeout=self.TIMEOUT)
+        resp = self.http.get(url, headers=self.HEADERS, timeout=self.TIMEOUT)
 
         html = resp.text
 
@@ -114,8 +113,8 @@ class TradingView(NewsProvider):
             'lang': 'en',
         }
 
-        resp = requests.get(url, params=params, headers=headers,
-                            timeout=self.TIMEOUT)
+        resp = self.http.get(url, params=params, headers=headers,
+                             timeout=self.TIMEOUT)
 
         data: Dict[str, Union[Dict[str, Any], Any]] = resp.json()
 
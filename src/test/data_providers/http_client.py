@@ -0,0 +1,81 @@
+import asyncio
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.async_tradingview_client import \
+    AsyncTradingViewClient
+from src.infra.http import HttpClient
+from src.test.data_providers.http_server import HttpServer
+
+
+def _respond(path: str):
+    return 503 if path == '/unavailable' else 200, {'status': 'ok'}
+
+
+class TestHttpClient(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.server = HttpServer(_respond)
+        self.server.start()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_session_reuses_connections(self):
+        client = HttpClient(pool_size=2)
+
+        for _ in range(5):
+            self.assertEqual(client.session.get(self.server.url).json(), {'status': 'ok'})
+        client.session.get(f'{self.server.url}/unavailable')
+
+        metrics = client.metrics.snapshot()['127.0.0.1']
+        client.close()
+
+        self.assertEqual(metrics['requests'], 6)
+        self.assertEqual(metrics['errors'], 1)
+        self.assertEqual(metrics['connections_opened'], 1)
+        self.assertEqual(metrics['connections_reused'], 5)
+        self.assertEqual(metrics['in_use'], 0)
+        self.assertEqual(sum(metrics['latency']['buckets'].values()), 6)
+
+    def test_async_session_reuses_connections(self):
+        client = HttpClient(http2=True)
+
+        async def _get():
+            try:
+                return [(await client.async_session.get(self.server.url)).json() for _ in range(5)]
+            finally:
+                await client.aclose()
+
+        # a client per event loop, the connections of a closed loop are not reused
+        self.assertEqual(asyncio.run(_get()), [{'status': 'ok'}] * 5)
+        asyncio.run(_get())
+
+        metrics = client.metrics.snapshot()['127.0.0.1']
+
+        self.assertEqual(metrics['requests'], 10)
+        self.assertEqual(metrics['connections_opened'], 2)
+        self.assertEqual(metrics['connections_reused'], 8)
+        self.assertEqual(metrics['in_use'], 0)
+
+    def test_clients_share_injected_layer(self):
+        http = HttpClient()
+
+        async def _close():
+            client = AsyncTradingViewClient(http=http)
+            session = client.http
+            await client.close()
+            # a shared layer outlives the clients using it
+            return session is http.async_session
+
+        self.assertTrue(asyncio.run(_close()))
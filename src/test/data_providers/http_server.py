@@ -0,0 +1,62 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Any, Callable, Tuple
+
+
+class HttpServer:
+    '''
+    This class is a local HTTP/1.1 server answering GET requests from a background thread;
+    `respond(path)` returns the status and the JSON body of the request path with its query
+    '''
+
+    def __init__(self, respond: Callable[[str], Tuple[int, Any]]) -> None:
+        self.respond = respond
+        self._server: ThreadingHTTPServer = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def start(self) -> str:
+        '''
+        This method serves on a background thread and returns the url once the socket listens
+        '''
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.respond = self.respond
+
+        Thread(target=self._server.serve_forever, daemon=True).start()
+
+        return self.url
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'HttpServer':
+        self.start()
+
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status, body = self.server.respond(self.path)
+        data = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,94 @@
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+
+import numpy as np
+import pandas as pd
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.indicators import (add_indicators, bbands, ema, rsi,
+                                           split_charts)
+from src.data_providers.tradingview.tradingview import TradingView
+from src.test.data_providers.tradingview_server import TradingViewServer
+
+
+def _pine_ema(x: np.ndarray, length: int) -> np.ndarray:
+    alpha = 2 / (length + 1)
+    rst = np.full(len(x), np.nan)
+    rst[length - 1] = x[:length].mean()
+
+    for i in range(length, len(x)):
+        rst[i] = alpha * x[i] + (1 - alpha) * rst[i - 1]
+
+    return rst
+
+
+def _ohlcv(lengths) -> pd.DataFrame:
+    dfs = []
+
+    for n, length in enumerate(lengths):
+        close = 100 * np.exp(np.cumsum(np.random.default_rng(n).normal(0, 0.01, length)))
+        dfs.append(pd.DataFrame({
+            'timestamp': 1704067200 + 86400 * np.arange(length),
+            'symbol': f'S{n}',
+            'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close, 'volume': 100.0,
+        }))
+
+    return pd.concat(dfs).set_index(['timestamp', 'symbol'])
+
+
+class TestIndicators(unittest.TestCase):
+
+    def test_matches_pine_definitions(self):
+        close = _ohlcv([300]).close.to_numpy()
+        s = pd.Series(close)
+
+        np.testing.assert_allclose(ema(close[:, None], 10)[:, 0], _pine_ema(close, 10), equal_nan=True)
+
+        basis, upper, lower = bbands(close[:, None], 20)
+        np.testing.assert_allclose(basis[:, 0], s.rolling(20).mean(), equal_nan=True)
+        np.testing.assert_allclose(upper[:, 0] - basis[:, 0], 2 * s.rolling(20).std(ddof=0), equal_nan=True)
+
+        values = rsi(close[:, None], 14)[:, 0]
+        self.assertTrue(np.isnan(values[:14]).all())
+        self.assertTrue(((values[14:] > 0) & (values[14:] < 100)).all())
+
+    def test_symbols_of_different_lengths(self):
+        ohlcv = _ohlcv([120, 80])
+
+        rst = add_indicators(ohlcv, ['ema10', 'bbands20', 'rsi14', 'atr14'], tail=50)
+        alone = add_indicators(ohlcv.xs('S1', level='symbol', drop_level=False), ['ema10', 'bbands20', 'rsi14', 'atr14'])
+
+        self.assertEqual(rst.groupby(level='symbol').size().to_dict(), {'S0': 50, 'S1': 50})
+        self.assertEqual([i for i in rst.columns if i.startswith('bbands20')], ['bbands20_1', 'bbands20_2', 'bbands20_3'])
+        pd.testing.assert_frame_equal(rst.xs('S1', level='symbol'), alone.xs('S1', level='symbol').iloc[-50:])
+
+    def test_split_charts(self):
+        local, server = split_charts(['ema10', 'bbands20@server', 'rsi14', 'ema'])
+
+        self.assertEqual(local, ['ema10', 'rsi14'])
+        self.assertEqual(server, ['bbands20', 'ema'])
+
+
+class TestLocalAgainstServer(unittest.TestCase):
+
+    def test_same_columns_as_studies(self):
+        with TradingViewServer() as server:
+            client = TradingView()
+            client.WS_URL = server.url
+            client.WORKERS_NO = 4
+
+            local = client.ohlcv(['NASDAQ:AAPL', 'NYSE:IBM'], '1D', 30, charts=['ema10', 'bbands20'])
+            remote = client.ohlcv(['NASDAQ:AAPL', 'NYSE:IBM'], '1D', 30, charts=['ema10@server', 'bbands20@server'])
+
+        self.assertEqual(server.stats['create_study'], 4)
+        self.assertEqual(len(local), len(remote))
+        pd.testing.assert_frame_equal(local[remote.columns], remote, atol=1e-4, check_dtype=False)
@@ -0,0 +1,119 @@
+import io
+import json
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pydantic import ValidationError
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.endpoints import _QUOTES_ADAPTER, _negotiate
+from src.data_providers.tradingview.tradingview import (_build_quote_batch,
+                                                        _build_quotes)
+from src.models.data_models import Quote
+from src.models.quote_batch import QuoteBatch
+
+_QUOTES = {'A': {'lp': 1.5, 'logoid': 'apple', 'volume': 3, 'market': 'us'},
+           'B': {'lp': 2.0, 'logoid': '', 'volume': 2.5},
+           'C': {'ch': -1.0}}
+
+
+class TestQuoteModels(unittest.TestCase):
+
+    def test_field_maps_cached(self):
+        self.assertIs(Quote.fields_map(), Quote.fields_map())
+        self.assertIs(Quote.non_extra_keys(), Quote.non_extra_keys())
+        self.assertEqual(Quote.fields_map()['price'], 'lp')
+        self.assertEqual(Quote.aliases_map()['source-logoid'], 'source_logoid')
+        self.assertEqual(Quote.aliases_map()['price'], 'price')
+        self.assertTrue({'lp', 'price', 'extra'} <= Quote.non_extra_keys())
+
+    def test_construct_many(self):
+        items = [{'symbol': 'A', 'lp': 1.5, 'source-logoid': 'src', 'volume': 12.5, 'market': 'us'},
+                 {'symbol': 'B', 'price': 2.0}]
+
+        a, b = Quote.construct_many(items)
+
+        self.assertEqual((a.price, a.source_logoid, a.extra), (1.5, 'src', {'market': 'us'}))
+        # trusted values are kept as the upstream sent them
+        self.assertEqual(a.volume, 12.5)
+        self.assertEqual((b.price, b.extra), (2.0, None))
+        self.assertEqual(Quote.construct_many(items[1:], validate=True)[0].price, 2.0)
+
+        with self.assertRaises(ValidationError):
+            Quote.construct_many(items, validate=True)
+
+    def test_build_and_serialize(self):
+        quotes = {'A': {'lp': 1.5, 'logoid': 'apple', 'market': 'us'}, 'B': {'lp': 2.0}}
+
+        rst = _build_quotes(['A', 'B'], quotes, None, ['lp'], [])
+
+        self.assertEqual(rst['A'].logo_url, 'https://s3-symbol-logo.tradingview.com/apple--big.svg')
+        self.assertEqual(rst['A'].extra, {'market': 'us'})
+        self.assertEqual(_build_quotes('B', quotes['B'], None, ['lp'], []).symbol, 'B')
+
+        data = _QUOTES_ADAPTER.dump_json(rst, by_alias=True, exclude_none=True, warnings=False)
+
+        self.assertEqual(data, b'{"A":{"symbol":"A","price":1.5,"logoid":"apple",'
+                               b'"logo_url":"https://s3-symbol-logo.tradingview.com/apple--big.svg",'
+                               b'"extra":{"market":"us"}},"B":{"symbol":"B","price":2.0}}')
+
+
+class TestQuoteBatch(unittest.TestCase):
+
+    def test_view_matches_quotes(self):
+        batch = _build_quote_batch(['A', 'B', 'C'], {k: dict(v) for k, v in _QUOTES.items()}, None, ['lp'], [])
+        quotes = _build_quotes(['A', 'B', 'C'], {k: dict(v) for k, v in _QUOTES.items()}, None, ['lp'], [])
+
+        self.assertEqual(batch.symbols, ['A', 'B', 'C'])
+        self.assertIn('B', batch)
+        self.assertEqual({k: v.model_dump(exclude_none=True, warnings=False) for k, v in batch.to_quotes().items()},
+                         {k: v.model_dump(exclude_none=True, warnings=False) for k, v in quotes.items()})
+        self.assertEqual(batch['A'].extra, {'market': 'us'})
+        # fractional volumes are not truncated into the integer column
+        self.assertEqual(batch['B'].volume, 2.5)
+
+    def test_columns_take_precedence(self):
+        perf = pd.DataFrame({'change_5d': [0.5, float('nan')]}, index=['B', 'A'])
+
+        batch = QuoteBatch.from_upstream(_QUOTES, columns=perf, status={'A': 'ok', 'B': 'ok', 'C': 'ok', 'D': 'timeout'})
+        data = json.loads(batch.to_json_columns())
+
+        self.assertEqual(data['symbols'], ['A', 'B', 'C'])
+        self.assertEqual(data['columns']['change_5d'], [None, 0.5, None])
+        self.assertEqual(data['columns']['change'], [None, None, -1.0])
+        # columns without values are left out
+        self.assertNotIn('change_ytd', data['columns'])
+        self.assertEqual(data['status']['D'], 'timeout')
+
+    def test_arrow_and_parquet(self):
+        batch = QuoteBatch.from_upstream(_QUOTES, status={'D': 'timeout'})
+
+        ipc = pa.ipc.open_stream(batch.to_arrow_ipc()).read_all()
+        parquet = pq.read_table(io.BytesIO(batch.to_parquet()))
+
+        for table in [ipc, parquet]:
+            self.assertEqual(table.column('symbol').to_pylist(), ['A', 'B', 'C'])
+            self.assertEqual(table.column('price').to_pylist(), [1.5, 2.0, None])
+            self.assertEqual(json.loads(table.schema.metadata[b'status']), {'D': 'timeout'})
+
+    def test_negotiate(self):
+        offers = ['application/json', 'application/vnd.apache.arrow.stream', 'application/vnd.apache.parquet']
+
+        self.assertEqual(_negotiate(None, offers), 'application/json')
+        self.assertEqual(_negotiate('*/*', offers), 'application/json')
+        self.assertEqual(_negotiate('application/vnd.apache.parquet', offers), 'application/vnd.apache.parquet')
+        self.assertEqual(_negotiate('application/json;q=0.5, application/vnd.apache.arrow.stream', offers),
+                         'application/vnd.apache.arrow.stream')
+        self.assertEqual(_negotiate('text/csv, application/vnd.apache.parquet;q=0', offers), 'application/json')
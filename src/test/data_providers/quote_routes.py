@@ -0,0 +1,101 @@
+import json
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from typing import Any, AsyncIterator, Dict, List
+
+from dependency_injector.providers import Singleton
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers import endpoints
+
+# routes resolve the provider against the modules they import, without the `src.` prefix
+from data_providers.tradingview.async_tradingview import AsyncTradingView  # noqa: E402
+
+
+class _Subscription:
+    '''
+    This class delivers one update per symbol, then ends as a consumer dropped by the hub does
+    '''
+
+    def __init__(self, symbols: List[str]) -> None:
+        self.symbols = symbols
+
+    async def _updates(self) -> AsyncIterator[Dict[str, Dict[str, Any]]]:
+        for n, i in enumerate(self.symbols):
+            yield {i: {'lp': float(n)}}
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Dict[str, Any]]]:
+        return self._updates()
+
+
+class _Provider(AsyncTradingView):
+
+    def __init__(self) -> None:
+        self.unsubscribed: List[List[str]] = []
+
+    async def subscribe_quotes(self, symbols: List[str]) -> _Subscription:
+        return _Subscription(symbols)
+
+    async def unsubscribe_quotes(self, subscription: _Subscription) -> None:
+        self.unsubscribed.append(subscription.symbols)
+
+
+class TestQuoteRoutes(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.provider = _Provider()
+
+        self.container = endpoints.Container()
+        self.container.async_client.override(Singleton(lambda: self.provider))
+        self.container.wire(modules=[endpoints])
+
+        app = FastAPI()
+        app.include_router(endpoints.router)
+        self.client = TestClient(app)
+
+    def tearDown(self) -> None:
+        self.container.unwire()
+
+    def test_stream_sends_events(self):
+        resp = self.client.get('/v1/data/quotes/stream', params={'symbols': ['NASDAQ:AAPL', 'NASDAQ:MSFT']})
+
+        events = [json.loads(i[len('data: '):]) for i in resp.text.split('\n\n') if i]
+
+        self.assertEqual(resp.headers['content-type'].split(';')[0], 'text/event-stream')
+        self.assertEqual(events, [{'NASDAQ:AAPL': {'lp': 0.0}}, {'NASDAQ:MSFT': {'lp': 1.0}}])
+        self.assertEqual(self.provider.unsubscribed, [['NASDAQ:AAPL', 'NASDAQ:MSFT']])
+
+    def test_stream_requires_symbols(self):
+        self.assertEqual(self.client.get('/v1/data/quotes/stream').status_code, 422)
+
+    def test_ws_sends_updates(self):
+        with self.client.websocket_connect('/v1/data/quotes/ws?symbols=NASDAQ:AAPL') as ws:
+            self.assertEqual(ws.receive_json(), {'NASDAQ:AAPL': {'lp': 0.0}})
+
+            # the hub dropped the consumer
+            with self.assertRaises(WebSocketDisconnect) as e:
+                ws.receive_json()
+
+        self.assertEqual(e.exception.code, 1013)
+        self.assertEqual(self.provider.unsubscribed, [['NASDAQ:AAPL']])
+
+    def test_ws_requires_symbols(self):
+        # closed before it is accepted
+        with self.assertRaises(WebSocketDisconnect) as e:
+            with self.client.websocket_connect('/v1/data/quotes/ws'):
+                pass
+
+        self.assertEqual(e.exception.code, 1008)
+        self.assertEqual(self.provider.unsubscribed, [])
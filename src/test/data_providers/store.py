@@ -0,0 +1,91 @@
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+
+import pandas as pd
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.enums import Adjustment
+from src.data_providers.store import OHLCVStore
+
+
+class _CountingStore(OHLCVStore):
+
+    evictions = 0
+
+    def evict(self) -> None:
+        self.evictions += 1
+        super().evict()
+
+
+class TestOHLCVStore(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.root = tempfile.mkdtemp()
+        self.store = OHLCVStore(self.root)
+        self.calls = []
+
+    def _fetch(self, symbols, freq, total_candles, charts, adjustment, tzinfo):
+        self.calls.append(symbols)
+
+        index = pd.MultiIndex.from_product([pd.date_range('2024-01-01', periods=total_candles, tz=tzinfo), symbols],
+                                           names=['Date', 'Symbol'])
+        df = pd.DataFrame({'Open': 1.0, 'High': 2.0, 'Low': 0.5, 'Close': 1.5, 'Volume': 10.0}, index=index)
+        df.rename_axis(axis=1, inplace=True, mapper='Field')
+
+        return df.sort_index(level=['Symbol', 'Date'])
+
+    def test_read_through(self):
+        a = self.store.ohlcv(self._fetch, ['NASDAQ:AAPL', 'NASDAQ:MSFT'], '1D', 5)
+        b = self.store.ohlcv(self._fetch, ['NASDAQ:MSFT', 'NASDAQ:QQQ'], '1D', 5, tzinfo='America/Chicago')
+
+        self.assertEqual(self.calls, [['NASDAQ:AAPL', 'NASDAQ:MSFT'], ['NASDAQ:QQQ']])
+        self.assertEqual(a.index.names, ['Date', 'Symbol'])
+        self.assertEqual(len(b), 10)
+        self.assertEqual(str(b.index.levels[0].tz), 'America/Chicago')
+
+        # other request parameters are other files
+        self.store.ohlcv(self._fetch, 'NASDAQ:MSFT', '1D', 10)
+        self.store.ohlcv(self._fetch, 'NASDAQ:MSFT', '1D', 5, adjustment=Adjustment.SPLIT)
+        self.assertEqual(len(self.calls), 4)
+
+    def test_no_bars(self):
+        df = self.store.ohlcv(self._fetch, ['NASDAQ:AAPL', 'NASDAQ:MSFT'], '1D', 0)
+
+        self.assertTrue(df.empty)
+        self.assertEqual(self.store.size, 0)
+
+    def test_column_projection(self):
+        self.store.ohlcv(self._fetch, 'NASDAQ:AAPL', '1D', 5)
+
+        df = OHLCVStore(self.root).ohlcv(self._fetch, 'NASDAQ:AAPL', '1D', 5, columns=['Close'])
+
+        self.assertEqual(list(df.columns), ['Close'])
+        self.assertEqual(len(self.calls), 1)
+
+    def test_size_eviction(self):
+        self.store.ohlcv(self._fetch, ['NASDAQ:AAPL', 'NASDAQ:MSFT', 'NASDAQ:QQQ'], '1D', 5)
+        size = self.store.size
+
+        store = OHLCVStore(self.root, max_bytes=size * 2 // 3)
+        store.evict()
+
+        self.assertLessEqual(store.size, size * 2 // 3)
+
+    def test_batch_evicts_once(self):
+        store = _CountingStore(self.root, max_bytes=1)
+        store.ohlcv(self._fetch, ['NASDAQ:AAPL', 'NASDAQ:MSFT', 'NASDAQ:QQQ'], '1D', 5)
+
+        self.assertEqual(store.evictions, 1)
+        self.assertEqual(store.size, 0)
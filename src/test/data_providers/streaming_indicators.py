@@ -0,0 +1,115 @@
+import asyncio
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from time import perf_counter
+
+import numpy as np
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.indicators import bbands, ema, highlow, sma
+from src.data_providers.streaming_indicators import (StreamingEMA,
+                                                     StreamingIndicators)
+from src.data_providers.tradingview.async_tradingview import AsyncTradingView
+from src.test.data_providers.tradingview_server import TradingViewServer
+
+_CHARTS = ['ema10', 'sma5', 'bbands20', 'highlow14']
+
+
+def _bars(count: int) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+
+    return np.column_stack([close * 1.01, close * 0.99, close])
+
+
+class TestStreamingIndicators(unittest.TestCase):
+
+    def test_matches_batch_with_revisions(self):
+        bars = _bars(200)
+        indicators = StreamingIndicators(_CHARTS)
+
+        closed = []
+        for t, (high, low, close) in enumerate(bars):
+            # the forming bar is revised a few times before its final values
+            indicators.update(t, high * 0.999, low * 1.001, close * 1.002)
+            indicators.update(t, high * 0.998, low * 1.001, close * 0.997)
+            closed.append(indicators.update(t, high, low, close))
+
+        close = bars[:, 2:]
+        expected = {
+            'ema10': ema(close, 10)[:, 0],
+            'sma5': sma(close, 5)[:, 0],
+            'bbands20_1': bbands(close, 20)[0][:, 0],
+            'bbands20_3': bbands(close, 20)[2][:, 0],
+            'highlow14_1': highlow(bars[:, :1], bars[:, 1:2], 14)[0][:, 0],
+            'highlow14_2': highlow(bars[:, :1], bars[:, 1:2], 14)[1][:, 0],
+        }
+
+        for column, values in expected.items():
+            np.testing.assert_allclose([i[column] for i in closed], values, rtol=1e-9, equal_nan=True, err_msg=column)
+
+    def test_older_revision_ignored(self):
+        indicator = StreamingEMA(2)
+        indicator.update(1, 0, 0, 10)
+        indicator.update(2, 0, 0, 20)
+
+        self.assertEqual(indicator.update(1, 0, 0, 1000), (15,))
+
+    def test_update_cost_independent_of_history(self):
+        def _cost(history: int) -> float:
+            indicators = StreamingIndicators(_CHARTS)
+            for t, bar in enumerate(_bars(history)):
+                indicators.update(t, *bar)
+
+            start = perf_counter()
+            for i in range(2000):
+                indicators.update(history + i // 2, 101, 99, 100)
+
+            return perf_counter() - start
+
+        self.assertLess(_cost(50000) / _cost(500), 3)
+
+
+class TestRealtimeBars(unittest.TestCase):
+
+    def test_forming_and_new_bars(self):
+        with TradingViewServer(update_interval=0.02, new_bar_every=3) as server:
+            received = []
+
+            async def _updates():
+                client = AsyncTradingView()
+                client.WS_URL = server.url
+                client.WORKERS_NO = 1
+
+                bars = client.realtime_bars('NASDAQ:AAPL', '1', charts=['ema10', 'bbands20'])
+                bars.add_callback(received.append)
+
+                rst = []
+                try:
+                    async for update in bars:
+                        rst.append(update)
+
+                        if len(rst) == 6:
+                            return rst
+                finally:
+                    await client.tv.close()
+
+            updates = asyncio.run(asyncio.wait_for(_updates(), 10))
+
+        self.assertEqual(received, updates)
+        self.assertEqual(sum(i.new for i in updates), 2)
+        self.assertTrue(all(not np.isnan(i.indicators['ema10']) for i in updates))
+        self.assertEqual(sorted(updates[0].indicators), ['bbands20_1', 'bbands20_2', 'bbands20_3', 'ema10'])
+
+        # revisions of one bar share its timestamp
+        for prev, update in zip(updates, updates[1:]):
+            self.assertEqual(update.timestamp > prev.timestamp, update.new)
@@ -0,0 +1,131 @@
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from queue import Empty, Queue
+from subprocess import CalledProcessError
+
+import pandas as pd
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.protocol import (FrameDecoder,
+                                                     create_message)
+from src.data_providers.tradingview.tradingview import TradingView
+
+_START = 1704067200  # 2024-01-01
+_BARS = 25
+
+
+class _ChartChannel:
+    '''
+    This class answers a chart session from `_BARS` daily bars, the newest ones first, like the upstream does
+    '''
+
+    def __init__(self, pages: int = None) -> None:
+        self.queue = Queue()
+        self.sent = []
+        self.served = 0
+        self.pages = pages
+        self.timeouts = []
+
+    def send(self, data: str) -> None:
+        for payload in FrameDecoder().feed(data):
+            message = json.loads(payload)
+            self.sent.append(message['m'])
+            sess = message['p'][0]
+
+            if message['m'] == 'resolve_symbol':
+                self.queue.put(create_message('symbol_resolved', [sess, 'sds_sym', {'pro_name': 'NASDAQ:AAPL'}]))
+            elif message['m'] == 'create_series':
+                self._serve(sess, message['p'][5])
+            elif message['m'] == 'request_more_data' and self.sent.count('request_more_data') != self.pages:
+                self._serve(sess, message['p'][2])
+
+    def recv(self, timeout: float = None) -> str:
+        self.timeouts.append(timeout)
+
+        # nothing left to answer: the upstream stalled and the channel gives up as its deadline would
+        try:
+            return self.queue.get(block=False)
+        except Empty:
+            raise TimeoutError(f'no message within {timeout} seconds')
+
+    def _serve(self, sess: str, count: int) -> None:
+        end = _BARS - self.served
+        start = max(end - count, 0)
+        self.served += end - start
+
+        s = [{'i': i, 'v': [_START + i * 86400, 1.0, 2.0, 0.5, 1.5, 100.0]} for i in range(start, end)]
+        self.queue.put(create_message('timescale_update', [sess, {'s_ohlcv': {'s': s}}]))
+        self.queue.put(create_message('series_completed', [sess, 's_ohlcv']))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_) -> None:
+        pass
+
+
+class _Pool:
+
+    def __init__(self, pages: int = None) -> None:
+        self.pages = pages
+
+    def channel(self, quote_sessions=None, chart_sessions=None) -> _ChartChannel:
+        self.last = _ChartChannel(self.pages)
+        return self.last
+
+
+class TestBackfill(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.client = TradingView()
+        self.client.BACKFILL_CHUNK_SIZE = 10
+        self.client.tv._pool = _Pool()
+
+    def test_pages_whole_history(self):
+        chunks = list(self.client.ohlcv_backfill('NASDAQ:AAPL', '1D'))
+
+        self.assertEqual([len(i) for i in chunks], [10, 10, 5])
+        self.assertEqual(self.client.tv.pool.last.sent.count('request_more_data'), 3)
+
+        df = pd.concat(chunks).sort_index()
+        self.assertTrue(df.index.is_unique)
+        self.assertEqual(len(df), _BARS)
+
+    def test_date_range(self):
+        chunks = list(self.client.ohlcv_backfill('NASDAQ:AAPL', '1D', from_date='2024-01-08', to_date='2024-01-20'))
+
+        dates = pd.concat(chunks).index.get_level_values('Date')
+        self.assertEqual((dates.min().day, dates.max().day, len(dates)), (8, 20, 13))
+        # paging stops once from_date is reached
+        self.assertEqual(self.client.tv.pool.last.sent.count('request_more_data'), 1)
+
+    def test_total_candles_to_file(self):
+        path = join(tempfile.mkdtemp(), 'NASDAQ_AAPL.parquet')
+
+        rows = self.client.ohlcv_backfill_to_file(path, 'NASDAQ:AAPL', '1D', total_candles=15)
+
+        self.assertEqual(rows, 15)
+        self.assertEqual(len(pd.read_parquet(path)), 15)
+
+    def test_stalled_page_times_out(self):
+        # the first page arrives, the next one never does
+        self.client.tv._pool = _Pool(pages=1)
+        chunks = self.client.ohlcv_backfill('NASDAQ:AAPL', '1D')
+
+        self.assertEqual(len(next(chunks)), 10)
+        with self.assertRaises(TimeoutError):
+            next(chunks)
+
+        self.assertNotIn(None, self.client.tv.pool.last.timeouts)
@@ -0,0 +1,69 @@
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from typing import List
+
+import pandas as pd
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.bar_cache import BarCache, freq_seconds
+
+
+def _ohlcv(symbols: List[str], end: pd.Timestamp, periods: int, close: float = 1.0) -> pd.DataFrame:
+    index = pd.MultiIndex.from_product([pd.date_range(end=end, periods=periods, freq='1h'), symbols],
+                                       names=['timestamp', 'symbol'])
+    df = pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': 1.0}, index=index)
+
+    return df.sort_index(level=['symbol', 'timestamp'])
+
+
+class TestBarCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.now = pd.Timestamp.now(tz='UTC').floor('h')
+        self.cache = BarCache()
+        self.cache.update(_ohlcv(['A', 'B'], self.now - pd.Timedelta(hours=3), 101), '60', 'dividends', 100)
+
+    def test_plan_tail_only(self):
+        plan = self.cache.plan(['A', 'B', 'C'], '60', 'dividends', 100)
+
+        self.assertEqual(plan, {4: ['A', 'B'], 100: ['C']})
+        self.assertEqual(self.cache.plan(['A'], '60', 'dividends', 200), {200: ['A']})
+        self.assertEqual(self.cache.plan(['A'], '1D', 'dividends', 100), {100: ['A']})
+
+    def test_plan_monthly_tail(self):
+        # February and March elapsed since the last cached candle
+        self.cache.update(_ohlcv(['A'], self.now - pd.Timedelta(days=59), 12), '1M', 'dividends', 12)
+
+        self.assertEqual(self.cache.plan(['A'], '1M', 'dividends', 12), {3: ['A']})
+
+    def test_merge_tail(self):
+        # forming bar is revised, three new bars arrive
+        self.cache.update(_ohlcv(['A'], self.now, 4, close=2.0), '60', 'dividends', 3)
+
+        df = self.cache.window(['A', 'B'], '60', 'dividends', 50)
+        a = df.xs('A', level='symbol')
+
+        self.assertEqual(df.index.names, ['timestamp', 'symbol'])
+        self.assertEqual(len(a), 51)
+        self.assertTrue(a.index.is_unique and a.index.is_monotonic_increasing)
+        self.assertEqual(a.index[-1], self.now)
+        self.assertEqual(a['close'].iloc[-4:].tolist(), [2.0] * 4)
+        self.assertEqual(len(df.xs('B', level='symbol')), 51)
+
+    def test_freq_seconds(self):
+        self.assertEqual(freq_seconds('15'), 15 * 60)
+        self.assertEqual(freq_seconds('1D'), 24 * 60 * 60)
+        self.assertEqual(freq_seconds('W'), 7 * 24 * 60 * 60)
+        self.assertEqual(freq_seconds('1M'), 28 * 24 * 60 * 60)
+        self.assertIsNone(freq_seconds('1Y'))
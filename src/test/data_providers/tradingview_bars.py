@@ -0,0 +1,60 @@
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.bars import BarBuffer, ChartSessionBars
+
+
+def _bars(start: int, stop: int, close: float = 1.0):
+    return [{'i': i, 'v': [1712620800 + i * 60, 1.0, 2.0, 0.5, close, 100.0]}
+            for i in range(start, stop)]
+
+
+class TestBarBuffer(unittest.TestCase):
+
+    def test_skip_first_bar(self):
+        buffer = BarBuffer()
+        buffer.update(_bars(0, 10))
+
+        self.assertEqual(len(buffer), 9)
+        self.assertEqual(buffer.index[0], 1)
+
+    def test_overwrite_forming_bar(self):
+        buffer = BarBuffer(capacity=4)
+        buffer.update(_bars(1, 10))
+        buffer.update(_bars(9, 10, close=3.0))
+        buffer.update(_bars(10, 11, close=4.0))
+
+        self.assertEqual(len(buffer), 10)
+        self.assertEqual(buffer.values[-2, 4], 3.0)
+        self.assertEqual(buffer.values[-1, 4], 4.0)
+
+    def test_late_bar_is_inserted_in_order(self):
+        buffer = BarBuffer()
+        buffer.update(_bars(1, 5))
+        buffer.update(_bars(6, 8))
+        buffer.update(_bars(5, 6))
+
+        self.assertEqual(list(buffer.index), list(range(1, 8)))
+
+    def test_session_frame(self):
+        bars = ChartSessionBars()
+        bars.update('s_ohlcv', {'s': _bars(1, 5)})
+        bars.update('s_bbands20', {'st': [{'i': i, 'v': [1712620800 + i * 60, 1.0, 2.0, 3.0]} for i in range(1, 5)]})
+        bars.update('s_ema10', {'st': [{'i': i, 'v': [1712620800 + i * 60, 1.0]} for i in range(1, 5)]})
+
+        df = bars.to_frame()
+
+        self.assertEqual(list(df.columns), ['open', 'high', 'low', 'close', 'volume',
+                                            'bbands20_1', 'bbands20_2', 'bbands20_3', 'ema10'])
+        self.assertEqual(df.index.name, 'timestamp')
+        self.assertEqual(len(df), 4)
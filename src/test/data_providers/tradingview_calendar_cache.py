@@ -0,0 +1,154 @@
+import asyncio
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from datetime import date, datetime, timedelta, timezone
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.async_tradingview_client import \
+    AsyncTradingViewClient
+from src.data_providers.tradingview.calendar_cache import \
+    EconomicCalendarCache
+from src.data_providers.tradingview.tradingview_client import \
+    TradingViewClient
+from src.test.data_providers.http_server import HttpServer
+
+_CLIENT_MODULES = [sys.modules['src.data_providers.tradingview.tradingview_client'],
+                   sys.modules['data_providers.tradingview.tradingview_client']]
+
+
+def _events(from_date: str, to_date: str, countries: str = None) -> List[Dict[str, Any]]:
+    day, end = date.fromisoformat(from_date[:10]), date.fromisoformat(to_date[:10])
+
+    rst = []
+    while day <= end:
+        for country in (countries or 'US,EU').split(','):
+            rst.append({'id': f'{country}-{day}', 'country': country, 'date': f'{day}T12:30:00.000Z'})
+        day += timedelta(days=1)
+
+    return rst
+
+
+class TestEconomicCalendarCache(unittest.TestCase):
+
+    def test_plan_merges_missing_days(self):
+        cache = EconomicCalendarCache()
+        cache.update(('2024-01-03T00:00:00.000Z', '2024-01-04T23:59:59.999Z', ['US']), [])
+        cache.update(('2024-01-06T00:00:00.000Z', '2024-01-06T23:59:59.999Z', None), [])
+
+        self.assertEqual(cache.plan('2024-01-01T08:00:00.000Z', '2024-01-07T08:00:00.000Z', ['US', 'EU']), [
+            ('2024-01-01T00:00:00.000Z', '2024-01-05T23:59:59.999Z', ['US', 'EU']),
+            ('2024-01-07T00:00:00.000Z', '2024-01-07T23:59:59.999Z', ['US', 'EU']),
+        ])
+        self.assertEqual(cache.plan('2024-01-03', '2024-01-04', ['US']), [])
+
+    def test_refetched_days_replace_events(self):
+        cache = EconomicCalendarCache()
+        cache.update(('2024-01-03T00:00:00.000Z', '2024-01-04T23:59:59.999Z', None), [
+            {'id': 'cpi', 'country': 'US', 'date': '2024-01-03T13:30:00.000Z'},
+            {'id': 'nfp', 'country': 'US', 'date': '2024-01-03T13:30:00.000Z'},
+            {'id': 'hicp', 'country': 'EU', 'date': '2024-01-03T10:00:00.000Z'},
+        ])
+        # cpi moved a day later, nfp was cancelled, EU was not fetched again
+        cache.update(('2024-01-03T00:00:00.000Z', '2024-01-04T23:59:59.999Z', ['US']), [
+            {'id': 'cpi', 'country': 'US', 'date': '2024-01-04T13:30:00.000Z'},
+        ])
+
+        events = cache.events('2024-01-03T00:00:00.000Z', '2024-01-04T23:59:59.999Z')
+
+        self.assertEqual([(i['id'], i['date'][:10]) for i in events], [('hicp', '2024-01-03'), ('cpi', '2024-01-04')])
+
+    def test_stale_days_evicted(self):
+        cache = EconomicCalendarCache(ttl=0)
+        cache.update(('2024-01-03T00:00:00.000Z', '2024-01-03T23:59:59.999Z', None),
+                     [{'id': 'cpi', 'country': 'US', 'date': '2024-01-03T13:30:00.000Z'}])
+        cache.update(('2024-01-05T00:00:00.000Z', '2024-01-05T23:59:59.999Z', None), [])
+
+        self.assertEqual(cache.events('2024-01-03T00:00:00.000Z', '2024-01-03T23:59:59.999Z'), [])
+        self.assertEqual((list(cache._events), cache._event_days), ([date(2024, 1, 5)], {}))
+
+
+class TestEconomicCalendar(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.requests: List[Dict[str, str]] = []
+        self.server = HttpServer(self._respond)
+        self.server.start()
+
+        self.url = _CLIENT_MODULES[0]._ECONOMIC_URL
+        for i in _CLIENT_MODULES:
+            i._ECONOMIC_URL = self.server.url
+
+    def tearDown(self) -> None:
+        for i in _CLIENT_MODULES:
+            i._ECONOMIC_URL = self.url
+        self.server.stop()
+
+    def _respond(self, path: str):
+        url = urlparse(path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.requests.append({'path': url.path, **params})
+
+        if url.path == '/events':
+            return 200, {'status': 'ok', 'result': _events(params['from'], params['to'], params.get('countries'))}
+
+        return 200, {'status': 'ok', 'result': [{'id': params['eventId'], 'actual': 1.0}]}
+
+    def _calls(self, path: str) -> List[Dict[str, str]]:
+        return [i for i in self.requests if i['path'] == path]
+
+    def test_only_missing_days_fetched(self):
+        client = TradingViewClient()
+
+        week = client.economic_calendar('2024-01-01T00:00:00.000Z', '2024-01-07T23:59:59.000Z', ['US'], True)
+        again = client.economic_calendar('2024-01-01T00:00:00.000Z', '2024-01-07T23:59:59.000Z', ['US'], True)
+
+        self.assertEqual(len(week), 7)
+        self.assertEqual(week, again)
+        self.assertEqual(week[0]['events'], [{'id': 'US-2024-01-01', 'actual': 1.0}])
+        self.assertEqual(len(self._calls('/events')), 1)
+        self.assertEqual(len(self._calls('/related_events')), 7)
+
+        shifted = client.economic_calendar('2024-01-05T00:00:00.000Z', '2024-01-09T23:59:59.000Z', ['US', 'EU'])
+
+        self.assertEqual(len(shifted), 10)
+        # one request for the days missing a country, consecutive days merged
+        self.assertEqual([(i['from'], i['to'], i['countries']) for i in self._calls('/events')[1:]],
+                         [('2024-01-05T00:00:00.000Z', '2024-01-09T23:59:59.999Z', 'EU,US')])
+
+    def test_recent_days_fetched_again(self):
+        client = TradingViewClient(calendar_recent_ttl=0)
+        today = datetime.now(timezone.utc).date()
+
+        for _ in range(2):
+            client.economic_calendar(f'{today - timedelta(days=3)}T00:00:00.000Z', f'{today}T23:59:59.000Z', ['US'])
+
+        self.assertEqual([i['from'][:10] for i in self._calls('/events')],
+                         [str(today - timedelta(days=3)), str(today - timedelta(days=1))])
+
+    def test_async_client(self):
+        async def _calendar():
+            client = AsyncTradingViewClient()
+            try:
+                for _ in range(2):
+                    rst = await client.economic_calendar('2024-01-01T00:00:00.000Z', '2024-01-07T23:59:59.000Z',
+                                                         fetch_related_events=True)
+                return rst
+            finally:
+                await client.close()
+
+        rst = asyncio.run(_calendar())
+
+        self.assertEqual(len(rst), 14)
+        self.assertEqual(len(self._calls('/events')), 1)
+        self.assertEqual(len(self._calls('/related_events')), 14)
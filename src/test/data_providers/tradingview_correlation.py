@@ -0,0 +1,187 @@
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from tempfile import TemporaryDirectory
+from time import perf_counter, time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.correlation import (CorrelationStates,
+                                            RollingCorrelation,
+                                            top_correlations)
+from src.data_providers.tradingview.tradingview import (_correlation_candles,
+                                                        _correlation_closes)
+
+
+def _reference_corr(closes: pd.DataFrame, periods: List[str], top_k: int) -> pd.DataFrame:
+    # full matrix with pandas, pairs over the rows both symbols have
+    rows = []
+
+    for p in periods:
+        n = closes.resample(p).count().max().max()
+        corr = closes.pct_change(-n, fill_method=None).corr()
+
+        for s1 in corr:
+            for s2, v in corr[s1].drop(s1).dropna().nlargest(top_k).items():
+                rows.append({'period': p, 's1': s1, 's2': s2, 'corr': v})
+
+    return pd.DataFrame(rows)
+
+
+def _closes(symbols: int, length: int, seed=0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    # a few common factors so that partners are well apart
+    factors = rng.normal(0, 0.01, (length, 4))
+    loadings = rng.normal(0, 1, (4, symbols))
+    returns = factors @ loadings + rng.normal(0, 0.01, (length, symbols))
+
+    return pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)),
+                        index=pd.bdate_range(end='2024-03-15', periods=length, name='Date'),
+                        columns=pd.Index([f'S{i}' for i in range(symbols)], name='Symbol'))
+
+
+def _sorted(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(['period', 's1', 'corr', 's2']).reset_index(drop=True)
+
+
+class TestTopCorrelations(unittest.TestCase):
+
+    def test_matches_pandas(self):
+        closes = _closes(40, 120)
+        periods = ['1D', '5D', '10D']
+
+        for top_k in [1, 3]:
+            # blocks smaller than the symbols, the last one partial
+            rst = top_correlations(closes, periods, top_k, block_size=16).reset_index()
+            expected = _reference_corr(closes, periods, top_k)
+
+            pd.testing.assert_frame_equal(_sorted(rst), _sorted(expected), check_dtype=False)
+
+    def test_missing_history(self):
+        closes = _closes(12, 80)
+        closes.iloc[:50, 3] = np.nan
+        closes.iloc[:78, 5] = np.nan
+        closes.iloc[:, 7] = 100.0
+
+        rst = top_correlations(closes, ['1D', '5D'], 2, block_size=5).reset_index()
+        expected = _reference_corr(closes, ['1D', '5D'], 2)
+
+        pd.testing.assert_frame_equal(_sorted(rst), _sorted(expected), check_dtype=False)
+        # a flat series correlates with nothing
+        self.assertNotIn('S7', rst.s1.tolist() + rst.s2.tolist())
+
+    def test_layout(self):
+        closes = _closes(6, 60)
+        ohlcv = closes.stack().rename('Close').to_frame()
+
+        rst = top_correlations(_correlation_closes(ohlcv), ['5D', '1D'])
+
+        self.assertEqual(rst.index.names, ['period', 's1', 's2'])
+        self.assertEqual(rst.index.get_level_values('period').unique().tolist(), ['1D', '5D'])
+        self.assertTrue((rst.groupby('period')['corr'].diff().dropna() >= 0).all())
+        self.assertEqual(len(rst), 12)
+
+    def test_many_symbols(self):
+        closes = _closes(1500, 252)
+
+        start = perf_counter()
+        rst = top_correlations(closes, ['1D', '5D', '10D', '21D'], 5)
+
+        self.assertEqual(len(rst), 1500 * 5 * 4)
+        self.assertLess(perf_counter() - start, 5)
+
+
+class TestRollingCorrelation(unittest.TestCase):
+
+    def assert_same_pairs(self, rst: pd.DataFrame, expected: pd.DataFrame):
+        rst, expected = _sorted(rst.reset_index()), _sorted(expected.reset_index())
+
+        pd.testing.assert_frame_equal(rst[['period', 's1', 's2']], expected[['period', 's1', 's2']])
+        np.testing.assert_allclose(rst['corr'], expected['corr'], atol=1e-9)
+
+    def test_updates_match_recomputation(self):
+        closes = _closes(30, 200)
+        closes.iloc[:60, 3] = np.nan
+        periods = ['1D', '5D', '10D']
+
+        state = RollingCorrelation.from_closes(closes.iloc[:120], periods, window=100)
+        # bars already kept are revised, the following ones roll the window
+        state.extend(closes.iloc[110:190])
+
+        revised = closes.iloc[189] * 1.01
+        state.update(closes.index[189], revised.drop('S4'))
+
+        expected = closes.iloc[90:190].copy()
+        expected.iloc[-1] = revised.drop('S4').reindex(expected.columns).fillna(expected.iloc[-1])
+
+        self.assertEqual(state.last_date, closes.index[189])
+        self.assert_same_pairs(state.correlations(top_k=3), top_correlations(expected, periods, 3))
+        self.assert_same_pairs(state.correlations(['5D'], 2), top_correlations(expected, ['5D'], 2))
+
+    def test_forward_filled_symbol_goes_flat(self):
+        closes = _closes(10, 200)
+        state = RollingCorrelation.from_closes(closes.iloc[:100], ['1D', '5D'], window=50)
+
+        # S3 has no close for longer than the window, its returns cancel out of the rolling sums
+        state.extend(closes.iloc[100:].drop(columns='S3'))
+        rst = state.correlations(top_k=2).reset_index()
+
+        self.assertNotIn('S3', rst.s1.tolist() + rst.s2.tolist())
+        self.assertEqual(len(rst), 9 * 2 * 2)
+
+    def test_states_outlive_process(self):
+        closes = _closes(10, 80)
+        state = RollingCorrelation.from_closes(closes.tz_localize('UTC'), ['1D', '5D'])
+
+        with TemporaryDirectory() as directory:
+            key = CorrelationStates.key(markets=['america'], topn=10)
+            CorrelationStates(directory).put(key, state)
+
+            loaded = CorrelationStates(directory).get(key)
+
+            self.assertIsNone(CorrelationStates(directory).get(CorrelationStates.key(markets=['japan'])))
+
+        self.assertEqual(loaded.last_date, state.last_date)
+        self.assertEqual(loaded.periods, ['1D', '5D'])
+        self.assertAlmostEqual(loaded.refreshed_at, state.refreshed_at)
+        pd.testing.assert_frame_equal(loaded.correlations(), state.correlations())
+
+    def test_refresh_candles(self):
+        closes = _closes(5, 60)
+        closes.index = pd.date_range(end=pd.Timestamp.now(tz='UTC').floor('D') - pd.Timedelta(days=2), periods=60)
+        state = RollingCorrelation.from_closes(closes, ['1D', '5D'])
+
+        self.assertIsNone(_correlation_candles(None, ['1D'], '1D', 60, 3600, 86400))
+        # fresh, then only the candles elapsed since the last one
+        self.assertEqual(_correlation_candles(state, ['1D'], '1D', 60, 3600, 86400), 0)
+        state.refreshed_at = time() - 7200
+        self.assertIn(_correlation_candles(state, ['1D'], '1D', 60, 3600, 86400), [3, 4])
+        # periods it lacks, an old universe or candles beyond the window build it again
+        self.assertIsNone(_correlation_candles(state, ['21D'], '1D', 60, 3600, 86400))
+        self.assertIsNone(_correlation_candles(state, ['1D'], '1D', 3, 3600, 86400))
+        state.created_at = time() - 86400
+        self.assertIsNone(_correlation_candles(state, ['1D'], '1D', 60, 3600, 86400))
+
+    def test_update_is_cheaper_than_recomputation(self):
+        closes = _closes(800, 253)
+        periods = ['1D', '5D', '10D', '21D']
+
+        start = perf_counter()
+        state = RollingCorrelation.from_closes(closes.iloc[:-1], periods)
+        seed = perf_counter() - start
+
+        start = perf_counter()
+        state.update(closes.index[-1], closes.iloc[-1])
+        self.assertLess(perf_counter() - start, seed)
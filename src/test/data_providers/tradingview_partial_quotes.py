@@ -0,0 +1,101 @@
+import json
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from queue import Empty, Queue
+from subprocess import CalledProcessError
+from time import perf_counter
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.protocol import (FrameDecoder,
+                                                     create_message)
+from src.data_providers.tradingview.tradingview import TradingView
+from src.models.data_models import PartialQuotes
+
+
+class _QuoteChannel:
+    '''
+    This class answers `quote_add_symbols` by the symbol exchange: `OK` completes, `ERR` errors,
+    `HALF` sends fields but never completes and `SLOW` never answers
+    '''
+
+    def __init__(self) -> None:
+        self.queue = Queue()
+
+    def send(self, data: str) -> None:
+        for payload in FrameDecoder().feed(data):
+            message = json.loads(payload)
+            if message['m'] != 'quote_add_symbols':
+                continue
+
+            sess, symbol = message['p']
+            exchange = symbol.split(':')[0]
+
+            if exchange == 'ERR':
+                self.queue.put(create_message('qsd', [sess, {'n': symbol, 's': 'error', 'v': {}}]))
+            elif exchange in ('OK', 'HALF'):
+                self.queue.put(create_message('qsd', [sess, {'n': symbol, 's': 'ok', 'v': {'lp': 1.5}}]))
+
+            if exchange in ('OK', 'ERR'):
+                self.queue.put(create_message('quote_completed', [sess, symbol]))
+
+    def recv(self, timeout: float = None) -> str:
+        try:
+            return self.queue.get(timeout=timeout)
+        except Empty:
+            raise TimeoutError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_) -> None:
+        pass
+
+
+class _Pool:
+
+    def channel(self, quote_sessions=None, chart_sessions=None) -> _QuoteChannel:
+        return _QuoteChannel()
+
+
+class TestPartialQuotes(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client = TradingView()
+        self.client.QUOTES_DEADLINE = 0.2
+        self.client.tv._pool = _Pool()
+
+    def test_stream_in_completion_order(self):
+        rst = list(self.client.tv.stream_quotes(['OK:A', 'ERR:B', 'OK:C'], fields=['lp'], deadline=1))
+
+        self.assertEqual([i[0] for i in rst], ['OK:A', 'ERR:B', 'OK:C'])
+        self.assertEqual(rst[0][1], {'lp': 1.5})
+
+    def test_deadline_bounds_whole_request(self):
+        start = perf_counter()
+        quotes, statuses = self.client.tv.current_quotes_partial(['OK:A', 'HALF:B', 'SLOW:C', 'ERR:D'],
+                                                                 fields=['lp'], deadline=0.2)
+
+        self.assertLess(perf_counter() - start, 1)
+        self.assertEqual(list(quotes), ['OK:A', 'HALF:B'])
+        self.assertEqual(statuses, {'OK:A': 'ok', 'HALF:B': 'partial', 'SLOW:C': 'timeout', 'ERR:D': 'error'})
+
+    def test_provider_partial(self):
+        rst = self.client.quotes(['OK:A', 'SLOW:B'], fields=['lp'], max_age=60, partial=True)
+
+        self.assertEqual(type(rst).__name__, PartialQuotes.__name__)
+        self.assertEqual(list(rst.quotes), ['OK:A'])
+        self.assertEqual(rst.status, {'OK:A': 'ok', 'SLOW:B': 'timeout'})
+
+        # completed symbols are cached, the others are fetched again
+        rst = self.client.quotes(['OK:A', 'SLOW:B'], fields=['lp'], max_age=60, partial=True)
+        self.assertEqual(rst.status, {'OK:A': 'ok', 'SLOW:B': 'timeout'})
+        self.assertEqual(self.client.quote_cache.hits, 1)
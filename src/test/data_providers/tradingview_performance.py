@@ -0,0 +1,104 @@
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from time import perf_counter
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.performance import HORIZONS, perf_table
+from src.data_providers.tradingview.tradingview import _build_quotes
+
+
+def _reference_perf(ohlcv: pd.DataFrame, freq: str) -> Dict[str, Dict[str, Any]]:
+    # one symbol at a time with pandas, as quotes used to compute it
+    spec = HORIZONS[freq]
+    rst = {}
+
+    for s, sym in ohlcv.set_index('Date').groupby('Symbol', sort=False):
+        if isinstance(spec, str):
+            periods = sym.index.to_period(spec)
+            close = sym.Close.groupby(periods).last()
+            low, high = sym.Low.groupby(periods).min(), sym.High.groupby(periods).max()
+            prev = close.shift(1)
+        else:
+            close, prev = sym.Close, sym.Close.shift(spec)
+            low, high = sym.Low.rolling(spec).min(), sym.High.rolling(spec).max()
+
+        rst[s] = {'close': close.iloc[-1],
+                  f'change_{freq}': close.iloc[-1] - prev.iloc[-1],
+                  f'change_{freq}_pct': (close.iloc[-1] - prev.iloc[-1]) / prev.iloc[-1],
+                  f'low_{freq}': low.iloc[-1],
+                  f'high_{freq}': high.iloc[-1]}
+
+    return rst
+
+
+def _ohlcv(lengths, seed=0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dfs = []
+
+    for n, length in enumerate(lengths):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))
+        # every other symbol trades on weekdays only
+        dates = pd.bdate_range(end='2024-03-15', periods=length) if n % 2 else \
+            pd.date_range(end='2024-03-15', periods=length)
+        dfs.append(pd.DataFrame({
+            'Date': dates + pd.Timedelta(hours=17),
+            'Symbol': f'S{n}',
+            'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close, 'Volume': 100.0,
+        }))
+
+    return pd.concat(dfs, ignore_index=True)
+
+
+class TestPerfTable(unittest.TestCase):
+
+    def test_matches_per_symbol_pandas(self):
+        ohlcv = _ohlcv([300, 120, 3, 40])
+        ohlcv.loc[ohlcv.index[-1], 'Close'] = np.nan
+        ohlcv.loc[ohlcv.index[-2], 'Low'] = np.nan
+        ohlcv.loc[ohlcv.index[130], 'High'] = np.nan
+
+        table = perf_table(ohlcv, list(HORIZONS))
+
+        self.assertEqual(table.index.tolist(), ['S0', 'S1', 'S2', 'S3'])
+
+        for freq in HORIZONS:
+            expected = pd.DataFrame.from_dict(_reference_perf(ohlcv, freq), orient='index')
+            columns = expected.columns[1:]
+
+            pd.testing.assert_frame_equal(table[columns], expected[columns], check_names=False)
+            pd.testing.assert_frame_equal(perf_table(ohlcv, [freq]), expected, check_names=False)
+
+    def test_quotes_merge_requested_fields(self):
+        ohlcv = _ohlcv([60, 60])
+        quotes = {'S0': {'lp': 1.0}, 'S1': {'lp': 2.0}}
+
+        rst = _build_quotes(['S0', 'S1'], quotes, ohlcv, ['lp', 'change_5d', 'high_ytd'], ['5D', 'YTD'])
+        expected = perf_table(ohlcv, ['5D', 'YTD'])
+
+        self.assertEqual(rst['S1'].price, 2.0)
+        self.assertAlmostEqual(rst['S1'].change_5d, expected.loc['S1', 'change_5d'])
+        self.assertAlmostEqual(rst['S0'].high_ytd, expected.loc['S0', 'high_ytd'])
+        # fields of a horizon not requested are left out
+        self.assertIsNone(rst['S0'].low_5d)
+
+    def test_many_symbols_in_one_pass(self):
+        ohlcv = _ohlcv([504] * 500)
+
+        start = perf_counter()
+        table = perf_table(ohlcv, list(HORIZONS))
+
+        self.assertEqual(len(table), 500)
+        self.assertLess(perf_counter() - start, 1)
@@ -0,0 +1,79 @@
+import json
+import logging
+import re
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from logging import StreamHandler
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from timeit import timeit
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.protocol import (FrameDecoder,
+                                                     is_heartbeat,
+                                                     prepend_header)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(StreamHandler())
+
+
+def _regex_payloads(msgs: str):
+    if re.findall(r'~m~\d+~m~~h~\d+', msgs):
+        return [re.findall('.......(.*)', msgs)[0]]
+
+    return list(filter(None, re.split(r'~m~\d+~m~', msgs)))
+
+
+def _timescale_update(bars: int) -> str:
+    s = [{'i': i, 'v': [1712620800 + i * 60, 441.4, 442.1, 440.9, 441.7, 1234567.0]}
+         for i in range(bars)]
+    payload = {'m': 'timescale_update', 'p': ['cs_ajfeydlkwhfc', {'s_ohlcv': {'node': 'x', 's': s}}]}
+
+    return prepend_header(json.dumps(payload, separators=(',', ':')))
+
+
+class TestFrameDecoder(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        with open('src/test/fixtures/NASDAQ:QQQ_analysis.csv') as f:
+            self.recorded = f.read().strip()
+
+    def test_same_payloads_as_regex(self):
+        payloads = list(FrameDecoder().feed(self.recorded))
+
+        self.assertEqual(payloads, _regex_payloads(self.recorded))
+
+    def test_heartbeat(self):
+        payloads = list(FrameDecoder().feed('~m~4~m~~h~1'))
+
+        self.assertEqual(payloads, ['~h~1'])
+        self.assertTrue(is_heartbeat(payloads[0]))
+
+    def test_frame_split_across_recv(self):
+        decoder = FrameDecoder()
+        payloads = []
+
+        for i in range(0, len(self.recorded), 1000):
+            payloads.extend(decoder.feed(self.recorded[i:i + 1000]))
+
+        self.assertEqual(payloads, _regex_payloads(self.recorded))
+
+    def test_benchmark_against_regex(self):
+        for name, msgs in [('recorded', self.recorded),
+                           ('timescale_update_5000', _timescale_update(5000))]:
+            number = 200
+            t_regex = timeit(lambda: _regex_payloads(msgs), number=number)
+            t_decoder = timeit(lambda: list(FrameDecoder().feed(msgs)), number=number)
+
+            logger.info('%s: regex %.3f ms, decoder %.3f ms per message',
+                        name, t_regex / number * 1e3, t_decoder / number * 1e3)
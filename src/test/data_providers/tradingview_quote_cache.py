@@ -0,0 +1,62 @@
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from time import sleep
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.quote_cache import QuoteCache
+
+
+class TestQuoteCache(unittest.TestCase):
+
+    def test_hit_and_miss(self):
+        cache = QuoteCache()
+        cache.put('NASDAQ:AAPL', {'lp': 1.0, 'ch': 0.1}, fields=['lp', 'ch', 'volume'])
+
+        cached, missing = cache.lookup(['NASDAQ:AAPL', 'NASDAQ:MSFT'], ['lp', 'volume'], max_age=60)
+
+        self.assertEqual(cached, {'NASDAQ:AAPL': {'lp': 1.0}})
+        self.assertEqual(missing, ['NASDAQ:MSFT'])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # field never requested before is a miss
+        self.assertIsNone(cache.get('NASDAQ:AAPL', ['lp', 'chp'], max_age=60))
+
+    def test_max_age(self):
+        cache = QuoteCache()
+        cache.put('NASDAQ:AAPL', {'lp': 1.0})
+        sleep(0.02)
+
+        self.assertIsNone(cache.get('NASDAQ:AAPL', ['lp'], max_age=0.01))
+        self.assertEqual(cache.lookup(['NASDAQ:AAPL'], ['lp'], max_age=None), ({}, ['NASDAQ:AAPL']))
+
+        cache.set_live('NASDAQ:AAPL', ['lp'])
+        self.assertEqual(cache.get('NASDAQ:AAPL', ['lp'], max_age=0.01), {'lp': 1.0})
+
+        # the subscription is lost, the value ages again
+        cache.clear_live()
+        self.assertIsNone(cache.get('NASDAQ:AAPL', ['lp'], max_age=0.01))
+
+    def test_lru_eviction(self):
+        cache = QuoteCache(max_size=2)
+        cache.put('A', {'lp': 1.0})
+        cache.put('B', {'lp': 2.0})
+        cache.get('A', ['lp'], max_age=60)
+        cache.put('C', {'lp': 3.0})
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('B', ['lp'], max_age=60))
+        self.assertIsNotNone(cache.get('A', ['lp'], max_age=60))
+
+    def test_hot_symbol(self):
+        cache = QuoteCache(hot_after=2)
+
+        self.assertEqual([cache.touch('A') for _ in range(3)], [False, True, True])
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.protocol import (FrameDecoder,
+                                                     create_message)
+from src.data_providers.tradingview.quote_hub import QuoteHub
+
+
+class _Channel:
+
+    def __init__(self) -> None:
+        self.sent = []
+        self.queue = asyncio.Queue()
+        self.closed = False
+
+    async def send(self, data: str) -> None:
+        self.sent.extend(json.loads(i) for i in FrameDecoder().feed(data))
+
+    async def recv(self) -> str:
+        return await self.queue.get()
+
+    async def close(self) -> None:
+        self.closed = True
+
+    def qsd(self, sess: str, symbol: str, lp: float) -> None:
+        self.queue.put_nowait(create_message('qsd', [sess, {'n': symbol, 's': 'ok', 'v': {'lp': lp}}]))
+
+
+class _Pool:
+
+    def __init__(self) -> None:
+        self.channels = []
+
+    async def channel(self, quote_sessions=None, chart_sessions=None) -> _Channel:
+        self.channels.append(_Channel())
+        return self.channels[-1]
+
+
+class _Client:
+
+    def __init__(self) -> None:
+        self.pool = _Pool()
+
+
+class TestQuoteHub(unittest.TestCase):
+
+    def test_one_upstream_subscription_per_symbol(self):
+        async def _test():
+            client = _Client()
+            hub = QuoteHub(client)
+
+            a = await hub.subscribe(['NASDAQ:AAPL'])
+            b = await hub.subscribe(['NASDAQ:AAPL', 'NASDAQ:MSFT'])
+            await asyncio.sleep(0)
+
+            channel = client.pool.channels[0]
+            sess = channel.sent[0]['p'][0]
+            added = [i['p'][1:] for i in channel.sent if i['m'] == 'quote_add_symbols']
+
+            self.assertEqual(len(client.pool.channels), 1)
+            self.assertEqual(sorted(sum(added, [])), ['NASDAQ:AAPL', 'NASDAQ:MSFT'])
+            self.assertEqual(hub.refs('NASDAQ:AAPL'), 2)
+
+            channel.qsd(sess, 'NASDAQ:AAPL', 1.0)
+            self.assertEqual(await a.get(), {'NASDAQ:AAPL': {'lp': 1.0}})
+            self.assertEqual(await b.get(), {'NASDAQ:AAPL': {'lp': 1.0}})
+
+            await hub.unsubscribe(b)
+            self.assertEqual(channel.sent[-1], {'m': 'quote_remove_symbols', 'p': [sess, 'NASDAQ:MSFT']})
+
+            await hub.unsubscribe(a)
+            self.assertTrue(channel.closed)
+            self.assertEqual(hub.symbols, [])
+
+        asyncio.run(_test())
+
+    def test_slow_consumer_is_dropped(self):
+        async def _test():
+            client = _Client()
+            hub = QuoteHub(client, queue_size=2)
+
+            fast = await hub.subscribe(['NASDAQ:AAPL'])
+            slow = await hub.subscribe(['NASDAQ:AAPL'])
+            await asyncio.sleep(0)
+
+            channel = client.pool.channels[0]
+            sess = channel.sent[0]['p'][0]
+
+            for i in range(3):
+                channel.qsd(sess, 'NASDAQ:AAPL', float(i))
+                await asyncio.sleep(0)
+                await fast.get()
+
+            await asyncio.sleep(0)
+
+            self.assertTrue(slow.dropped)
+            self.assertEqual([i async for i in slow], [])
+            self.assertFalse(fast.closed)
+            self.assertEqual(hub.refs('NASDAQ:AAPL'), 1)
+
+            await hub.close()
+            self.assertEqual(hub._unsubscribing, set())
+
+        asyncio.run(_test())
+
+    def test_lost_session_is_reported(self):
+        async def _test():
+            lost = []
+            client = _Client()
+            hub = QuoteHub(client, reconnect_delay=0, on_lost=lambda: lost.append(True))
+
+            subscription = await hub.subscribe(['NASDAQ:AAPL'])
+            await asyncio.sleep(0)
+
+            channel = client.pool.channels[0]
+            channel.queue.put_nowait(create_message('critical_error', ['lost']))
+
+            for _ in range(5):
+                await asyncio.sleep(0)
+
+            self.assertEqual(lost, [True])
+            self.assertTrue(channel.closed)
+            self.assertEqual(len(client.pool.channels), 2)
+
+            await hub.unsubscribe(subscription)
+
+        asyncio.run(_test())
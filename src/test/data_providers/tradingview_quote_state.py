@@ -0,0 +1,109 @@
+import logging
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from logging import StreamHandler
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from time import perf_counter
+
+from pydantic.v1.utils import deep_update
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.quote_state import QuoteSessionState
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(StreamHandler())
+
+_SESS = 'qs_ajfeydlkwhfc'
+
+
+def _messages(symbols):
+    for i in symbols:
+        yield {'m': 'qsd', 'p': [_SESS, {'n': i, 's': 'ok', 'v': {'lp': 1.0, 'ch': 0.1, 'description': i}}]}
+        yield {'m': 'qsd', 'p': [_SESS, {'n': i, 's': 'ok', 'v': {'lp': 1.1, 'volume': 100}}]}
+
+    for i in symbols:
+        yield {'m': 'quote_completed', 'p': [_SESS, i]}
+
+
+def _deep_update_feed(symbols, messages):
+    # former `_socket_quote` bookkeeping
+    msg = {}
+    for m_data in messages:
+        p = m_data['p']
+        if m_data['m'] == 'quote_completed':
+            data = {p[0]: {p[1]: {'quote_completed': True}}}
+        else:
+            data = {p[0]: {p[1]['n']: p[1]['v']}}
+
+        msg = deep_update(msg, data)
+
+        sess = next(iter(msg.keys()))
+        _ = all([v.get('quote_completed') for _, v in msg[sess].items()]) and not set(symbols) - set(msg[sess].keys())
+
+
+def _state_feed(symbols, messages):
+    state = QuoteSessionState(symbols)
+    for m_data in messages:
+        state.feed(m_data)
+        _ = state.completed
+
+    return state
+
+
+class TestQuoteSessionState(unittest.TestCase):
+
+    def test_merge_in_place(self):
+        symbols = ['NASDAQ:AAPL', 'NASDAQ:MSFT']
+        state = QuoteSessionState(symbols)
+        messages = list(_messages(symbols))
+
+        for m_data in messages[:-1]:
+            state.feed(m_data)
+            self.assertFalse(state.completed)
+
+        state.feed(messages[-1])
+
+        self.assertTrue(state.completed)
+        self.assertEqual(state.result(), {_SESS: {i: {'lp': 1.1, 'ch': 0.1, 'description': i, 'volume': 100}
+                                                  for i in symbols}})
+
+    def test_symbol_without_data(self):
+        state = QuoteSessionState(['NASDAQ:AAPL', 'BAD:SYMBOL'])
+
+        state.feed({'m': 'qsd', 'p': [_SESS, {'n': 'BAD:SYMBOL', 's': 'error', 'v': {}}]})
+        state.feed({'m': 'quote_completed', 'p': [_SESS, 'BAD:SYMBOL']})
+        self.assertFalse(state.completed)
+
+        state.feed({'m': 'quote_completed', 'p': [_SESS, 'NASDAQ:AAPL']})
+        self.assertTrue(state.completed)
+        self.assertEqual(state.quotes, {'BAD:SYMBOL': {}, 'NASDAQ:AAPL': {}})
+
+    def test_benchmark_per_message_cost(self):
+        costs = {}
+
+        for count in [100, 1000]:
+            symbols = [f'NASDAQ:S{i}' for i in range(count)]
+            messages = list(_messages(symbols))
+
+            t = perf_counter()
+            _state_feed(symbols, messages)
+            costs[count] = (perf_counter() - t) / len(messages)
+
+            t = perf_counter()
+            _deep_update_feed(symbols, messages)
+            deep_update_cost = (perf_counter() - t) / len(messages)
+
+            logger.info('%s symbols: state %.2f us, deep_update %.2f us per message',
+                        count, costs[count] * 1e6, deep_update_cost * 1e6)
+
+        # constant per message, leave room for timer noise
+        self.assertLess(costs[1000], costs[100] * 3)
@@ -0,0 +1,96 @@
+import asyncio
+import subprocess
+import sys
+import unittest
+from collections import Counter
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from time import perf_counter, sleep
+from urllib.parse import parse_qs, urlparse
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.async_tradingview_client import \
+    AsyncTradingViewClient
+from src.data_providers.tradingview.tradingview_client import \
+    TradingViewClient
+from src.test.data_providers.http_server import HttpServer
+
+# the async client takes its request helpers from the module as imported without `src`
+_CLIENT_MODULES = [sys.modules['src.data_providers.tradingview.tradingview_client'],
+                   sys.modules['data_providers.tradingview.tradingview_client']]
+
+_LATENCY = 0.02
+
+
+class TestSearchMulti(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.requests = Counter()
+        self.server = HttpServer(self._respond)
+        self.server.start()
+
+        self.url = _CLIENT_MODULES[0]._API_URL_
+        for i in _CLIENT_MODULES:
+            i._API_URL_ = f'{self.server.url}/symbol_search/v3'
+
+    def tearDown(self) -> None:
+        for i in _CLIENT_MODULES:
+            i._API_URL_ = self.url
+        self.server.stop()
+
+    def _respond(self, path: str):
+        text = parse_qs(urlparse(path).query)['text'][0]
+        self.requests[text] += 1
+        sleep(_LATENCY)
+
+        symbols = [] if text.startswith('NONE') else [{'symbol': text, 'exchange': 'NASDAQ'}]
+
+        return 200, {'symbols': symbols}
+
+    def test_parallel_coalesced_and_cached(self):
+        client = TradingViewClient(http_concurrency=16)
+        queries = [f'S{i}' for i in range(500)] + ['S1', 'S2', 'NONE']
+
+        start = perf_counter()
+        rst = client.search_multi(queries, {})
+        elapsed = perf_counter() - start
+
+        self.assertEqual(len(rst), 501)
+        self.assertEqual(rst['S7'], {'symbol': 'S7', 'exchange': 'NASDAQ'})
+        self.assertIsNone(rst['NONE'])
+        # duplicates are searched once
+        self.assertEqual(max(self.requests.values()), 1)
+        self.assertLess(elapsed, 500 * _LATENCY / 4)
+
+        start = perf_counter()
+        self.assertEqual(client.search_multi(queries, {}), rst)
+        self.assertLess(perf_counter() - start, 0.1)
+        self.assertEqual(sum(self.requests.values()), 501)
+
+        # other parameters are another search
+        client.search_multi(['S1'], {'exchange': 'NYSE'})
+        self.assertEqual(client.search('S1', exchange='NYSE'), rst['S1'])
+        self.assertEqual(self.requests['S1'], 2)
+
+    def test_async_shares_behaviour(self):
+        async def _search():
+            client = AsyncTradingViewClient(http_concurrency=16)
+            try:
+                first = await client.search_multi(['A', 'B', 'A'], {'country': 'us'})
+                second = await client.search_multi(['B'], {'country': 'US'})
+                return first, second, client.search_cache.hits
+            finally:
+                await client.close()
+
+        first, second, hits = asyncio.run(_search())
+
+        self.assertEqual(list(first), ['A', 'B'])
+        self.assertEqual(second['B'], first['B'])
+        self.assertEqual(hits, 1)
+        self.assertEqual(self.requests, Counter({'A': 1, 'B': 1}))
@@ -0,0 +1,446 @@
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import zlib
+from collections import Counter
+from contextlib import suppress
+from logging import INFO, StreamHandler, getLogger
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from threading import Event, Thread
+from time import monotonic, time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from websockets.asyncio.server import ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.bar_cache import freq_seconds
+from src.data_providers.tradingview.protocol import (FrameDecoder,
+                                                     create_message,
+                                                     is_heartbeat,
+                                                     prepend_header)
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+logger.addHandler(StreamHandler())
+
+_HISTORY = 5000
+
+
+class TradingViewServer:
+    '''
+    This class is a local stand-in of the TradingView websocket speaking the `~m~` framing;
+    quotes and bars come from recorded fixtures or, for other symbols, from a generator seeded by the symbol,
+    so the same request always gets the same answer
+
+    - `latency`: seconds before each reply is sent
+    - `rate`: maximum frames per second sent on a connection, `None` for unlimited
+    - `heartbeat`: seconds between `~h~` frames, `None` to disable
+    - `update_interval`: seconds between realtime `qsd` of subscribed symbols and `du` of open series, `None` to disable
+    - `new_bar_every`: number of `du` revising the forming bar before the next bar opens
+    - `disconnect_after`: number of frames after which a connection is closed, `None` to keep it
+    - `fixtures`: `{'quotes': {symbol: fields}, 'bars': {symbol: [[t, o, h, l, c, v], ...]}, 'errors': [symbol],
+      'aliases': {ticker: pro_name}, 'tokens': [token]}` or the path to such a JSON file; without `tokens`
+      any auth token is accepted
+    '''
+
+    def __init__(self,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 latency: float = 0,
+                 rate: Optional[float] = None,
+                 heartbeat: Optional[float] = 10,
+                 update_interval: Optional[float] = None,
+                 new_bar_every: int = 5,
+                 disconnect_after: Optional[int] = None,
+                 fixtures: Any = None) -> None:
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.rate = rate
+        self.heartbeat = heartbeat
+        self.update_interval = update_interval
+        self.new_bar_every = new_bar_every
+        self.disconnect_after = disconnect_after
+        self.stats: Counter = Counter()
+
+        if isinstance(fixtures, str):
+            with open(fixtures) as f:
+                fixtures = json.load(f)
+
+        fixtures = fixtures or {}
+        self._quotes: Dict[str, Dict[str, Any]] = fixtures.get('quotes', {})
+        self._bars: Dict[Tuple[str, str], np.ndarray] = {
+            (k, ''): np.asarray(v, dtype=np.float64) for k, v in fixtures.get('bars', {}).items()
+        }
+        self._errors = set(fixtures.get('errors', []))
+        # bare tickers resolved to pro names, as the upstream resolves `AAPL` to `NASDAQ:AAPL`
+        self._aliases: Dict[str, str] = fixtures.get('aliases', {})
+        self._tokens: Optional[List[str]] = fixtures.get('tokens')
+
+        self._loop: asyncio.AbstractEventLoop = None
+        self._thread: Thread = None
+        self._stop: asyncio.Event = None
+
+    @property
+    def url(self) -> str:
+        return f'ws://{self.host}:{self.port}'
+
+    def start(self) -> str:
+        '''
+        This method serves on a background thread and returns the url once the socket listens
+        '''
+        started = Event()
+
+        def _run():
+            asyncio.run(self._serve(started))
+
+        self._thread = Thread(target=_run, daemon=True)
+        self._thread.start()
+        started.wait()
+
+        return self.url
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join()
+            self._loop = None
+
+    def __enter__(self) -> 'TradingViewServer':
+        self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+    async def serve_forever(self) -> None:
+        await self._serve(Event())
+
+    async def _serve(self, started: Event) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+
+        async with serve(self._handle, self.host, self.port, max_size=None) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            started.set()
+
+            await self._stop.wait()
+
+    async def _handle(self, ws: ServerConnection) -> None:
+        self.stats['connections'] += 1
+        await _Connection(self, ws).run()
+
+    def resolve(self, symbol: str) -> str:
+        return self._aliases.get(symbol, symbol)
+
+    def accepts(self, token: str) -> bool:
+        return self._tokens is None or token in self._tokens
+
+    def quote(self, symbol: str, fields: List[str] = None) -> Optional[Dict[str, Any]]:
+        if symbol in self._errors:
+            return None
+
+        quote = self._quotes.get(symbol)
+
+        if quote is None:
+            close = self.bars(symbol, '1D')[-1]
+            exchange, _, name = symbol.rpartition(':')
+            quote = {
+                'lp': round(close[4], 2),
+                'ch': round(close[4] - close[1], 2),
+                'chp': round((close[4] / close[1] - 1) * 100, 2),
+                'volume': close[5],
+                'lp_time': int(time()),
+                'description': name,
+                'short_name': name,
+                'pro_name': symbol,
+                'exchange': exchange,
+                'currency_code': 'USD',
+                'type': 'stock',
+                'current_session': 'market',
+            }
+
+        if fields:
+            quote = {k: v for k, v in quote.items() if k in fields}
+
+        return quote
+
+    def tick(self, symbol: str, fields: List[str] = None) -> Dict[str, Any]:
+        quote = self.quote(symbol, fields) or {}
+        lp = quote.get('lp', 100)
+
+        return {'lp': round(lp * (1 + np.random.normal(0, 0.001)), 2), 'lp_time': int(time())}
+
+    def bars(self, symbol: str, freq: str) -> np.ndarray:
+        '''
+        This method returns `[t, o, h, l, c, v]` rows of symbol, oldest first
+        '''
+        rows = self._bars.get((symbol, '')) if freq_seconds(freq) == freq_seconds('1D') else None
+        if rows is None:
+            rows = self._bars.get((symbol, freq))
+
+        if rows is None:
+            rows = self._bars[(symbol, freq)] = _random_walk(symbol, freq_seconds(freq) or 86400, _HISTORY)
+
+        return rows
+
+
+class _Connection:
+
+    def __init__(self, server: TradingViewServer, ws: ServerConnection) -> None:
+        self._server = server
+        self._ws = ws
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._sent = 0
+        self._fields: Dict[str, List[str]] = {}
+        self._quote_symbols: Dict[str, List[str]] = {}
+        self._chart_symbols: Dict[str, Tuple[str, str]] = {}
+        self._served: Dict[Tuple[str, str], int] = {}
+        self._series: Dict[str, Tuple[str, str]] = {}
+        self._live: Dict[str, Tuple[str, List[float]]] = {}
+        self._ticks = 0
+
+    async def run(self) -> None:
+        tasks = [asyncio.create_task(self._write())]
+
+        if self._server.heartbeat:
+            tasks.append(asyncio.create_task(self._heartbeat()))
+
+        if self._server.update_interval:
+            tasks.append(asyncio.create_task(self._updates()))
+
+        self._reply(prepend_header(json.dumps({'session_id': 'stand-in', 'timestamp': int(time())})))
+
+        decoder = FrameDecoder()
+
+        try:
+            async for msgs in self._ws:
+                for payload in decoder.feed(msgs):
+                    if is_heartbeat(payload):
+                        self._server.stats['heartbeats'] += 1
+                        continue
+
+                    message = json.loads(payload)
+                    self._server.stats[message['m']] += 1
+                    self._dispatch(message['m'], message['p'])
+        except ConnectionClosed:
+            pass
+        except Exception:
+            # a bug of the stand-in, not a client gone
+            self._server.stats['errors'] += 1
+            logger.exception('Stand-in connection failed')
+        finally:
+            for i in tasks:
+                i.cancel()
+
+    def _reply(self, *frames: str) -> None:
+        self._outbox.put_nowait((monotonic() + self._server.latency, ''.join(frames)))
+
+    async def _write(self) -> None:
+        rate = self._server.rate
+
+        while True:
+            due, frames = await self._outbox.get()
+
+            delay = due - monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            await self._ws.send(frames)
+            self._sent += 1
+
+            if self._server.disconnect_after is not None and self._sent >= self._server.disconnect_after:
+                self._server.stats['disconnects'] += 1
+                await self._ws.close()
+                return
+
+            if rate:
+                await asyncio.sleep(1 / rate)
+
+    async def _heartbeat(self) -> None:
+        count = 0
+
+        while True:
+            await asyncio.sleep(self._server.heartbeat)
+            count += 1
+            self._outbox.put_nowait((0, prepend_header(f'~h~{count}')))
+
+    async def _updates(self) -> None:
+        while True:
+            await asyncio.sleep(self._server.update_interval)
+
+            for sess, symbols in self._quote_symbols.items():
+                for i in symbols:
+                    v = self._server.tick(i, self._fields.get(sess))
+                    self._reply(create_message('qsd', [sess, {'n': i, 's': 'ok', 'v': v}]))
+
+            self._ticks += 1
+            new_bar = self._ticks % self._server.new_bar_every == 0
+
+            for sess, (series, bar) in self._live.items():
+                self._reply(create_message('du', [sess, {series: {'s': [_next_bar(bar, self._series[sess][1], new_bar)]}}]))
+
+    def _dispatch(self, m: str, p: List[Any]) -> None:
+        sess = p[0] if p else None
+
+        if m == 'set_auth_token':
+            if not self._server.accepts(sess):
+                self._server.stats['rejected_tokens'] += 1
+                self._reply(create_message('critical_error', ['invalid auth token', 'set_auth_token']))
+        elif m == 'quote_create_session':
+            self._quote_symbols[sess] = []
+        elif m == 'quote_set_fields':
+            self._fields[sess] = p[1:]
+        elif m == 'quote_add_symbols':
+            self._add_symbols(sess, p[1:])
+        elif m == 'quote_remove_symbols':
+            symbols = self._quote_symbols.get(sess, [])
+            self._quote_symbols[sess] = [i for i in symbols if i not in p[1:]]
+        elif m == 'quote_delete_session':
+            self._quote_symbols.pop(sess, None)
+        elif m == 'chart_create_session':
+            self._chart_symbols[sess] = None
+        elif m == 'resolve_symbol':
+            self._resolve_symbol(sess, p[2])
+        elif m == 'create_series':
+            self._create_series(sess, p[1], p[4], p[5])
+        elif m == 'request_more_data':
+            self._serve_series(sess, p[1], p[2])
+        elif m == 'create_study':
+            self._create_study(sess, p[1], p[3], p[5] if len(p) > 5 else {})
+        elif m == 'chart_delete_session':
+            self._chart_symbols.pop(sess, None)
+            self._live.pop(sess, None)
+
+    def _add_symbols(self, sess: str, symbols: List[str]) -> None:
+        self._quote_symbols.setdefault(sess, []).extend(symbols)
+
+        for i in symbols:
+            quote = self._server.quote(i, self._fields.get(sess))
+
+            if quote is None:
+                data = create_message('qsd', [sess, {'n': i, 's': 'error', 'errmsg': 'invalid symbol', 'v': {}}])
+            else:
+                data = create_message('qsd', [sess, {'n': i, 's': 'ok', 'v': quote}])
+
+            self._reply(data, create_message('quote_completed', [sess, i]))
+
+    def _resolve_symbol(self, sess: str, spec: str) -> None:
+        symbol = self._server.resolve(json.loads(spec.removeprefix('='))['symbol'])
+        self._chart_symbols[sess] = symbol
+        exchange, _, name = symbol.rpartition(':')
+
+        self._reply(create_message('symbol_resolved', [sess, 'sds_sym', {
+            'name': name, 'pro_name': symbol, 'exchange': exchange, 'type': 'stock', 'currency_code': 'USD',
+        }]))
+
+    def _create_series(self, sess: str, series: str, freq: str, count: int) -> None:
+        self._series[sess] = (self._chart_symbols.get(sess), str(freq))
+        self._serve_series(sess, series, count)
+
+        rows = self._server.bars(*self._series[sess])
+        self._live[sess] = (series, [len(rows) - 1, *rows[-1].tolist()])
+
+    def _serve_series(self, sess: str, series: str, count: int) -> None:
+        symbol, freq = self._series[sess]
+        rows = self._server.bars(symbol, freq)
+
+        # older bars are served on each `request_more_data`, like the upstream pages history
+        end = len(rows) - self._served.get((sess, series), 0)
+        start = max(end - int(count), 0)
+        self._served[(sess, series)] = len(rows) - start
+
+        s = [{'i': i, 'v': rows[i].tolist()} for i in range(start, end)]
+
+        self._reply(create_message('timescale_update', [sess, {series: {'s': s, 'ns': {'d': '', 'indexes': []}, 't': 's1'}}]),
+                    create_message('series_completed', [sess, series, 'streaming']))
+
+    def _create_study(self, sess: str, study: str, series: str, settings: Dict[str, Any]) -> None:
+        symbol, freq = self._series[sess]
+        rows = self._server.bars(symbol, freq)
+        start = len(rows) - self._served.get((sess, series), 0)
+
+        values = _study_values(rows, settings)
+        st = [{'i': i, 'v': [rows[i][0], *values[i]]} for i in range(start, len(rows))]
+
+        self._reply(create_message('du', [sess, {study: {'st': st, 'ns': {'d': '', 'indexes': []}}}]),
+                    create_message('study_completed', [sess, study]))
+
+
+def _random_walk(symbol: str, seconds: int, count: int) -> np.ndarray:
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+
+    end = int(time()) // seconds * seconds
+    t = end - seconds * np.arange(count - 1, -1, -1)
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.005, count))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.005, count))
+    volume = rng.integers(1_000, 1_000_000, count)
+
+    return np.column_stack([t, open_, high, low, close, volume]).round(4)
+
+
+def _next_bar(bar: List[float], freq: str, new_bar: bool) -> Dict[str, Any]:
+    '''
+    This function moves the live bar `[i, t, o, h, l, c, v]` in place: revises its close or opens the next bar
+    '''
+    close = round(bar[5] * (1 + np.random.normal(0, 0.002)), 4)
+
+    if new_bar:
+        bar[:] = [bar[0] + 1, bar[1] + (freq_seconds(freq) or 86400), bar[5], bar[5], bar[5], bar[5], 0]
+
+    bar[3:6] = [max(bar[3], close), min(bar[4], close), close]
+    bar[6] += 100
+
+    return {'i': bar[0], 'v': bar[1:]}
+
+
+def _study_values(rows: np.ndarray, settings: Dict[str, Any]) -> np.ndarray:
+    close = pd.Series(rows[:, 4])
+    length = int(settings.get('in_0', {}).get('v', 10))
+
+    if 'Bollinger' in settings.get('pineId', ''):
+        mid = close.rolling(length, min_periods=1).mean()
+        std = close.rolling(length, min_periods=1).std(ddof=0)
+
+        return np.column_stack([mid, mid + 2 * std, mid - 2 * std])
+
+    # Pine seeds `ta.ema` with the average of its first `length` bars
+    seeded = close.copy()
+    seeded[:length - 1] = np.nan
+    seeded[length - 1] = close[:length].mean()
+
+    return seeded.ewm(span=length, adjust=False).mean().to_numpy()[:, None]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in of the TradingView websocket')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--rate', type=float, default=None)
+    parser.add_argument('--heartbeat', type=float, default=10)
+    parser.add_argument('--update-interval', type=float, default=None)
+    parser.add_argument('--new-bar-every', type=int, default=5)
+    parser.add_argument('--disconnect-after', type=int, default=None)
+    parser.add_argument('--fixtures', default=None)
+    args = parser.parse_args()
+
+    _server = TradingViewServer(args.host, args.port, args.latency, args.rate, args.heartbeat,
+                                args.update_interval, args.new_bar_every, args.disconnect_after, args.fixtures)
+
+    print(f'Serving on {_server.url}')
+    asyncio.run(_server.serve_forever())
@@ -0,0 +1,64 @@
+import asyncio
+import subprocess
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from typing import List
+
+import pandas as pd
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.sharding import (afetch_sharded,
+                                                     fetch_sharded,
+                                                     plan_shards)
+
+
+def _ohlcv(symbols: List[str]) -> pd.DataFrame:
+    index = pd.MultiIndex.from_product([pd.date_range('2024-01-01', periods=3, tz='UTC'), symbols],
+                                       names=['timestamp', 'symbol'])
+
+    return pd.DataFrame({'close': range(len(index))}, index=index)
+
+
+class TestSharding(unittest.TestCase):
+
+    def test_plan_shards(self):
+        symbols = [f'NASDAQ:S{i}' for i in range(11)]
+
+        shards = plan_shards(symbols, 5)
+
+        self.assertEqual([len(i) for i in shards], [4, 4, 3])
+        self.assertEqual(sum(shards, []), symbols)
+        self.assertEqual(plan_shards(['A', 'B', 'A'], 5), [['A', 'B']])
+        self.assertEqual(plan_shards([], 5), [[]])
+
+    def test_fetch_sharded(self):
+        symbols = [f'NASDAQ:S{i}' for i in range(10)]
+        shards = plan_shards(symbols, 3)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            df, timings = fetch_sharded(_ohlcv, shards, executor)
+
+        self.assertEqual(set(df.index.get_level_values('symbol')), set(symbols))
+        self.assertEqual(len(df), 3 * len(symbols))
+        self.assertEqual([(i.shard, i.symbols) for i in timings], [(0, 3), (1, 3), (2, 2), (3, 2)])
+
+    def test_afetch_sharded(self):
+        symbols = [f'NASDAQ:S{i}' for i in range(4)]
+
+        async def _fetch(_symbols: List[str]) -> pd.DataFrame:
+            await asyncio.sleep(0)
+            return _ohlcv(_symbols)
+
+        df, timings = asyncio.run(afetch_sharded(_fetch, plan_shards(symbols, 2)))
+
+        self.assertEqual(len(df), 3 * len(symbols))
+        self.assertEqual(len(timings), 2)
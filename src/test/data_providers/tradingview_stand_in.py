@@ -0,0 +1,287 @@
+import asyncio
+import json
+import logging
+import subprocess
+import sys
+import unittest
+from contextlib import suppress
+from logging import StreamHandler
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from threading import Event, Thread
+from time import perf_counter
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.async_tradingview import AsyncTradingView
+from src.data_providers.tradingview.async_tradingview_client import \
+    _parse_bar_charts
+from src.data_providers.tradingview.connection_pool import (
+    Channel, ConnectionPool, PooledConnection, _is_auth_error)
+from src.data_providers.tradingview.token_manager import TokenManager
+from src.data_providers.tradingview.tradingview import TradingView
+from src.data_providers.tradingview.tradingview_client import \
+    _parse_bar_charts as _sync_parse_bar_charts
+from src.test.data_providers.tradingview_server import TradingViewServer
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(StreamHandler())
+
+_FIXTURES = {
+    'quotes': {'NASDAQ:AAPL': {'lp': 190.5, 'ch': 1.5, 'chp': 0.79, 'description': 'Apple Inc.'}},
+    'bars': {'NASDAQ:AAPL': [[1704067200 + i * 86400, 1.0, 2.0, 0.5, 1.5, 100.0] for i in range(30)]},
+    'errors': ['BAD:SYMBOL'],
+}
+
+
+def _client(url: str, cls=TradingView):
+    client = cls()
+    client.WS_URL = url
+    client.WS_POOL_SIZE = 2
+    client.WORKERS_NO = 4
+
+    return client
+
+
+class TestStandInServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.server = TradingViewServer(heartbeat=0.1, fixtures=_FIXTURES)
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.stop()
+        super().tearDownClass()
+
+    def test_quotes_from_fixtures(self):
+        client = _client(self.server.url)
+
+        quote = client.quotes('NASDAQ:AAPL', fields=['lp', 'ch', 'chp', 'description'])
+
+        self.assertEqual((quote.price, quote.description), (190.5, 'Apple Inc.'))
+
+    def test_ohlcv_with_study(self):
+        client = _client(self.server.url)
+
+        df = client.ohlcv(['NASDAQ:AAPL', 'NYSE:IBM'], '1D', 20, charts=['ema10@server'])
+
+        self.assertEqual(len(df.xs('NASDAQ:AAPL', level='Symbol')), 21)
+        self.assertEqual(len(df.xs('NYSE:IBM', level='Symbol')), 21)
+        self.assertIn('ema10', df.columns)
+        self.assertFalse(df['ema10'].isna().any())
+
+    def test_each_shard_on_its_own_socket(self):
+        with TradingViewServer(fixtures=_FIXTURES) as server:
+            client = _client(server.url)
+            client.WS_POOL_SIZE = 4
+            client.WS_MAX_SESSIONS_PER_SOCKET = 4
+
+            ohlcv = client._fetch_ohlcv([f'NASDAQ:S{i}' for i in range(12)], '1D', 10, [], 'dividends')
+
+            self.assertEqual(ohlcv.index.get_level_values('symbol').nunique(), 12)
+            # shards are as large as a socket carries, none of them shares one
+            self.assertEqual(server.stats['connections'], 3)
+
+    def test_backfill_pages(self):
+        client = _client(self.server.url)
+        client.BACKFILL_CHUNK_SIZE = 10
+
+        chunks = list(client.ohlcv_backfill('NASDAQ:AAPL', '1D'))
+
+        self.assertEqual(sum(len(i) for i in chunks), 30)
+
+    def test_partial_errors(self):
+        client = _client(self.server.url)
+
+        rst = client.quotes(['NASDAQ:AAPL', 'BAD:SYMBOL'], fields=['lp'], partial=True)
+
+        self.assertEqual(rst.status, {'NASDAQ:AAPL': 'ok', 'BAD:SYMBOL': 'error'})
+
+    def test_async_quotes_throughput(self):
+        symbols = [f'NASDAQ:S{i}' for i in range(200)]
+
+        async def _quotes():
+            client = _client(self.server.url, AsyncTradingView)
+            try:
+                return await client.quotes(symbols, fields=['lp'])
+            finally:
+                await client.tv.close()
+
+        start = perf_counter()
+        quotes = asyncio.run(_quotes())
+        duration = perf_counter() - start
+
+        logger.info('stand-in: %s quotes in %.3f s, %.0f quotes/s', len(quotes), duration, len(quotes) / duration)
+        self.assertEqual(len(quotes), len(symbols))
+
+
+class TestSlowUpstream(unittest.TestCase):
+
+    def test_latency_hits_deadline(self):
+        with TradingViewServer(latency=0.5) as server:
+            client = _client(server.url)
+            client.QUOTES_DEADLINE = 0.2
+
+            rst = client.quotes(['NASDAQ:AAPL', 'NASDAQ:MSFT'], fields=['lp'], partial=True)
+
+        self.assertEqual(set(rst.status.values()), {'timeout'})
+
+    def test_disconnect_surfaces(self):
+        with TradingViewServer(disconnect_after=2) as server:
+            client = _client(server.url)
+
+            with self.assertRaises(Exception):
+                client.tv.current_quotes([f'NASDAQ:S{i}' for i in range(5)], fields=['lp'])
+
+            self.assertEqual(server.stats['disconnects'], 1)
+
+    def test_disconnect_surfaces_in_bars(self):
+        with TradingViewServer(disconnect_after=2) as server:
+            client = _client(server.url)
+
+            with self.assertRaises(ConnectionError):
+                client.tv.ohlcv([f'NASDAQ:S{i}' for i in range(5)], '1D', 10)
+
+    def test_realtime_resubscribes_after_disconnect(self):
+        # each socket delivers a few updates before it is closed
+        with TradingViewServer(update_interval=0.05, disconnect_after=4) as server:
+            client = _client(server.url)
+            updates = []
+
+            def _callback(data):
+                updates.append(data)
+
+                # an update on the socket opened after the first one was closed
+                if server.stats['connections'] > 1:
+                    raise KeyboardInterrupt
+
+            client.tv.realtime_quotes('NASDAQ:AAPL', _callback)
+
+            self.assertGreaterEqual(server.stats['disconnects'], 1)
+
+        self.assertTrue(all('NASDAQ:AAPL' in i for i in updates))
+
+    def test_realtime_raises_without_updates(self):
+        with TradingViewServer(disconnect_after=1) as server:
+            client = _client(server.url)
+
+            with self.assertRaises(ConnectionError):
+                client.tv.realtime_quotes('NASDAQ:AAPL', lambda data: None)
+
+    def test_stalled_chart_session_times_out(self):
+        class _Stalled:
+            async def recv(self):
+                await asyncio.sleep(60)
+
+        with self.assertRaises(TimeoutError):
+            asyncio.run(_parse_bar_charts(_Stalled(), {'cs_1': False}, timeout=0.1))
+
+    def test_stalled_chart_session_times_out_sync(self):
+        # a channel of a socket nothing is sent on
+        channel = Channel(None, chart_sessions=['cs_1'])
+
+        with self.assertRaises(TimeoutError):
+            _sync_parse_bar_charts(channel, {'cs_1': False}, timeout=0.1)
+
+    def test_realtime_updates(self):
+        with TradingViewServer(update_interval=0.05) as server:
+            async def _updates():
+                client = _client(server.url, AsyncTradingView)
+                subscription = await client.subscribe_quotes(['NASDAQ:AAPL'])
+
+                try:
+                    return [await asyncio.wait_for(subscription.get(), 2) for _ in range(3)]
+                finally:
+                    await client.unsubscribe_quotes(subscription)
+                    await client.tv.close()
+
+            updates = asyncio.run(_updates())
+
+        self.assertTrue(all('NASDAQ:AAPL' in i for i in updates))
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def test_checkout_does_not_wait_for_handshakes(self):
+        signing_in = Event()
+        release = Event()
+
+        def _token():
+            # the second socket signs in slowly
+            if len(tokens) == 1:
+                signing_in.set()
+                release.wait(5)
+
+            tokens.append('token')
+
+            return tokens[-1]
+
+        tokens = []
+
+        with TradingViewServer() as server:
+            pool = ConnectionPool(server.url, headers='', token=_token, size=2, max_sessions=2)
+            first = pool.channel(quote_sessions=['qs_1'])
+
+            opening = Thread(target=pool.channel, kwargs={'chart_sessions': ['cs_1', 'cs_2']})
+            opening.start()
+            self.assertTrue(signing_in.wait(5))
+
+            start = perf_counter()
+            second = pool.channel(quote_sessions=['qs_2'])
+            elapsed = perf_counter() - start
+
+            release.set()
+            opening.join(5)
+            pool.close()
+
+        self.assertLess(elapsed, 1)
+        self.assertIs(second._connection, first._connection)
+        self.assertEqual(len(tokens), 2)
+
+    def test_idle_socket_fails_late_channels(self):
+        with TradingViewServer() as server:
+            connection = PooledConnection(server.url, headers='', token='token', idle_timeout=0)
+            connection._reader.join(5)
+
+            channel = Channel(connection, quote_sessions=['qs_1'])
+            connection.attach(channel)
+
+            with self.assertRaises(ConnectionError):
+                channel.recv(timeout=1)
+
+        self.assertTrue(connection.closed)
+
+    def test_auth_error_shape(self):
+        def _payload(m, p):
+            return json.dumps({'m': m, 'p': p})
+
+        self.assertTrue(_is_auth_error(_payload('critical_error', ['invalid auth token', 'set_auth_token'])))
+        self.assertFalse(_is_auth_error(_payload('critical_error', ['author field is unknown', 'quote_set_fields'])))
+        self.assertFalse(_is_auth_error(_payload('protocol_error', ['set_auth_token'])))
+
+    def test_rejected_token_signs_in_again(self):
+        tokens = iter(['stale', 'fresh', 'unused'])
+        manager = TokenManager(lambda: next(tokens))
+
+        with TradingViewServer(fixtures={**_FIXTURES, 'tokens': ['fresh']}) as server:
+            client = _client(server.url)
+            client.tv._token_manager = manager
+
+            with self.assertRaises(ConnectionError):
+                client.tv.current_quotes('NASDAQ:AAPL', fields=['lp'])
+
+            quote = client.tv.current_quotes('NASDAQ:AAPL', fields=['lp'])
+            client.tv.pool.close()
+
+            self.assertEqual(server.stats['rejected_tokens'], 1)
+
+        self.assertEqual(quote['lp'], 190.5)
+        self.assertEqual((manager.fetches, manager.current), (2, 'fresh'))
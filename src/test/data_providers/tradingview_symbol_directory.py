@@ -0,0 +1,131 @@
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+
+import pandas as pd
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.search_cache import search_key
+from src.data_providers.tradingview.symbol_directory import (SymbolDirectory,
+                                                             symbol_directory)
+from src.data_providers.tradingview.tradingview_client import \
+    TradingViewClient
+from src.test.data_providers.tradingview_server import TradingViewServer
+
+_AAPL = {'symbol': '<em>AAPL</em>', 'exchange': 'NASDAQ', 'type': 'stock', 'description': 'Apple Inc.'}
+_AAPL_BMV = {'symbol': 'AAPL', 'exchange': 'BMV', 'type': 'stock', 'description': 'Apple Inc.'}
+
+
+class TestSymbolDirectory(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = join(self.dir.name, 'symbols.json')
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_search_results_and_lookup(self):
+        directory = SymbolDirectory()
+        directory.add_search_results({
+            search_key('AAPL'): _AAPL,
+            search_key('APPLE'): {'symbols': [_AAPL_BMV, {'symbol': 'APLE', 'exchange': 'NYSE', 'type': 'stock'}]},
+            # a filtered search does not decide what the bare ticker stands for
+            search_key('AAPL', exchange='BMV'): _AAPL_BMV,
+        })
+
+        self.assertEqual(directory.get('aapl')['pro_name'], 'NASDAQ:AAPL')
+        self.assertEqual(directory.get('BMV:AAPL')['exchange'], 'BMV')
+        self.assertEqual(directory.canonical(['AAPL', 'MSFT']), {'AAPL': 'NASDAQ:AAPL', 'MSFT': 'MSFT'})
+        self.assertEqual([i['pro_name'] for i in directory.prefix('AA')], ['BMV:AAPL', 'NASDAQ:AAPL'])
+        self.assertEqual([i['pro_name'] for i in directory.prefix('nyse:')], ['NYSE:APLE'])
+        self.assertEqual(len(directory.prefix('A', limit=2)), 2)
+
+        rst = directory.search([search_key('AAPL'), search_key('AAPL', exchange='BMV'),
+                                search_key('AAPL', search_type='crypto'), search_key('AAPL', start=50)])
+        # the filters rule out the symbol the ticker stands for, those searches go upstream
+        self.assertEqual({k: v['pro_name'] for k, v in rst.items()}, {search_key('AAPL'): 'NASDAQ:AAPL'})
+
+    def test_search_answers_only_single_items(self):
+        directory = SymbolDirectory()
+        directory.add_search_results({search_key('SAP', country='US'): {**_AAPL, 'symbol': 'SAP', 'exchange': 'NYSE'},
+                                      search_key('APPLE'): {'symbols': [_AAPL_BMV]}})
+
+        rst = directory.search([search_key('SAP', country='US'), search_key('SAP', country='DE'),
+                                search_key('sap', country='US'), search_key('NYSE:SAP', country='US'),
+                                search_key('APPLE')])
+        # other countries, cases and pro names were answered with the whole response upstream
+        self.assertEqual({k: v['pro_name'] for k, v in rst.items()}, {search_key('SAP', country='US'): 'NYSE:SAP'})
+
+        # the upstream no longer resolves the query to a single item
+        directory.add_search_results({search_key('SAP', country='US'): {'symbols': [_AAPL_BMV]}})
+        self.assertEqual(directory.search([search_key('SAP', country='US')]), {})
+
+    def test_watchlists_and_persistence(self):
+        directory = symbol_directory(self.path)
+
+        self.assertEqual(directory.canonical(['TOYOTA MOTOR', 'SPY']), {'TOYOTA MOTOR': 'TSE:7203', 'SPY': 'AMEX:SPY'})
+        # watchlists only name symbols, searches still go upstream
+        self.assertEqual(directory.search([search_key('SPY')]), {})
+
+        directory.add_resolved({'AAPL': {'name': 'AAPL', 'pro_name': 'NASDAQ:AAPL', 'type': 'stock',
+                                         'timezone': 'America/New_York', 'session': '0930-1600'}})
+        directory.flush(force=True)
+
+        directory.add_search_results({search_key('AAPL'): _AAPL})
+        directory.flush(force=True)
+
+        loaded = SymbolDirectory(self.path)
+        self.assertEqual(loaded.get('AAPL')['timezone'], 'America/New_York')
+        self.assertEqual(list(loaded.search([search_key('AAPL')])), [search_key('AAPL')])
+        self.assertEqual(loaded.stats['symbols'], len(directory))
+
+        loaded.refresh({search_key('AAPL'): None})
+        self.assertEqual(loaded.canonical(['AAPL']), {'AAPL': 'AAPL'})
+        self.assertEqual(loaded.search([search_key('AAPL')]), {})
+
+
+class TestClientDirectory(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = join(self.dir.name, 'symbols.json')
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_search_answered_locally(self):
+        client = TradingViewClient(symbol_directory_path=self.path)
+        client.symbol_directory.add_search_results({search_key('AAPL'): _AAPL})
+
+        rst = client.search_multi(['AAPL', 'AAPL'], {'country': 'US', 'exchange': None})
+
+        self.assertEqual(rst['AAPL']['pro_name'], 'NASDAQ:AAPL')
+        self.assertEqual(client.search_cache.misses, 0)
+
+    def test_ohlcv_learns_and_shares_sessions(self):
+        with TradingViewServer(fixtures={'aliases': {'AAPL': 'NASDAQ:AAPL'}}) as server:
+            client = TradingViewClient(ws_url=server.url, pool_size=1, symbol_directory_path=self.path)
+
+            first = client.ohlcv('AAPL', '1D', 10)
+            self.assertEqual(client.symbol_directory.canonical(['AAPL']), {'AAPL': 'NASDAQ:AAPL'})
+            self.assertEqual(client.symbol_directory.get('AAPL')['type'], 'stock')
+
+            series = server.stats['create_series']
+            both = client.ohlcv(['AAPL', 'NASDAQ:AAPL'], '1D', 10)
+            client.pool.close()
+
+        # both names are served by one chart session
+        self.assertEqual(server.stats['create_series'] - series, 1)
+        self.assertEqual(both.index.get_level_values('symbol').unique().tolist(), ['AAPL', 'NASDAQ:AAPL'])
+        pd.testing.assert_frame_equal(both.xs('AAPL', level='symbol'), both.xs('NASDAQ:AAPL', level='symbol'))
+        pd.testing.assert_frame_equal(both.xs('AAPL', level='symbol'), first.xs('AAPL', level='symbol'))
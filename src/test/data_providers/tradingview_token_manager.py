@@ -0,0 +1,129 @@
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from os import chdir
+from os.path import join
+from subprocess import CalledProcessError
+from threading import Event
+from time import sleep
+
+with suppress(CalledProcessError):
+    WORKING_DIR = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).strip().decode()
+    sys.path.extend([WORKING_DIR, join(WORKING_DIR, 'src')])
+    chdir(WORKING_DIR)
+
+from src.data_providers.tradingview.token_manager import TokenManager
+
+
+class _Fetch:
+
+    def __init__(self, delay: float = 0) -> None:
+        self.calls = 0
+        self.delay = delay
+
+    def __call__(self) -> str:
+        self.calls += 1
+        sleep(self.delay)
+
+        return f'token{self.calls}'
+
+
+class TestTokenManager(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = join(self.dir.name, 'token.json')
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_single_flight(self):
+        fetch = _Fetch(delay=0.2)
+        manager = TokenManager(fetch)
+
+        with ThreadPoolExecutor(16) as executor:
+            tokens = list(executor.map(lambda _: manager.get(), range(16)))
+
+        manager.close()
+
+        self.assertEqual(fetch.calls, 1)
+        self.assertEqual(set(tokens), {'token1'})
+
+    def test_expired_token_fetched_again(self):
+        fetch = _Fetch()
+        manager = TokenManager(fetch, ttl=0.2, refresh_before=0)
+
+        self.assertEqual(manager.get(), 'token1')
+        self.assertEqual(manager.get(), 'token1')
+        sleep(0.3)
+        # signed in once more, by the refresh at expiry or by this caller
+        self.assertEqual(manager.get(), 'token2')
+        self.assertEqual(fetch.calls, 2)
+
+        manager.invalidate()
+        self.assertEqual(manager.get(), 'token3')
+        manager.close()
+
+    def test_file_shared_by_managers(self):
+        first, second = _Fetch(), _Fetch()
+        managers = [TokenManager(first, key='user', path=self.path), TokenManager(second, key='user', path=self.path)]
+
+        self.assertEqual([i.get() for i in managers], ['token1', 'token1'])
+        self.assertEqual((first.calls, second.calls), (1, 0))
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+        # another user of the same file signs in on its own
+        other = TokenManager(second, key='other', path=self.path)
+        self.assertEqual(other.get(), 'token1')
+        self.assertEqual(second.calls, 1)
+
+        for i in managers + [other]:
+            i.close()
+
+    def test_rejected_token_dropped_once(self):
+        fetch = _Fetch()
+        managers = [TokenManager(fetch, path=self.path), TokenManager(fetch, path=self.path)]
+
+        self.assertEqual([i.get() for i in managers], ['token1', 'token1'])
+
+        # sockets of both managers reject the same token, one sign-in replaces it
+        managers[0].invalidate('token1')
+        self.assertEqual(managers[0].get(), 'token2')
+        managers[0].invalidate('token1')
+        managers[1].invalidate('token1')
+
+        self.assertEqual([i.get() for i in managers], ['token2', 'token2'])
+        self.assertEqual(fetch.calls, 2)
+
+        for i in managers:
+            i.close()
+
+    def test_refreshed_before_expiry(self):
+        refreshed = Event()
+        fetch = _Fetch()
+
+        def _fetch():
+            token = fetch()
+            if fetch.calls == 2:
+                refreshed.set()
+            return token
+
+        manager = TokenManager(_fetch, ttl=0.4, refresh_before=0.2)
+        self.assertEqual(manager.get(), 'token1')
+
+        self.assertTrue(refreshed.wait(1))
+        # the refreshed token is served without any caller waiting on a sign-in
+        self.assertEqual(manager.current, 'token2')
+        manager.close()
+
+    def test_anonymous_token_not_refreshed(self):
+        manager = TokenManager(lambda: '', ttl=0.2, refresh_before=0.1)
+
+        self.assertEqual(manager.get(), '')
+        self.assertIsNone(manager._timer)
+
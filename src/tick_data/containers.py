@@ -1,10 +1,14 @@
 from dependency_injector import containers
-from dependency_injector.providers import AbstractSingleton, Configuration
+from dependency_injector.providers import (AbstractSingleton, Configuration,
+                                           Dependency, Singleton)
 
+from infra.http import HttpClient
 from tick_data.provider import TickDataProvider
 
 
 class Container(containers.DeclarativeContainer):
     config = Configuration(yaml_files=['config.yml'])
 
+    http = Dependency(instance_of=HttpClient, default=Singleton(HttpClient))
+
     client = AbstractSingleton(TickDataProvider)
@@ -7,7 +7,6 @@ import numpy as np
 import pandas as pd
 from dateutil.parser import parse as date_parse
 from google.cloud.storage import Client as StorageClient
-from requests import Session, post
 from tqdm import tqdm
 
 from infra.big_query import credentials
@@ -34,7 +33,7 @@ class JPX(TickDataProvider):
             'password': self.PASSWORD,
         })
 
-        resp = post(url, data=payload, headers=headers, timeout=5)
+        resp = self.http.post(url, data=payload, headers=headers, timeout=5)
 
         data = resp.json()
 
@@ -74,7 +73,7 @@ class JPX(TickDataProvider):
                 'getDate': date.strftime('%Y%m%d'),
             })
 
-            _resp = post(_url, data=_payload, headers=_headers, timeout=5)
+            _resp = self.http.post(_url, data=_payload, headers=_headers, timeout=5)
 
             if _resp.status_code == 401:
                 self._token_cache.clear()
@@ -184,8 +183,7 @@ class JPX(TickDataProvider):
 
             _blob = _bucket.blob(path)
 
-            with Session() as _sess:
-                _resp = _sess.get(url, stream=True)
+            with self.http.get(url, stream=True) as _resp:
                 _blob.upload_from_string(_resp.content,
                                         content_type=_resp.headers['Content-Type'])
 
@@ -215,7 +213,7 @@ class JPX(TickDataProvider):
             'getDate': filename.split('_')[0],
         })
 
-        resp = post(url, data=payload, headers=headers, timeout=5)
+        resp = self.http.post(url, data=payload, headers=headers, timeout=5)
 
         if resp.status_code == 401:
             self._token_cache.clear()
@@ -6,6 +6,9 @@ from typing import Any, Dict, List, Union
 import pandas as pd
 from cachetools import TTLCache
 from google.cloud.bigquery import Client as BigQueryClient
+from requests import Session
+
+from infra.http import HttpClient
 
 
 class TickDataProvider(ABC):
@@ -15,6 +18,7 @@ class TickDataProvider(ABC):
     USERNAME: str = None
     PASSWORD: str = None
     TOKEN_TTL: int = None
+    HTTP: HttpClient = None
 
     _executor: ThreadPoolExecutor = None
     _token_cache: TTLCache = None
@@ -26,6 +30,13 @@ class TickDataProvider(ABC):
 
         return self._executor
 
+    @property
+    def http(self) -> Session:
+        if self.HTTP is None:
+            self.HTTP = HttpClient(pool_size=self.WORKERS_NO or 1)
+
+        return self.HTTP.session
+
     @property
     def token_cache(self) -> TTLCache:
         if not self._token_cache: